@@ -1,8 +1,11 @@
 # AI_pipeline/core/ai_module.py
 
 import os
+import io
 import time
 import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from google import genai
 from dotenv import load_dotenv
 from google.genai import types
@@ -12,48 +15,106 @@ load_dotenv("/workspace/AI_emotion_browser/AI_pipeline/.env")
 
 API_KEY = os.getenv("GOOGLE_API_KEY")
 
-if not API_KEY:
-    raise RuntimeError("❌ GOOGLE_API_KEY is missing!")
+# genai : 실제 Gemini API
+# fake  : 로컬 대역 (core/fake_gemini.py, 오프라인 벤치마크용)
+GEMINI_CLIENT = os.getenv("GEMINI_CLIENT", "genai")
 
-client = genai.Client(api_key=API_KEY)
+
+def make_client(kind=GEMINI_CLIENT):
+    if kind == "fake":
+        from AI_pipeline.core.fake_gemini import FakeGeminiClient
+        print("🧪 Gemini 대역(fake) 클라이언트 사용")
+        return FakeGeminiClient()
+
+    if not API_KEY:
+        raise RuntimeError("❌ GOOGLE_API_KEY is missing!")
+    return genai.Client(api_key=API_KEY)
+
+
+client = make_client()
+
+MODEL_NAME = os.getenv("GEMINI_MODEL", "models/gemini-2.5-pro")
 
 
 # ------------------------------------------------------------
-# 1) Gemini Files Upload
+# 비동기 클라이언트 설정
 # ------------------------------------------------------------
-def upload_frames_to_gemini(frame_paths):
-    uploaded_ids = []
+# 동시에 진행할 업로드 수 (Files API rate limit 에 맞춰 조절)
+UPLOAD_CONCURRENCY = int(os.getenv("GEMINI_UPLOAD_CONCURRENCY", "8"))
+# ACTIVE 폴링: 처음 간격 → 배수로 늘려서 최대 간격까지, 전체 제한 시간
+POLL_INITIAL_S = float(os.getenv("GEMINI_POLL_INITIAL_S", "0.2"))
+POLL_MAX_S = float(os.getenv("GEMINI_POLL_MAX_S", "2.0"))
+POLL_BACKOFF = 1.5
+POLL_TIMEOUT_S = float(os.getenv("GEMINI_POLL_TIMEOUT_S", "60"))
+
+# 응답 후 파일 삭제는 이 스레드 풀에서 (요청 경로 밖)
+_cleanup_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="gemini-cleanup")
 
-    for path in frame_paths:
-        uploaded = client.files.upload(
-            file=path,
-            #mime_type="image/jpeg"
-        )
-        uploaded_ids.append(uploaded.name)
-        print("📤 업로드됨:", uploaded.name)
+
+# ------------------------------------------------------------
+# 1) Gemini Files Upload (동시 업로드)
+# ------------------------------------------------------------
+async def upload_frames_async(jpegs):
+    """JPEG 바이트를 모두 동시에 업로드 (최대 UPLOAD_CONCURRENCY 개) → 순서대로 file id 반환"""
+    semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+
+    async def upload_one(data):
+        async with semaphore:
+            uploaded = await client.aio.files.upload(
+                file=io.BytesIO(data),
+                config=types.UploadFileConfig(mime_type="image/jpeg"),
+            )
+            print("📤 업로드됨:", uploaded.name)
+            return uploaded.name
+
+    results = await asyncio.gather(*(upload_one(d) for d in jpegs), return_exceptions=True)
+
+    uploaded_ids = [r for r in results if isinstance(r, str)]
+    errors = [r for r in results if isinstance(r, BaseException)]
+    if errors:
+        # 일부만 올라간 경우 올라간 것은 정리하고 실패 전파
+        cleanup_in_background(uploaded_ids)
+        raise errors[0]
 
     return uploaded_ids
 
 
 # ------------------------------------------------------------
-# 2) Files ACTIVE 대기
+# 2) Files ACTIVE 대기 (전체 묶어서 폴링 + 백오프)
 # ------------------------------------------------------------
-def wait_until_active(file_ids):
+async def wait_until_active_async(file_ids):
+    """아직 ACTIVE 가 아닌 파일만 한 라운드에 동시에 조회 → File 객체 리스트 반환"""
     print("⏳ File 상태 확인 중…")
 
-    for fid in file_ids:
-        while True:
-            f = client.files.get(name=fid)
-            print(f" ➤ {fid} 상태: {f.state}")
+    files = {}
+    pending = list(file_ids)
+    delay = POLL_INITIAL_S
+    deadline = time.monotonic() + POLL_TIMEOUT_S
+
+    while True:
+        states = await asyncio.gather(*(client.aio.files.get(name=fid) for fid in pending))
 
+        still_pending = []
+        for fid, f in zip(pending, states):
             if f.state == "ACTIVE":
-                break
+                files[fid] = f
             elif f.state == "FAILED":
                 raise RuntimeError(f"❌ 파일 처리 실패: {fid}")
+            else:
+                still_pending.append(fid)
 
-            time.sleep(0.3)
+        print(f" ➤ ACTIVE {len(files)}/{len(file_ids)}")
+        pending = still_pending
+        if not pending:
+            break
+
+        if time.monotonic() + delay > deadline:
+            raise TimeoutError(f"❌ 파일 ACTIVE 대기 시간 초과: {pending}")
+        await asyncio.sleep(delay)
+        delay = min(delay * POLL_BACKOFF, POLL_MAX_S)
 
     print("🎉 모든 파일 ACTIVE!")
+    return [files[fid] for fid in file_ids]
 
 
 # ------------------------------------------------------------
@@ -89,18 +150,15 @@ PROMPT = """
 
 
 
-def analyze_frames_with_llm(file_ids):
-    contents = [client.files.get(name=fid) for fid in file_ids]
-
-    schema = types.Schema(
+RESPONSE_SCHEMA = types.Schema(
     type=types.Type.OBJECT,
     properties={
         "tags": types.Schema(
-            type=types.Type.ARRAY, 
+            type=types.Type.ARRAY,
             items=types.Schema(type=types.Type.STRING)
         ),
         "labels": types.Schema(
-            type=types.Type.ARRAY, 
+            type=types.Type.ARRAY,
             items=types.Schema(type=types.Type.STRING)
         ),
         "summary": types.Schema(type=types.Type.STRING)
@@ -108,12 +166,25 @@ def analyze_frames_with_llm(file_ids):
     required=["tags", "labels", "summary"]
 )
 
-    response = client.models.generate_content(
-        model="models/gemini-2.5-pro",
-        contents=contents + [PROMPT],
+
+async def analyze_frames_async(files):
+    """files: wait_until_active_async 가 돌려준 File 객체 (다시 조회하지 않는다)"""
+    return await _generate(list(files))
+
+
+async def analyze_inline_async(jpegs):
+    """Files API 없이 JPEG 바이트를 inline 이미지 파트로 바로 넣어 1회 호출"""
+    parts = [types.Part.from_bytes(data=data, mime_type="image/jpeg") for data in jpegs]
+    return await _generate(parts)
+
+
+async def _generate(image_parts):
+    response = await client.aio.models.generate_content(
+        model=MODEL_NAME,
+        contents=image_parts + [PROMPT],
         config=types.GenerateContentConfig(
             response_mime_type="application/json",
-            response_schema=schema
+            response_schema=RESPONSE_SCHEMA
         ),
     )
 
@@ -130,10 +201,21 @@ def analyze_frames_with_llm(file_ids):
         "labels": data.get("labels", []),
         "summary": data.get("summary", ""),
     }
+
+
 # ------------------------------------------------------------
 # 4) Files 삭제
 # ------------------------------------------------------------
 def cleanup_gemini_files(file_ids):
     for fid in file_ids:
-        client.files.delete(name=fid)
-        print("🗑️ 삭제됨:", fid)
+        try:
+            client.files.delete(name=fid)
+            print("🗑️ 삭제됨:", fid)
+        except Exception as e:
+            print("⚠️ 삭제 실패:", fid, e)
+
+
+def cleanup_in_background(file_ids):
+    """결과 반환을 기다리게 하지 않도록 삭제는 백그라운드 스레드에서"""
+    if file_ids:
+        _cleanup_executor.submit(cleanup_gemini_files, list(file_ids))
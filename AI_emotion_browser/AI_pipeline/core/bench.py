@@ -0,0 +1,226 @@
+# AI_pipeline/core/bench.py
+#
+# 파이프라인 서버 end-to-end 벤치마크
+#   - 기본은 Gemini 대역(GEMINI_CLIENT=fake) + 서버 앱을 이 프로세스 안에서 (네트워크/API 키 없음)
+#   - 웃음 이벤트 N 개를 concurrency 개씩 동시에 보내고
+#     단계별 시간(extract / keyframes / encode / upload / active / llm / total), 처리량을 집계
+#   - 결과 캐시 / 사전 분석 인덱스는 기본으로 끈다 (매번 실제 경로를 측정)
+#
+# 사용 예 (AI_emotion_browser/ 에서):
+#   python -m AI_pipeline.core.bench --events 20 --concurrency 4 --out bench/pipeline.json
+#   python -m AI_pipeline.core.bench --endpoint jobs --mode files
+#   python -m AI_pipeline.core.bench --url http://localhost:8100   (이미 떠 있는 서버)
+
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import statistics
+
+STAGES = ("extract", "keyframes", "encode", "upload", "active", "llm", "total")
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, round(q / 100.0 * (len(values) - 1))))
+    return values[k]
+
+
+def summarize(values):
+    if not values:
+        return None
+    return {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "mean": round(statistics.fmean(values), 2),
+        "max": max(values),
+    }
+
+
+def make_events(n, duration_s, seed, min_len=2.0, max_len=6.0):
+    rng = random.Random(seed)
+    events = []
+    for i in range(n):
+        length = rng.uniform(min_len, max_len)
+        start = rng.uniform(0.0, max(0.0, duration_s - length))
+        events.append({"event_id": i, "start_time": round(start, 2), "end_time": round(start + length, 2)})
+    return events
+
+
+# ================================
+# 엔드포인트별 호출
+# ================================
+async def call_direct(client, event):
+    res = await client.post("/laugh-event", json=event)
+    res.raise_for_status()
+    return [res.json()]
+
+
+async def call_job(client, event, poll_s=0.05):
+    res = await client.post("/jobs/laugh-event", json=event)
+    res.raise_for_status()
+    job_id = res.json()["job_id"]
+    while True:
+        await asyncio.sleep(poll_s)
+        job = (await client.get(f"/jobs/{job_id}")).json()
+        if job["status"] == "done":
+            return [job["result"]]
+        if job["status"] == "failed":
+            raise RuntimeError(job["error"])
+
+
+async def call_batch(client, events):
+    res = await client.post("/laugh-events/batch", json={"events": events})
+    res.raise_for_status()
+    return res.json()["results"]
+
+
+# ================================
+# 실행
+# ================================
+async def run(args):
+    import httpx
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+        job_queue = None
+        duration_s = args.video_duration
+    else:
+        from AI_pipeline.server.pipeline_server import app
+        from AI_pipeline.routes.jobs import job_queue
+        from AI_pipeline.core.pipeline import VIDEO_PATH
+        from AI_pipeline.core.timer_module import probe_duration
+
+        job_queue.start()
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=args.timeout
+        )
+        duration_s = args.video_duration or probe_duration(VIDEO_PATH)
+
+    events = make_events(args.events, duration_s, args.seed)
+
+    if args.endpoint == "batch":
+        units = [events[i:i + args.batch_size] for i in range(0, len(events), args.batch_size)]
+        call = lambda unit: call_batch(client, unit)
+    else:
+        units = events
+        call = (lambda ev: call_job(client, ev)) if args.endpoint == "jobs" else (lambda ev: call_direct(client, ev))
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, responses, errors = [], [], []
+
+    async def one(unit):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                responses.extend(await call(unit))
+                latencies.append((time.perf_counter() - started) * 1000.0)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+
+    print(f"🏃 {args.endpoint}: 이벤트 {len(events)} 개, 동시 {args.concurrency}")
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(one(u) for u in units))
+    wall = time.perf_counter() - wall_started
+
+    stages = {stage: [] for stage in STAGES}
+    modes, frames, bytes_sent = {}, [], []
+    for r in responses:
+        pipeline = r.get("pipeline") or {}
+        modes[pipeline.get("mode")] = modes.get(pipeline.get("mode"), 0) + 1
+        for stage, ms in (pipeline.get("latency_ms") or {}).items():
+            stages.setdefault(stage, []).append(ms)
+        if "frames" in pipeline:
+            frames.append(pipeline["frames"])
+            bytes_sent.append(pipeline["bytes_sent"])
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "client": os.environ.get("GEMINI_CLIENT"),
+            "target": args.url or "in-process",
+            "pipeline_mode": os.environ.get("PIPELINE_MODE", "auto"),
+            "seed": args.seed,
+        },
+        "config": {
+            "endpoint": args.endpoint,
+            "events": args.events,
+            "concurrency": args.concurrency,
+            "batch_size": args.batch_size if args.endpoint == "batch" else None,
+        },
+        "wall_s": round(wall, 3),
+        "events_per_s": round(len(responses) / wall, 3) if wall else 0.0,
+        "errors": errors,
+        "request_latency_ms": summarize(latencies),
+        "stages_ms": {stage: summarize(v) for stage, v in stages.items() if v},
+        "modes": modes,
+        "frames_per_event": summarize(frames),
+        "bytes_per_event": summarize(bytes_sent),
+    }
+
+    if job_queue is not None:
+        from AI_pipeline.core import ai_module
+        if hasattr(ai_module.client, "stats"):
+            report["fake_gemini"] = ai_module.client.stats()
+        await job_queue.stop()
+
+    await client.aclose()
+    return report
+
+
+def print_report(report):
+    print(f"\n📊 {report['config']['endpoint']}  {report['events_per_s']} events/s  "
+          f"(wall {report['wall_s']}s, 오류 {len(report['errors'])})")
+    lat = report["request_latency_ms"]
+    if lat:
+        print(f"   request : p50={lat['p50']:.0f}ms p95={lat['p95']:.0f}ms p99={lat['p99']:.0f}ms")
+    for stage, s in report["stages_ms"].items():
+        print(f"   {stage:<9}: p50={s['p50']:.0f}ms p95={s['p95']:.0f}ms mean={s['mean']:.0f}ms")
+    print(f"   modes   : {report['modes']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM 파이프라인 end-to-end 벤치마크")
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--endpoint", choices=("direct", "jobs", "batch"), default="direct")
+    parser.add_argument("--batch-size", type=int, default=5, help="batch 엔드포인트 요청당 이벤트 수")
+    parser.add_argument("--mode", choices=("auto", "inline", "files"), default=None)
+    parser.add_argument("--client", choices=("fake", "genai"), default="fake")
+    parser.add_argument("--video", default="", help="PIPELINE_VIDEO_PATH 덮어쓰기")
+    parser.add_argument("--video-duration", type=float, default=0.0, help="이벤트 생성 범위(초), 0 이면 ffprobe")
+    parser.add_argument("--keep-cache", action="store_true", help="결과 캐시 / 인덱스를 켠 채로 측정")
+    parser.add_argument("--url", default="", help="이미 떠 있는 파이프라인 서버 주소")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="")
+    args = parser.parse_args()
+
+    # 모듈들이 import 시점에 환경변수를 읽으므로 앱 import 전에 설정
+    os.environ["GEMINI_CLIENT"] = args.client
+    os.environ.setdefault("FAKE_GEMINI_SEED", str(args.seed))
+    if not args.keep_cache:
+        os.environ["CACHE_ENABLED"] = "0"
+        os.environ["VIDEO_INDEX_ENABLED"] = "0"
+    if args.video:
+        os.environ["PIPELINE_VIDEO_PATH"] = args.video
+    if args.mode:
+        os.environ["PIPELINE_MODE"] = args.mode
+
+    report = asyncio.run(run(args))
+    print_report(report)
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 저장: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
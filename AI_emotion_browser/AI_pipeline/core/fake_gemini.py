@@ -0,0 +1,150 @@
+# AI_pipeline/core/fake_gemini.py
+#
+# 로컬 Gemini 대역 (GEMINI_CLIENT=fake)
+#   - ai_module 이 쓰는 만큼만 genai.Client 와 같은 모양으로 구현
+#     (aio.files.upload/get/delete, aio.models.generate_content, files.delete)
+#   - 업로드 / ACTIVE 처리 / 생성 / 삭제 지연을 흉내 내고, 스키마에 맞는 JSON 을 돌려준다
+#   - API 키/네트워크 없이 파이프라인 변경을 재현 가능하게 벤치마크하기 위한 용도
+
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+import hashlib
+import threading
+from types import SimpleNamespace
+
+UPLOAD_MS = float(os.getenv("FAKE_GEMINI_UPLOAD_MS", "150"))
+PROCESSING_MS = float(os.getenv("FAKE_GEMINI_PROCESSING_MS", "300"))
+GENERATE_MS = float(os.getenv("FAKE_GEMINI_GENERATE_MS", "1500"))
+PER_IMAGE_MS = float(os.getenv("FAKE_GEMINI_PER_IMAGE_MS", "100"))
+DELETE_MS = float(os.getenv("FAKE_GEMINI_DELETE_MS", "50"))
+# 지연에 곱하는 랜덤 폭 (0.1 = ±10%), 시드 고정으로 재현 가능
+JITTER = float(os.getenv("FAKE_GEMINI_JITTER", "0.1"))
+SEED = int(os.getenv("FAKE_GEMINI_SEED", "0"))
+
+FAKE_TAGS = ["포장마차", "커플", "웃긴영상", "몰래카메라", "반려동물", "리액션", "먹방", "상황극"]
+ALLOWED_LABELS = ["병맛", "팩트폭격", "공감", "슬랩스틱", "상황개그"]
+
+
+class _Latency:
+    def __init__(self, seed):
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def seconds(self, ms):
+        with self._lock:
+            factor = 1.0 + self._rng.uniform(-JITTER, JITTER)
+        return max(0.0, ms * factor) / 1000.0
+
+
+class _FakeFilesAsync:
+    def __init__(self, owner):
+        self.owner = owner
+
+    async def upload(self, file, config=None):
+        if hasattr(file, "read"):
+            data = file.read()
+        else:
+            with open(file, "rb") as f:
+                data = f.read()
+        await asyncio.sleep(self.owner.latency.seconds(UPLOAD_MS))
+        return self.owner._add_file(data)
+
+    async def get(self, name):
+        await asyncio.sleep(self.owner.latency.seconds(20))
+        return self.owner._file_state(name)
+
+    async def delete(self, name):
+        await asyncio.sleep(self.owner.latency.seconds(DELETE_MS))
+        self.owner._remove_file(name)
+
+
+class _FakeFilesSync:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def delete(self, name):
+        time.sleep(self.owner.latency.seconds(DELETE_MS))
+        self.owner._remove_file(name)
+
+
+class _FakeModelsAsync:
+    def __init__(self, owner):
+        self.owner = owner
+
+    async def generate_content(self, model, contents, config=None):
+        images = [c for c in contents if not isinstance(c, str)]
+        await asyncio.sleep(self.owner.latency.seconds(GENERATE_MS + PER_IMAGE_MS * len(images)))
+        self.owner.generate_calls += 1
+
+        text = json.dumps(_fake_answer(images), ensure_ascii=False)
+        part = SimpleNamespace(text=text)
+        candidate = SimpleNamespace(content=SimpleNamespace(parts=[part]))
+        return SimpleNamespace(candidates=[candidate], text=text)
+
+
+def _image_bytes(item):
+    inline = getattr(item, "inline_data", None)
+    if inline is not None:
+        return inline.data or b""
+    return getattr(item, "sha256", b"")
+
+
+def _fake_answer(images):
+    """입력 이미지 내용으로 정해지는(결정적) 스키마 준수 응답"""
+    digest = hashlib.sha256(b"".join(_image_bytes(i) for i in images)).digest()
+    tags = [FAKE_TAGS[b % len(FAKE_TAGS)] for b in digest[:3]]
+    labels = [label for bit, label in enumerate(ALLOWED_LABELS) if digest[3] >> bit & 1]
+    return {
+        "tags": list(dict.fromkeys(tags)),
+        "labels": labels,
+        "summary": f"가짜 응답: 이미지 {len(images)}장 분석",
+    }
+
+
+class FakeGeminiClient:
+    def __init__(self, seed=SEED):
+        self.latency = _Latency(seed)
+        self._files = {}
+        self._lock = threading.Lock()
+
+        self.uploads = 0
+        self.deletes = 0
+        self.generate_calls = 0
+
+        self.aio = SimpleNamespace(files=_FakeFilesAsync(self), models=_FakeModelsAsync(self))
+        self.files = _FakeFilesSync(self)
+
+    def _add_file(self, data):
+        name = f"files/fake-{uuid.uuid4().hex[:12]}"
+        ready_at = time.monotonic() + self.latency.seconds(PROCESSING_MS)
+        with self._lock:
+            self._files[name] = (ready_at, len(data), hashlib.sha256(data).digest())
+            self.uploads += 1
+        return SimpleNamespace(name=name, state="PROCESSING", size_bytes=len(data))
+
+    def _file_state(self, name):
+        with self._lock:
+            if name not in self._files:
+                raise KeyError(f"fake file not found: {name}")
+            ready_at, size, sha256 = self._files[name]
+        state = "ACTIVE" if time.monotonic() >= ready_at else "PROCESSING"
+        return SimpleNamespace(name=name, state=state, size_bytes=size, sha256=sha256)
+
+    def _remove_file(self, name):
+        with self._lock:
+            if self._files.pop(name, None) is not None:
+                self.deletes += 1
+
+    def stats(self):
+        with self._lock:
+            live = len(self._files)
+        return {
+            "uploads": self.uploads,
+            "deletes": self.deletes,
+            "live_files": live,
+            "generate_calls": self.generate_calls,
+        }
@@ -0,0 +1,173 @@
+# AI_pipeline/core/frame_store.py
+#
+# 챌린지 영상 사전 디코딩 프레임 저장소
+#   - 영상을 한 번만 fps 로 디코딩 + 축소해서 (N, H, W, 3) uint8 파일로 저장
+#   - 요청 시 [start, end] 구간은 np.memmap 슬라이스 (ffmpeg 프로세스 없음, 복사 없음)
+#   - 읽기 전용 memmap 이라 여러 워커 프로세스가 OS 페이지 캐시를 그대로 공유
+#   - 영상 파일 크기/수정 시각이 바뀌면 무효 (다시 생성해야 사용)
+#   - fps / max_side 별로 파일이 따로 생기고, 요청한 설정과 다르면 사용하지 않음
+#
+# 생성 (AI_emotion_browser/ 에서):
+#   python -m AI_pipeline.core.frame_store --fps 2 --max-side 768
+
+import io
+import os
+import json
+import argparse
+import subprocess
+import numpy as np
+from PIL import Image
+
+STORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "frame_store")
+
+
+def store_paths(video_path, fps, max_side, store_dir=STORE_DIR):
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    base = os.path.join(store_dir, f"{name}.{fps:g}fps.{max_side}px")
+    return base + ".rgb", base + ".json"
+
+
+def _video_stamp(video_path):
+    st = os.stat(video_path)
+    return {"bytes": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def probe_size(video_path):
+    cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "stream=width,height",
+        "-of", "csv=p=0:s=x",
+        video_path,
+    ]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        raise RuntimeError(f"❌ ffprobe 실패: {proc.stderr.decode(errors='ignore')[-500:]}")
+    width, height = proc.stdout.decode().strip().split("x")[:2]
+    return int(width), int(height)
+
+
+def scaled_size(width, height, max_side):
+    """긴 변을 max_side 이하로 (짝수로 맞춤)"""
+    if max_side <= 0 or max(width, height) <= max_side:
+        return width - width % 2, height - height % 2
+    ratio = max_side / max(width, height)
+    return int(width * ratio) // 2 * 2, int(height * ratio) // 2 * 2
+
+
+def encode_jpeg(frame, quality=80):
+    buf = io.BytesIO()
+    Image.fromarray(frame).save(buf, "JPEG", quality=quality)
+    return buf.getvalue()
+
+
+# ================================
+# 생성
+# ================================
+def build_store(video_path, fps=2, max_side=768, store_dir=STORE_DIR):
+    """ffmpeg rawvideo(rgb24) 를 파이프로 받아 프레임 단위로 파일에 기록"""
+    os.makedirs(store_dir, exist_ok=True)
+    data_path, meta_path = store_paths(video_path, fps, max_side, store_dir)
+    stamp = _video_stamp(video_path)
+
+    width, height = scaled_size(*probe_size(video_path), max_side)
+    frame_bytes = width * height * 3
+
+    cmd = [
+        "ffmpeg",
+        "-v", "error",
+        "-i", video_path,
+        "-vf", f"fps={fps},scale={width}:{height}",
+        "-f", "rawvideo",
+        "-pix_fmt", "rgb24",
+        "pipe:1",
+    ]
+
+    n_frames = 0
+    tmp_path = data_path + ".tmp"
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    with open(tmp_path, "wb") as out:
+        while True:
+            chunk = proc.stdout.read(frame_bytes)
+            if len(chunk) < frame_bytes:
+                break
+            out.write(chunk)
+            n_frames += 1
+    stderr = proc.stderr.read()
+    if proc.wait() != 0:
+        os.remove(tmp_path)
+        raise RuntimeError(f"❌ ffmpeg 실패: {stderr.decode(errors='ignore')[-500:]}")
+
+    os.replace(tmp_path, data_path)
+    meta = {
+        "video_path": video_path,
+        "video": stamp,
+        "fps": fps,
+        "max_side": max_side,
+        "shape": [n_frames, height, width, 3],
+    }
+    # 데이터/메타 짝이 어긋나지 않도록 메타도 tmp → os.replace
+    tmp_meta = meta_path + ".tmp"
+    with open(tmp_meta, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_meta, meta_path)
+
+    print(f"💾 프레임 저장소: {data_path} ({n_frames} frames, {width}x{height})")
+    return FrameStore(data_path, meta)
+
+
+# ================================
+# 조회
+# ================================
+class FrameStore:
+    def __init__(self, data_path, meta):
+        self.meta = meta
+        self.fps = meta["fps"]
+        self.frames = np.memmap(data_path, dtype=np.uint8, mode="r", shape=tuple(meta["shape"]))
+
+    @classmethod
+    def open(cls, video_path, fps, max_side, store_dir=STORE_DIR):
+        """영상 / fps / max_side 가 생성 당시와 같을 때만 FrameStore, 아니면 None"""
+        data_path, meta_path = store_paths(video_path, fps, max_side, store_dir)
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return None
+
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("video") != _video_stamp(video_path):
+            print(f"⚠️ 영상이 바뀌어 프레임 저장소 무효: {data_path}")
+            return None
+        if meta.get("fps") != fps or meta.get("max_side") != max_side:
+            print(f"⚠️ fps/max_side 설정이 달라 프레임 저장소 무효: {data_path}")
+            return None
+        return cls(data_path, meta)
+
+    def window(self, start, end):
+        """start <= k / fps < end 인 프레임 (memmap 슬라이스, 복사 없음)
+
+        샘플 시점이 하나도 없는 짧은 window / 영상 끝을 넘는 window 는
+        구간 중앙에 가장 가까운 프레임 1장 (extract_windows 와 동일)
+        """
+        first = max(0, int(np.ceil(start * self.fps - 1e-6)))
+        last = min(len(self.frames), int(np.ceil(end * self.fps - 1e-6)))
+        if first < last or len(self.frames) == 0:
+            return self.frames[first:last]
+        nearest = min(len(self.frames) - 1, max(0, int(round((start + end) / 2 * self.fps))))
+        return self.frames[nearest:nearest + 1]
+
+
+def main():
+    from AI_pipeline.core.pipeline import VIDEO_PATH, FPS, INLINE_MAX_SIDE
+
+    parser = argparse.ArgumentParser(description="챌린지 영상 사전 디코딩 프레임 저장소 생성")
+    parser.add_argument("--video", default=VIDEO_PATH)
+    parser.add_argument("--fps", type=float, default=FPS)
+    parser.add_argument("--max-side", type=int, default=INLINE_MAX_SIDE)
+    args = parser.parse_args()
+
+    build_store(args.video, args.fps, args.max_side)
+
+
+if __name__ == "__main__":
+    main()
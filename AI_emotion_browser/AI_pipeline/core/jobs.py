@@ -0,0 +1,181 @@
+# AI_pipeline/core/jobs.py
+#
+# LLM 파이프라인 백그라운드 작업 큐
+#   - submit() 은 바로 job id 를 돌려주고, 워커(동시 concurrency 개)가 순서대로 처리
+#   - 작업별 제한 시간 / 지수 백오프 재시도
+#   - 큐가 가득 차면 QueueFull (라우트에서 429 로 응답)
+
+import time
+import uuid
+import asyncio
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind, payload, timeout_s=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.payload = payload
+        self.timeout_s = timeout_s
+        self.status = QUEUED
+        self.attempts = 0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "attempts": self.attempts,
+            "timeout_s": self.timeout_s,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """handlers: kind → async fn(payload) → result
+
+    - concurrency : 동시에 실행할 작업 수 (Gemini rate limit 에 맞춰 조절)
+    - max_queue   : 대기 작업 상한 (넘으면 QueueFull)
+    - timeout_s   : 시도 1회 제한 시간 (submit 에서 작업별로 바꿀 수 있음)
+    - retries     : 실패 시 재시도 횟수 (backoff_s * 2^n 만큼 쉬고 재시도)
+    - keep_s      : 끝난 작업 결과 보관 시간
+    """
+
+    def __init__(self, handlers, concurrency=2, max_queue=100, timeout_s=120.0,
+                 retries=2, backoff_s=1.0, keep_s=600.0):
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.timeout_s = timeout_s
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self.keep_s = keep_s
+
+        self.jobs = {}
+        self._queue = None
+        self._workers = []
+
+        self.submitted = 0
+        self.rejected = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    # ------------------------------------------------------------
+    # 시작 / 종료 (FastAPI startup / shutdown 에서 호출)
+    # ------------------------------------------------------------
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"llm-job-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    # ------------------------------------------------------------
+    # 등록 / 조회
+    # ------------------------------------------------------------
+    def submit(self, kind, payload, timeout_s=None):
+        if kind not in self.handlers:
+            raise ValueError(f"unknown job kind: {kind}")
+
+        self._purge()
+        job = Job(kind, payload, timeout_s or self.timeout_s)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFull(f"job queue full ({self.max_queue})")
+
+        self.jobs[job.id] = job
+        self.submitted += 1
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def _purge(self):
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.keep_s
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    # ------------------------------------------------------------
+    # 워커
+    # ------------------------------------------------------------
+    async def _worker(self, index):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job):
+        job.status = RUNNING
+        job.started_at = time.time()
+        handler = self.handlers[job.kind]
+
+        while True:
+            job.attempts += 1
+            try:
+                job.result = await asyncio.wait_for(handler(job.payload), job.timeout_s)
+                job.status = DONE
+                job.error = None
+                self.succeeded += 1
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    job.error = f"timeout after {job.timeout_s:g}s"
+                else:
+                    job.error = f"{type(e).__name__}: {e}"
+                print(f"❌ job {job.id} ({job.kind}) 시도 {job.attempts} 실패: {job.error}")
+
+                if job.attempts > self.retries:
+                    job.status = FAILED
+                    self.failed += 1
+                    break
+                await asyncio.sleep(self.backoff_s * 2 ** (job.attempts - 1))
+
+        job.finished_at = time.time()
+
+    def stats(self):
+        by_status = {}
+        for job in self.jobs.values():
+            by_status[job.status] = by_status.get(job.status, 0) + 1
+        return {
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "jobs": by_status,
+        }
@@ -0,0 +1,63 @@
+# AI_pipeline/core/keyframes.py
+#
+# 키프레임 선택: 구간 안에서 서로 가장 다른 프레임 K 장만 LLM 에 보낸다.
+#   - 프레임마다 작은 흑백 축소본 + 밝기 히스토그램을 특징으로 사용
+#   - 첫 프레임에서 시작해 "이미 고른 프레임들과 가장 먼" 프레임을 하나씩 추가 (farthest-point)
+#   - 고른 뒤에는 시간 순서대로 정렬
+
+import io
+import numpy as np
+from PIL import Image
+
+THUMB_SIDE = 32
+HIST_BINS = 32
+
+
+def frame_features(frame, side=THUMB_SIDE):
+    """JPEG 바이트 또는 RGB 배열 → (흑백 축소본 float32 [side*side], 정규화 히스토그램 [HIST_BINS])"""
+    if isinstance(frame, np.ndarray):
+        img = Image.fromarray(frame)
+    else:
+        img = Image.open(io.BytesIO(frame))
+        img.draft("L", (side * 2, side * 2))  # JPEG DCT 단계에서 축소 디코딩
+    small = np.asarray(img.convert("L").resize((side, side), Image.BILINEAR), dtype=np.float32)
+
+    hist, _ = np.histogram(small, bins=HIST_BINS, range=(0, 256))
+    return small.ravel() / 255.0, hist.astype(np.float32) / small.size
+
+
+def frame_distance(a, b):
+    """0 ~ 1: 픽셀 평균 차이와 히스토그램 차이(L1/2)의 평균"""
+    pixel = float(np.abs(a[0] - b[0]).mean())
+    hist = float(np.abs(a[1] - b[1]).sum()) / 2.0
+    return (pixel + hist) / 2.0
+
+
+def select_keyframes(frames, budget, min_diff=0.0):
+    """가장 서로 다른 프레임을 최대 budget 장 고른다 (시간 순서 유지)
+
+    min_diff 보다 가까운 프레임만 남으면 budget 전이라도 멈춘다 (정적인 구간).
+    반환: (고른 인덱스 리스트, 각 인덱스의 선택 당시 거리 리스트)
+    """
+    n = len(frames)
+    if budget <= 0 or n <= 1:
+        return list(range(n)), [1.0] * n
+
+    features = [frame_features(f) for f in frames]
+
+    selected = [0]
+    scores = {0: 1.0}
+    # 각 프레임 → 지금까지 고른 프레임들과의 최소 거리
+    nearest = [frame_distance(features[0], f) for f in features]
+
+    while len(selected) < min(budget, n):
+        k = int(np.argmax(nearest))
+        if nearest[k] <= min_diff:
+            break
+        selected.append(k)
+        scores[k] = nearest[k]
+        for i, f in enumerate(features):
+            nearest[i] = min(nearest[i], frame_distance(features[k], f))
+
+    selected.sort()
+    return selected, [round(scores[k], 4) for k in selected]
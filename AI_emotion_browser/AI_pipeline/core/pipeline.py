@@ -1,34 +1,400 @@
 # AI_pipeline/core/pipeline.py
 
-from AI_pipeline.core.timer_module import extract_frames, get_frame_paths
+import os
+import time
+import asyncio
+
+from AI_pipeline.core.timer_module import extract_frames, extract_windows
 from AI_pipeline.core.ai_module import (
-    upload_frames_to_gemini,
-    wait_until_active,
-    analyze_frames_with_llm,
-    cleanup_gemini_files
+    upload_frames_async,
+    wait_until_active_async,
+    analyze_frames_async,
+    analyze_inline_async,
+    cleanup_in_background,
+    MODEL_NAME,
+    PROMPT,
+)
+from AI_pipeline.core.result_cache import ResultCache, make_key, quantize_window, video_hash
+from AI_pipeline.core.video_index import VideoIndex, default_index_path
+from AI_pipeline.core.keyframes import select_keyframes
+from AI_pipeline.core.frame_store import FrameStore, encode_jpeg, store_paths
+
+VIDEO_PATH = os.getenv("PIPELINE_VIDEO_PATH", "/workspace/AI_emotion_browser/AI_pipeline/video/ppangppangi2.mp4")
+FPS = 2
+
+# 배치 분석 시 동시에 진행할 이벤트 수 (Gemini rate limit 에 맞춰 조절)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+# ------------------------------------------------------------
+# 전송 방식
+# ------------------------------------------------------------
+# inline : 축소한 JPEG 를 generate_content 1회에 바로 넣는다 (업로드/대기/삭제 없음)
+# files  : 원본 해상도 프레임을 Files API 로 업로드 후 분석
+# auto   : 축소본 총 크기가 INLINE_MAX_BYTES 이하면 inline, 아니면 축소본을 files 로
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "auto")
+INLINE_MAX_SIDE = int(os.getenv("INLINE_MAX_SIDE", "768"))
+INLINE_QUALITY = int(os.getenv("INLINE_QUALITY", "80"))
+# Gemini inline 요청 한도(20MB)보다 여유 있게
+INLINE_MAX_BYTES = int(os.getenv("INLINE_MAX_BYTES", str(15 * 1024 * 1024)))
+
+
+# ------------------------------------------------------------
+# 결과 캐시 (같은 영상 · 비슷한 구간이면 LLM 호출 없이 반환)
+# ------------------------------------------------------------
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") == "1"
+# 구간 양 끝을 이 단위(초)로 반올림해서 분석/캐시 (0 이면 반올림 안 함)
+CACHE_GRANULARITY_S = float(os.getenv("CACHE_GRANULARITY_S", "0.5"))
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache"))
+CACHE_MEMORY_ENTRIES = int(os.getenv("CACHE_MEMORY_ENTRIES", "256"))
+CACHE_TTL_S = float(os.getenv("CACHE_TTL_S", str(7 * 24 * 3600)))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+result_cache = ResultCache(
+    CACHE_DIR if CACHE_ENABLED else "",
+    max_entries=CACHE_MEMORY_ENTRIES,
+    ttl_s=CACHE_TTL_S,
+    max_bytes=CACHE_MAX_BYTES,
 )
 
-VIDEO_PATH = "/workspace/AI_emotion_browser/AI_pipeline/video/ppangppangi2.mp4"
 
+def _cache_key(video_path, start, end, mode):
+    if not CACHE_ENABLED:
+        return None
+    tag = f"{_sampling_tag()}|{_transfer_tag(mode)}"
+    return make_key(video_hash(video_path), start, end, tag, MODEL_NAME, PROMPT)
+
+
+async def _cache_lookup(video_path, start, end, mode):
+    """(quantized start, end, key, 캐시된 결과 또는 None)"""
+    if not CACHE_ENABLED:
+        return start, end, None, None
+    start, end = quantize_window(start, end, CACHE_GRANULARITY_S)
+    key = await asyncio.to_thread(_cache_key, video_path, start, end, mode)
+    value = await asyncio.to_thread(result_cache.get, key)
+    return start, end, key, value
+
+
+def _from_cache(value, t0, source="cache"):
+    return {
+        **value,
+        "cache_hit": source == "cache",
+        "pipeline": {
+            "mode": source,
+            "frames": 0,
+            "bytes_sent": 0,
+            "latency_ms": {"total": round((time.perf_counter() - t0) * 1000.0, 1)},
+        },
+    }
+
+
+async def _cache_store(key, result):
+    if key is not None:
+        value = {k: result[k] for k in ("tags", "labels", "summary")}
+        await asyncio.to_thread(result_cache.put, key, value)
+
+
+# ------------------------------------------------------------
+# 사전 분석 인덱스 (python -m AI_pipeline.core.video_index 로 생성)
+# ------------------------------------------------------------
+# 인덱스가 있는 영상은 LLM 없이 겹치는 window 결과를 합쳐서 응답
+INDEX_ENABLED = os.getenv("VIDEO_INDEX_ENABLED", "1") == "1"
+VIDEO_INDEX_PATH = os.getenv("VIDEO_INDEX_PATH", default_index_path(VIDEO_PATH))
+
+# video_path → ((영상 stat, 인덱스 stat), VideoIndex 또는 None)
+_indexes = {}
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+    except OSError:
+        return None
+
+
+def load_video_index(video_path):
+    """영상/모델/프롬프트가 일치하는 인덱스 (없거나 다르면 None, 파일이 바뀌면 다시 읽음)"""
+    path = VIDEO_INDEX_PATH if video_path == VIDEO_PATH else default_index_path(video_path)
+    stamp = (_stamp(video_path), _stamp(path))
+
+    cached = _indexes.get(video_path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    index = None
+    if stamp[0] is not None and stamp[1] is not None:
+        try:
+            loaded = VideoIndex.load(path)
+            if loaded.matches(video_hash(video_path), MODEL_NAME, PROMPT):
+                index = loaded
+                print(f"🗂️ 사전 분석 인덱스 사용: {path} ({len(loaded.entries)} windows)")
+            else:
+                print(f"⚠️ 인덱스가 현재 영상/모델/프롬프트와 다름 → 실시간 분석: {path}")
+        except Exception as e:
+            print(f"⚠️ 인덱스 로드 실패 → 실시간 분석: {e}")
+
+    _indexes[video_path] = (stamp, index)
+    return index
+
+
+async def _index_lookup(video_path, start, end, t0):
+    if not INDEX_ENABLED:
+        return None
+    index = await asyncio.to_thread(load_video_index, video_path)
+    if index is None:
+        return None
+    merged = index.lookup(start, end)
+    if merged is None:
+        return None
+    return _from_cache(merged, t0, source="index")
+
+
+# ------------------------------------------------------------
+# 키프레임 선택 (구간에서 서로 가장 다른 K 장만 전송)
+# ------------------------------------------------------------
+# 0 이면 추출한 프레임 전부 전송 (기존 동작)
+KEYFRAME_BUDGET = int(os.getenv("KEYFRAME_BUDGET", "4"))
+# 이미 고른 프레임과 이 값(0~1) 이하로 비슷한 프레임만 남으면 budget 전이라도 멈춤
+KEYFRAME_MIN_DIFF = float(os.getenv("KEYFRAME_MIN_DIFF", "0.03"))
+
+
+def _sampling_tag():
+    """캐시 키용: 추출 fps + 키프레임 설정 (설정이 바뀌면 결과도 달라지므로)"""
+    if KEYFRAME_BUDGET <= 0:
+        return str(FPS)
+    return f"{FPS}/k{KEYFRAME_BUDGET}/{KEYFRAME_MIN_DIFF:g}"
+
+
+def _transfer_tag(mode):
+    """캐시 키용: 전송 모드 + 프레임 축소/화질 (모델이 보는 이미지가 달라지므로)
+
+    auto 는 INLINE_MAX_BYTES 에 따라 inline/files 가 갈리므로 그 값까지 포함
+    """
+    max_side, quality = _extract_options(mode)
+    tag = f"{mode}/{max_side}/q{quality}"
+    if mode not in ("inline", "files"):
+        tag += f"/{INLINE_MAX_BYTES}"
+    return tag
+
+
+# ------------------------------------------------------------
+# 사전 디코딩 프레임 저장소 (python -m AI_pipeline.core.frame_store 로 생성)
+# ------------------------------------------------------------
+# 저장소가 있는 영상은 ffmpeg 없이 memmap 슬라이스로 구간 프레임을 얻는다 (files 모드 제외)
+FRAME_STORE_ENABLED = os.getenv("FRAME_STORE_ENABLED", "1") == "1"
+
+# video_path → (영상 stat, FrameStore 또는 None)
+_frame_stores = {}
+
+
+def open_frame_store(video_path):
+    """영상/저장소 파일이 바뀌면 다시 연다 (요청 도중 생성·재생성된 저장소도 반영)"""
+    data_path, meta_path = store_paths(video_path, FPS, INLINE_MAX_SIDE)
+    stamp = (_stamp(video_path), _stamp(data_path), _stamp(meta_path))
+    cached = _frame_stores.get(video_path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
 
-def run_llm_pipeline(start, end):
-    """시작/끝 초 입력받고 → 프레임 추출 → LLM 분석"""
-    extract_frames(VIDEO_PATH, start, end, fps=2)
+    store = None
+    try:
+        store = FrameStore.open(video_path, FPS, INLINE_MAX_SIDE)
+        if store is not None:
+            print(f"🗃️ 프레임 저장소 사용: {video_path} {tuple(store.frames.shape)}")
+    except Exception as e:
+        print(f"⚠️ 프레임 저장소 열기 실패 → ffmpeg 사용: {e}")
 
-    frames = get_frame_paths()
+    _frame_stores[video_path] = (stamp, store)
+    return store
+
+
+def _frame_source(video_path, mode):
+    if not FRAME_STORE_ENABLED or mode == "files":
+        return None
+    return open_frame_store(video_path)
+
+
+def _to_jpegs(frames):
+    """저장소 프레임(ndarray)은 보낼 것만 여기서 JPEG 인코딩"""
+    return [f if isinstance(f, bytes) else encode_jpeg(f, INLINE_QUALITY) for f in frames]
+
+
+def choose_mode(total_inline_bytes, mode=PIPELINE_MODE):
+    if mode in ("inline", "files"):
+        return mode
+    return "inline" if total_inline_bytes <= INLINE_MAX_BYTES else "files"
+
+
+async def _run_files(frames, timings):
+    started = time.perf_counter()
+    file_ids = await upload_frames_async(frames)
+    timings["upload"] = time.perf_counter() - started
+
+    try:
+        started = time.perf_counter()
+        files = await wait_until_active_async(file_ids)
+        timings["active"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        result = await analyze_frames_async(files)
+        timings["llm"] = time.perf_counter() - started
+    finally:
+        cleanup_in_background(file_ids)
+
+    return result
+
+
+async def _run_inline(frames, timings):
+    started = time.perf_counter()
+    result = await analyze_inline_async(frames)
+    timings["llm"] = time.perf_counter() - started
+    return result
+
+
+def _extract_options(mode):
+    """(max_side, quality) — files 모드만 원본 해상도"""
+    if mode == "files":
+        return 0, 75
+    return INLINE_MAX_SIDE, INLINE_QUALITY
+
+
+async def _analyze(frames, start, mode, timings, t0):
     if not frames:
-        raise RuntimeError("❌ 프레임 추출 실패 — 파일이 없음.")
+        raise RuntimeError("❌ 프레임 추출 실패 — 프레임이 없음.")
+
+    candidates = len(frames)
+    started = time.perf_counter()
+    selected, scores = await asyncio.to_thread(select_keyframes, frames, KEYFRAME_BUDGET, KEYFRAME_MIN_DIFF)
+    timings["keyframes"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    frames = await asyncio.to_thread(_to_jpegs, [frames[k] for k in selected])
+    timings["encode"] = time.perf_counter() - started
 
-    file_ids = upload_frames_to_gemini(frames)
-    wait_until_active(file_ids)
+    bytes_sent = sum(len(b) for b in frames)
+    chosen = choose_mode(bytes_sent, mode)
 
-    llm_result = analyze_frames_with_llm(file_ids)
+    if chosen == "inline":
+        llm_result = await _run_inline(frames, timings)
+    else:
+        llm_result = await _run_files(frames, timings)
 
-    cleanup_gemini_files(file_ids)
+    timings["total"] = time.perf_counter() - t0
+    print(f"⏱️ [{chosen}] frames={len(frames)}/{candidates} bytes={bytes_sent} "
+          + " ".join(f"{k}={v:.2f}s" for k, v in timings.items()))
 
+    llm_result["cache_hit"] = False
+    llm_result["pipeline"] = {
+        "mode": chosen,
+        "frames": len(frames),
+        "bytes_sent": bytes_sent,
+        "latency_ms": {k: round(v * 1000.0, 1) for k, v in timings.items()},
+        # 감사용: 후보 중 어떤 프레임을 보냈는지 (시각은 start + index / FPS 근사)
+        "keyframes": {
+            "candidates": candidates,
+            "budget": KEYFRAME_BUDGET,
+            "selected": selected,
+            "timestamps": [round(start + k / FPS, 2) for k in selected],
+            "scores": scores,
+        },
+    }
     return llm_result
 
 
+async def run_llm_pipeline_async(start, end, mode=PIPELINE_MODE, video_path=VIDEO_PATH):
+    """시작/끝 초 입력받고 → 프레임 추출 → (inline | files) LLM 분석
+
+    반환: {"tags", "labels", "summary", "pipeline": {mode, frames, bytes_sent, latency_ms}}
+    """
+    timings = {}
+    t0 = time.perf_counter()
+
+    indexed = await _index_lookup(video_path, start, end, t0)
+    if indexed is not None:
+        return indexed
+
+    start, end, key, cached = await _cache_lookup(video_path, start, end, mode)
+    if cached is not None:
+        print(f"⚡ 캐시 적중 [{start}, {end}]")
+        return _from_cache(cached, t0)
+
+    store = await asyncio.to_thread(_frame_source, video_path, mode)
+    if store is not None:
+        frames = list(store.window(start, end))
+    else:
+        # ffmpeg 는 블로킹이라 이벤트 루프 밖에서 (축소도 ffmpeg 안에서 → 인코딩 1회)
+        max_side, quality = _extract_options(mode)
+        frames = await asyncio.to_thread(extract_frames, video_path, start, end, FPS, max_side, quality)
+    timings["extract"] = time.perf_counter() - t0
+
+    result = await _analyze(frames, start, mode, timings, t0)
+    await _cache_store(key, result)
+    return result
+
+
+async def run_llm_batch_async(events, mode=PIPELINE_MODE, video_path=VIDEO_PATH, use_index=True):
+    """세션의 웃음 이벤트 전체를 한 번에 분석
+
+    events: [(event_id, start, end), ...]
+    - 겹치거나 가까운 구간은 합쳐서 구간당 ffmpeg 디코딩 1회
+    - 이벤트별 LLM 분석은 BATCH_CONCURRENCY 개까지 동시에
+    - 인덱스/캐시에 있는 이벤트는 추출/분석 없이 바로
+    반환: 이벤트 순서대로 {"event_id", "success", ...결과 또는 "error"}
+    """
+    t0 = time.perf_counter()
+    results = [None] * len(events)
+
+    misses = []
+    for i, (event_id, start, end) in enumerate(events):
+        indexed = await _index_lookup(video_path, start, end, t0) if use_index else None
+        if indexed is not None:
+            results[i] = {"event_id": event_id, "success": True, **indexed}
+            continue
+
+        start, end, key, cached = await _cache_lookup(video_path, start, end, mode)
+        if cached is not None:
+            results[i] = {"event_id": event_id, "success": True, **_from_cache(cached, t0)}
+        else:
+            misses.append((i, event_id, start, end, key))
+
+    if misses:
+        windows = [(start, end) for _, _, start, end, _ in misses]
+        store = await asyncio.to_thread(_frame_source, video_path, mode)
+        if store is not None:
+            frames_per_event = [list(store.window(start, end)) for start, end in windows]
+        else:
+            max_side, quality = _extract_options(mode)
+            frames_per_event = await asyncio.to_thread(
+                extract_windows, video_path, windows, FPS, max_side, quality
+            )
+        extract_s = time.perf_counter() - t0
+
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+        async def analyze_one(i, event_id, start, key, frames):
+            async with semaphore:
+                try:
+                    timings = {"extract": extract_s}
+                    result = await _analyze(frames, start, mode, timings, t0)
+                    await _cache_store(key, result)
+                    results[i] = {"event_id": event_id, "success": True, **result}
+                except Exception as e:
+                    print(f"❌ 이벤트 {event_id} 분석 실패:", e)
+                    results[i] = {"event_id": event_id, "success": False, "error": f"{type(e).__name__}: {e}"}
+
+        await asyncio.gather(*(
+            analyze_one(i, event_id, start, key, frames)
+            for (i, event_id, start, _, key), frames in zip(misses, frames_per_event)
+        ))
+
+    print(f"⏱️ batch events={len(events)} total={time.perf_counter() - t0:.2f}s")
+    return results
+
+
+def run_llm_pipeline(start, end, mode=PIPELINE_MODE, video_path=VIDEO_PATH):
+    """동기 호출용 (단독 실행 / 스크립트)"""
+    return asyncio.run(run_llm_pipeline_async(start, end, mode, video_path))
+
+
 if __name__ == "__main__":
     print("🔥 LLM 파이프라인 단독 실행 테스트!")
     result = run_llm_pipeline(12, 16)
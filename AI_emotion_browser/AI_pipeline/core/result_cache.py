@@ -0,0 +1,182 @@
+# AI_pipeline/core/result_cache.py
+#
+# LLM 구간 분석 결과 캐시
+#   - 키: 영상 내용 해시 + 양자화한 구간 + fps + 모델 이름 + PROMPT 해시
+#   - 1단계: 메모리 LRU, 2단계: 디스크 JSON (TTL + 총 크기 제한)
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+_video_hashes = {}
+_video_lock = threading.Lock()
+
+
+def video_hash(path):
+    """영상 파일 내용 sha256 (경로 + 크기 + 수정 시각이 같으면 다시 읽지 않음)"""
+    st = os.stat(path)
+    stamp = (path, st.st_size, st.st_mtime_ns)
+
+    with _video_lock:
+        if stamp in _video_hashes:
+            return _video_hashes[stamp]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+
+    with _video_lock:
+        _video_hashes[stamp] = digest
+    return digest
+
+
+def quantize_window(start, end, granularity):
+    """구간 양 끝을 granularity 초 단위로 반올림 (최소 1칸)"""
+    if granularity <= 0:
+        return start, end
+    q_start = round(start / granularity) * granularity
+    q_end = max(q_start + granularity, round(end / granularity) * granularity)
+    return round(q_start, 3), round(q_end, 3)
+
+
+def make_key(video_digest, start, end, fps, model, prompt):
+    prompt_digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+    raw = f"{video_digest}|{start:.3f}|{end:.3f}|{fps}|{model}|{prompt_digest}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """메모리 LRU(max_entries) 위에 디스크 저장소(ttl_s, max_bytes)를 둔 2단 캐시"""
+
+    def __init__(self, cache_dir, max_entries=256, ttl_s=7 * 24 * 3600, max_bytes=50 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+
+        # key → (stored_at, value)
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _fresh(self, stored_at):
+        return self.ttl_s <= 0 or time.time() - stored_at <= self.ttl_s
+
+    # ------------------------------------------------------------
+    # 조회 / 저장
+    # ------------------------------------------------------------
+    def get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._fresh(entry[0]):
+                    self._memory.move_to_end(key)
+                    self.hits_memory += 1
+                    return entry[1]
+                del self._memory[key]
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits_disk += 1
+            self._remember(key, entry)
+        return entry[1]
+
+    def put(self, key, value):
+        entry = (time.time(), value)
+        with self._lock:
+            self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    # ------------------------------------------------------------
+    # 디스크
+    # ------------------------------------------------------------
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if not self._fresh(data["stored_at"]):
+            self._remove(path)
+            return None
+        return data["stored_at"], data["value"]
+
+    def _write_disk(self, key, entry):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"stored_at": entry[0], "value": entry[1]}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        self._evict_disk()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            self.evictions += 1
+        except OSError:
+            pass
+
+    def _evict_disk(self):
+        """만료 항목 삭제 후, 총 크기가 max_bytes 를 넘으면 오래된 것부터 삭제"""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if self.ttl_s > 0 and time.time() - st.st_mtime > self.ttl_s:
+                self._remove(path)
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_rate": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
@@ -1,54 +1,135 @@
 # AI_pipeline/core/timer_module.py
 
-import os
 import subprocess
-from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
 
-# 프레임 저장 폴더
-FRAME_DIR = "/workspace/AI_emotion_browser/AI_pipeline/frames"
-os.makedirs(FRAME_DIR, exist_ok=True)
+# 요청마다 ffmpeg 출력을 파이프로 받아 메모리에만 둔다
+# (공유 폴더에 쓰지 않으므로 동시 요청끼리 프레임이 섞이지 않음)
+JPEG_SOI = b"\xff\xd8"
+JPEG_EOI = b"\xff\xd9"
 
 
-def extract_frames(video_path, start, end, fps=2):
-    """FFmpeg로 특정 구간 프레임 추출"""
-    duration = end - start
+def jpeg_qscale(quality):
+    """PIL 식 quality(1~95) → ffmpeg mjpeg -q:v (2=최고 ~ 31=최저) 근사 변환"""
+    return max(2, min(31, round(31 - quality * 0.29)))
+
+
+def _scale_filter(max_side):
+    # 긴 변만 max_side 이하로, 짧은 변은 비율 유지(짝수)
+    return (
+        f"scale='if(gt(iw,ih),min(iw,{max_side}),-2)'"
+        f":'if(gt(iw,ih),-2,min(ih,{max_side}))'"
+    )
+
+
+def split_jpeg_stream(data):
+    """image2pipe(mjpeg) 출력 → 프레임별 JPEG 바이트
 
-    # 기존 JPG 삭제
-    for f in os.listdir(FRAME_DIR):
-        if f.endswith(".jpg"):
-            os.remove(os.path.join(FRAME_DIR, f))
+    mjpeg 엔트로피 구간은 0xFF 가 바이트 스터핑되므로 FFD9 FFD8 은 프레임 경계에만 나온다.
+    """
+    if not data:
+        return []
+    parts = data.split(JPEG_EOI + JPEG_SOI)
+    frames = []
+    for i, part in enumerate(parts):
+        if i > 0:
+            part = JPEG_SOI + part
+        if i < len(parts) - 1:
+            part = part + JPEG_EOI
+        frames.append(part)
+    return frames
+
+
+def extract_frames(video_path, start, end, fps=2, max_side=0, quality=75):
+    """FFmpeg로 특정 구간 프레임 추출 → JPEG 바이트 리스트 (디스크 사용 없음)
+
+    max_side > 0 이면 ffmpeg 안에서 축소까지 해서 프레임당 인코딩은 1번뿐이다.
+    """
+    duration = end - start
 
-    output_pattern = os.path.join(FRAME_DIR, "frame_%03d.jpg")
+    vf = f"fps={fps}"
+    if max_side > 0:
+        vf += "," + _scale_filter(max_side)
 
     cmd = [
         "ffmpeg",
-        "-y",
+        "-v", "error",
         "-ss", str(start),
         "-t", str(duration),
         "-i", video_path,
-        "-vf", f"fps={fps}",
-        output_pattern
+        "-vf", vf,
+        "-f", "image2pipe",
+        "-vcodec", "mjpeg",
+        "-pix_fmt", "yuvj420p",
+        "-q:v", str(jpeg_qscale(quality)),
+        "pipe:1",
     ]
 
-    subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        raise RuntimeError(f"❌ ffmpeg 실패: {proc.stderr.decode(errors='ignore')[-500:]}")
 
-    # JPEG 헤더 깨짐 방지
-    normalize_all_jpg()
+    return split_jpeg_stream(proc.stdout)
 
 
-def normalize_all_jpg():
-    """JPG 파일 깨짐 방지"""
-    for filename in os.listdir(FRAME_DIR):
-        if filename.endswith(".jpg"):
-            path = os.path.join(FRAME_DIR, filename)
-            img = Image.open(path).convert("RGB")
-            img.save(path, "JPEG")
+def merge_windows(windows, max_gap=1.0):
+    """[(start, end), ...] → 겹치거나 max_gap 초 이내로 붙은 구간끼리 합친 [(start, end), ...]"""
+    spans = []
+    for start, end in sorted(windows):
+        if spans and start <= spans[-1][1] + max_gap:
+            spans[-1][1] = max(spans[-1][1], end)
+        else:
+            spans.append([start, end])
+    return [tuple(span) for span in spans]
 
 
-def get_frame_paths():
-    """추출된 프레임 파일 경로 반환"""
-    return sorted([
-        os.path.join(FRAME_DIR, f)
-        for f in os.listdir(FRAME_DIR)
-        if f.endswith(".jpg")
-    ])
+def extract_windows(video_path, windows, fps=2, max_side=0, quality=75, max_gap=1.0):
+    """여러 구간을 한 번에 추출 → windows 순서대로 JPEG 바이트 리스트
+
+    합친 구간마다 ffmpeg 를 한 번만 돌리고(구간끼리는 병렬),
+    프레임 시각(span_start + k / fps)으로 각 window 에 나눠 준다.
+    샘플 시점이 하나도 안 들어가는 window 는 가장 가까운 프레임 1장을 받는다.
+    """
+    spans = merge_windows(windows, max_gap)
+
+    with ThreadPoolExecutor(max_workers=min(4, len(spans)) or 1) as pool:
+        span_frames = list(pool.map(
+            lambda span: extract_frames(video_path, span[0], span[1], fps, max_side, quality),
+            spans,
+        ))
+
+    results = []
+    for start, end in windows:
+        frames = []
+        nearest = None  # (시각 차이, 프레임): 샘플 시점 사이에 낀 짧은 window 용
+        middle = (start + end) / 2
+        for (span_start, span_end), decoded in zip(spans, span_frames):
+            if end <= span_start or start >= span_end:
+                continue
+            for k, data in enumerate(decoded):
+                t = span_start + k / fps
+                if start <= t < end:
+                    frames.append(data)
+                elif nearest is None or abs(t - middle) < nearest[0]:
+                    nearest = (abs(t - middle), data)
+
+        if not frames:
+            # 1/fps 보다 짧은 window → 가장 가까운 프레임, 그것도 없으면 단독 추출 (/laugh-event 와 동일)
+            frames = [nearest[1]] if nearest else extract_frames(video_path, start, end, fps, max_side, quality)
+        results.append(frames)
+    return results
+
+
+def probe_duration(video_path):
+    """ffprobe 로 영상 길이(초)"""
+    cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        video_path,
+    ]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        raise RuntimeError(f"❌ ffprobe 실패: {proc.stderr.decode(errors='ignore')[-500:]}")
+    return float(proc.stdout.strip())
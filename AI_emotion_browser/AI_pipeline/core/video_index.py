@@ -0,0 +1,176 @@
+# AI_pipeline/core/video_index.py
+#
+# 챌린지 영상 사전 분석 인덱스
+#   - 영상 전체를 겹치는 window 로 미리 LLM 분석해서 JSON 하나로 저장 (오프라인 1회)
+#   - /laugh-event 요청 시 [start, end] 와 겹치는 항목만 합쳐서 바로 응답
+#
+# 인덱스 생성 (AI_emotion_browser/ 에서):
+#   python -m AI_pipeline.core.video_index --window 4 --stride 2
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+from collections import Counter
+
+from AI_pipeline.core.result_cache import video_hash
+
+INDEX_VERSION = 1
+INDEX_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "index")
+
+
+def default_index_path(video_path):
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    return os.path.join(INDEX_DIR, f"{name}.index.json")
+
+
+def prompt_hash(prompt):
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+class VideoIndex:
+    """일정 간격(stride_s) window 의 분석 결과 배열
+
+    entries[k] = [start, end, tags, labels, summary]  (start = k * stride_s)
+    마지막 항목은 영상 끝에 맞춘 tail window 일 수 있음 (start = duration - window_s)
+    """
+
+    def __init__(self, meta, entries):
+        self.meta = meta
+        self.entries = entries
+        self.window_s = meta["window_s"]
+        self.stride_s = meta["stride_s"]
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"index version mismatch: {data.get('version')}")
+        return cls(data["meta"], data["entries"])
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": INDEX_VERSION, "meta": self.meta, "entries": self.entries},
+                f, ensure_ascii=False, separators=(",", ":"),
+            )
+        os.replace(tmp, path)
+
+    def matches(self, digest, model, prompt):
+        return (
+            self.meta["video_hash"] == digest
+            and self.meta["model"] == model
+            and self.meta["prompt_hash"] == prompt_hash(prompt)
+        )
+
+    # ------------------------------------------------------------
+    # 조회: 겹치는 window 만 (stride 로 바로 인덱싱)
+    # ------------------------------------------------------------
+    def overlapping(self, start, end):
+        first = max(0, int((start - self.window_s) // self.stride_s))
+        # +1: stride 격자에서 벗어난 tail window 도 확인
+        last = min(len(self.entries) - 1, int(end // self.stride_s) + 1)
+
+        found = []
+        for k in range(first, last + 1):
+            entry = self.entries[k]
+            overlap = min(end, entry[1]) - max(start, entry[0])
+            if overlap > 0:
+                found.append((overlap, entry))
+        return found
+
+    def lookup(self, start, end, max_tags=5):
+        """겹치는 window 결과를 겹친 길이로 가중해서 합침 (없으면 None)
+
+        - tags   : 가중 빈도 상위 max_tags 개
+        - labels : 겹친 길이의 절반 이상에서 나온 라벨
+        - summary: 가장 많이 겹친 window 의 요약
+        """
+        found = self.overlapping(start, end)
+        if not found:
+            return None
+
+        tag_weight = Counter()
+        label_weight = Counter()
+        total = 0.0
+        for overlap, (_, _, tags, labels, _) in found:
+            total += overlap
+            for tag in dict.fromkeys(tags):
+                tag_weight[tag] += overlap
+            for label in dict.fromkeys(labels):
+                label_weight[label] += overlap
+
+        best = max(found, key=lambda item: item[0])[1]
+        return {
+            "tags": [tag for tag, _ in tag_weight.most_common(max_tags)],
+            "labels": [label for label, w in label_weight.most_common() if w >= total / 2],
+            "summary": best[4],
+            "windows": len(found),
+        }
+
+
+# ================================
+# 인덱스 생성 (오프라인)
+# ================================
+async def build_index(video_path, window_s=4.0, stride_s=2.0, mode=None):
+    from AI_pipeline.core.timer_module import probe_duration
+    from AI_pipeline.core.ai_module import MODEL_NAME, PROMPT
+    from AI_pipeline.core import pipeline
+
+    duration = probe_duration(video_path)
+    starts = [k * stride_s for k in range(int(max(0.0, duration - window_s) // stride_s) + 1)]
+    # 마지막 전체 window 뒤에 남는 꼬리 구간도 인덱싱 (영상 끝에 맞춘 window 하나 추가)
+    if starts[-1] + window_s < duration:
+        starts.append(round(max(0.0, duration - window_s), 3))
+    events = [(k, start, min(duration, start + window_s)) for k, start in enumerate(starts)]
+    print(f"🗂️ {video_path}: {duration:.1f}s → window {len(events)} 개 ({window_s}s / stride {stride_s}s)")
+
+    # 인덱스 자체를 만드는 중이므로 기존 인덱스는 보지 않는다 (캐시는 사용)
+    results = await pipeline.run_llm_batch_async(
+        events, mode or pipeline.PIPELINE_MODE, video_path=video_path, use_index=False
+    )
+
+    entries = []
+    for (_, start, end), r in zip(events, results):
+        if not r["success"]:
+            raise RuntimeError(f"❌ window [{start}, {end}] 분석 실패: {r['error']}")
+        entries.append([start, end, r["tags"], r["labels"], r["summary"]])
+
+    meta = {
+        "video_path": video_path,
+        "video_hash": video_hash(video_path),
+        "duration_s": duration,
+        "window_s": window_s,
+        "stride_s": stride_s,
+        "fps": pipeline.FPS,
+        "model": MODEL_NAME,
+        "prompt_hash": prompt_hash(PROMPT),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    return VideoIndex(meta, entries)
+
+
+def main():
+    from AI_pipeline.core.pipeline import VIDEO_PATH
+
+    parser = argparse.ArgumentParser(description="챌린지 영상 사전 분석 인덱스 생성")
+    parser.add_argument("--video", default=VIDEO_PATH)
+    parser.add_argument("--window", type=float, default=4.0, help="window 길이(초)")
+    parser.add_argument("--stride", type=float, default=2.0, help="window 간격(초)")
+    parser.add_argument("--mode", choices=("auto", "inline", "files"), default=None)
+    parser.add_argument("--out", default="")
+    args = parser.parse_args()
+
+    index = asyncio.run(build_index(args.video, args.window, args.stride, args.mode))
+    out = args.out or default_index_path(args.video)
+    index.save(out)
+    print(f"💾 인덱스 저장: {out} ({len(index.entries)} windows)")
+
+
+if __name__ == "__main__":
+    main()
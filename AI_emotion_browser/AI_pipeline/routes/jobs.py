@@ -0,0 +1,107 @@
+import os
+import math
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+
+from AI_pipeline.core.jobs import JobQueue, QueueFull
+from AI_pipeline.core.pipeline import BATCH_CONCURRENCY
+from AI_pipeline.routes.laugh_event import LlmRequest, LlmBatchRequest, analyze_event, analyze_events
+
+router = APIRouter()
+
+# ------------------------------------------------------------
+# 작업 큐 설정
+# ------------------------------------------------------------
+# 동시에 돌릴 분석 작업 수 (Gemini rate limit 에 맞춰 조절)
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "2"))
+# 대기 작업 상한 (넘으면 429 + Retry-After)
+JOB_MAX_QUEUE = int(os.getenv("JOB_MAX_QUEUE", "100"))
+# 시도 1회 제한 시간: 단건 작업 기준. 세션 배치 작업은 청크 수만큼 곱해서 늘어난다
+JOB_TIMEOUT_S = float(os.getenv("JOB_TIMEOUT_S", "120"))
+# 세션 배치 작업을 이 개수씩 나눠 분석 (성공한 window 는 재시도 때 다시 돌리지 않음)
+JOB_BATCH_CHUNK = int(os.getenv("JOB_BATCH_CHUNK", str(BATCH_CONCURRENCY * 2)))
+JOB_RETRIES = int(os.getenv("JOB_RETRIES", "2"))
+JOB_BACKOFF_S = float(os.getenv("JOB_BACKOFF_S", "1.0"))
+# 끝난 작업 결과 보관 시간
+JOB_KEEP_S = float(os.getenv("JOB_KEEP_S", "600"))
+
+async def analyze_events_resumable(payload):
+    """세션 배치 작업: 청크 단위로 분석하고 성공한 window 결과를 payload["_done"] 에 남긴다
+
+    시간 초과 / 오류로 재시도되면 아직 성공하지 못한 window 만 다시 분석한다.
+    """
+    done = payload.setdefault("_done", {})
+    failed = {}
+    pending = [ev for ev in payload["events"] if str(ev["event_id"]) not in done]
+
+    for i in range(0, len(pending), JOB_BATCH_CHUNK):
+        chunk = LlmBatchRequest(events=pending[i:i + JOB_BATCH_CHUNK])
+        for r in (await analyze_events(chunk))["results"]:
+            key = str(r["event_id"])
+            if r["success"]:
+                done[key] = r
+            else:
+                failed[key] = r
+
+    results = []
+    for ev in payload["events"]:
+        key = str(ev["event_id"])
+        results.append(done.get(key) or failed[key])
+    return {"success": True, "results": results}
+
+
+def batch_timeout_s(n_events):
+    """window 수에 비례한 배치 작업 제한 시간 (청크 1개당 JOB_TIMEOUT_S)"""
+    return JOB_TIMEOUT_S * max(1, math.ceil(n_events / JOB_BATCH_CHUNK))
+
+
+job_queue = JobQueue(
+    {
+        "laugh_event": lambda payload: analyze_event(LlmRequest(**payload)),
+        "laugh_events_batch": analyze_events_resumable,
+    },
+    concurrency=JOB_CONCURRENCY,
+    max_queue=JOB_MAX_QUEUE,
+    timeout_s=JOB_TIMEOUT_S,
+    retries=JOB_RETRIES,
+    backoff_s=JOB_BACKOFF_S,
+    keep_s=JOB_KEEP_S,
+)
+
+
+def _submit(kind, payload, timeout_s=None):
+    try:
+        job = job_queue.submit(kind, payload, timeout_s=timeout_s)
+    except QueueFull as e:
+        return JSONResponse(
+            status_code=429,
+            content={"success": False, "error": str(e)},
+            headers={"Retry-After": "5"},
+        )
+    # wait_s: 재시도까지 포함한 최대 소요 시간 (클라이언트 폴링 마감 계산용)
+    wait_s = job.timeout_s * (JOB_RETRIES + 1) + JOB_BACKOFF_S * (2 ** JOB_RETRIES - 1)
+    return JSONResponse(status_code=202, content={"job_id": job.id, "status": job.status, "wait_s": wait_s})
+
+
+# POST → job id 바로 반환, 결과는 GET /jobs/{job_id} 로 조회
+@router.post("/jobs/laugh-event")
+async def submit_laughter_event(body: LlmRequest):
+    return _submit("laugh_event", body.dict())
+
+
+@router.post("/jobs/laugh-events/batch")
+async def submit_laughter_events(body: LlmBatchRequest):
+    return _submit("laugh_events_batch", body.dict(), timeout_s=batch_timeout_s(len(body.events)))
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job.to_dict()
+
+
+@router.get("/jobs")
+def job_stats():
+    return job_queue.stats()
@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
-from AI_pipeline.core.pipeline import run_llm_pipeline
+from typing import List
+from AI_pipeline.core.pipeline import run_llm_pipeline_async, run_llm_batch_async
 
 router = APIRouter()
 
@@ -9,9 +10,16 @@ class LlmRequest(BaseModel):
     start_time: float
     end_time: float
 
-@router.post("/laugh-event")
-async def process_laughter_event(body: LlmRequest):
-    result = run_llm_pipeline(body.start_time, body.end_time)
+
+class LlmBatchRequest(BaseModel):
+    events: List[LlmRequest]
+
+
+# ------------------------------------------------------------
+# 분석 (바로 응답하는 라우트와 /jobs 작업 큐가 같이 사용)
+# ------------------------------------------------------------
+async def analyze_event(body: LlmRequest):
+    result = await run_llm_pipeline_async(body.start_time, body.end_time)
 
     # Python은 DB 접근 안함 → Node 5001에 JSON만 반환
     return {
@@ -20,4 +28,40 @@ async def process_laughter_event(body: LlmRequest):
         "tags": result["tags"],
         "label": result["labels"],
         "summary": result["summary"],
+        "cache_hit": result["cache_hit"],
+        "pipeline": result["pipeline"],
     }
+
+
+async def analyze_events(body: LlmBatchRequest):
+    results = await run_llm_batch_async(
+        [(ev.event_id, ev.start_time, ev.end_time) for ev in body.events]
+    )
+
+    return {
+        "success": True,
+        "results": [
+            {
+                "success": r["success"],
+                "event_id": r["event_id"],
+                "tags": r.get("tags", []),
+                "label": r.get("labels", []),
+                "summary": r.get("summary", ""),
+                "cache_hit": r.get("cache_hit", False),
+                "pipeline": r.get("pipeline"),
+                "error": r.get("error"),
+            }
+            for r in results
+        ],
+    }
+
+
+@router.post("/laugh-event")
+async def process_laughter_event(body: LlmRequest):
+    return await analyze_event(body)
+
+
+# 세션 종료 시 모든 이벤트를 한 번에 (구간 디코딩 1회 + 이벤트별 병렬 분석)
+@router.post("/laugh-events/batch")
+async def process_laughter_events(body: LlmBatchRequest):
+    return await analyze_events(body)
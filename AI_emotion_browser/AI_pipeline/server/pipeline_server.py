@@ -2,6 +2,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from AI_pipeline.routes.laugh_event import router as laugh_router
+from AI_pipeline.routes.jobs import router as jobs_router, job_queue
 
 app = FastAPI()
 
@@ -14,6 +15,19 @@ app.add_middleware(
 
 # 라우트 등록
 app.include_router(laugh_router)
+app.include_router(jobs_router)
+
+
+# 작업 큐 워커 (이벤트 루프 위에서 동작)
+@app.on_event("startup")
+async def start_job_workers():
+    job_queue.start()
+
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await job_queue.stop()
+
 
 @app.get("/")
 def root():
@@ -0,0 +1,326 @@
+# AI_realtime/server/backends.py
+#
+# ResNetCBAM CPU 추론 백엔드
+#   eager        : 기존 PyTorch fp32
+#   torchscript  : conv-BN folding → trace → freeze
+#   compile      : conv-BN folding → torch.compile
+#   onnx         : conv-BN folding → ONNX export → onnxruntime
+#   int8_dynamic : conv-BN folding → fc 동적 INT8 양자화
+#                  (동적 양자화는 nn.Linear 만 대상 → 이 모델에선 fc 하나뿐이라 conv 연산은 그대로 fp32,
+#                   속도 이득은 거의 BN folding 뿐. 비교용으로 남겨 둠, 실제 INT8 이득은 int8_static)
+#   int8_static  : FX 그래프 정적 INT8 양자화 (보정 이미지 필요, 검증은 보정에 안 쓴 이미지로)
+#
+# 단독 실행 (내보내기 + 검증 + 지연 측정):
+#   cd AI_realtime
+#   python -m server.backends --data <held-out 얼굴 크롭 폴더> [--backends eager,onnx,...]
+
+import os
+import time
+import argparse
+import threading
+import torch
+import torch.nn as nn
+from PIL import Image
+
+BACKENDS = ("eager", "torchscript", "compile", "onnx", "int8_dynamic", "int8_static")
+
+INPUT_SIZE = 224
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+# ================================
+# 공통 래퍼
+# ================================
+class InferenceBackend:
+    """batch(N,3,224,224) → logits(N,2) 호출 + 지연 시간 집계"""
+
+    def __init__(self, name, fn, device="cpu"):
+        self.name = name
+        self.fn = fn
+        self.device = device
+        self.validation = None
+        self.warmup_ms = {}
+
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._frames = 0
+        self._total = 0.0
+
+    def __call__(self, batch):
+        started = time.perf_counter()
+        with torch.inference_mode():
+            logits = self.fn(batch)
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self._calls += 1
+            self._frames += batch.shape[0]
+            self._total += elapsed
+        return logits
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": self.name,
+                "calls": self._calls,
+                "frames": self._frames,
+                "avg_call_ms": self._total / self._calls * 1000.0 if self._calls else 0.0,
+                "avg_frame_ms": self._total / self._frames * 1000.0 if self._frames else 0.0,
+                "warmup_ms": self.warmup_ms,
+                "validation": self.validation,
+            }
+
+
+# ================================
+# conv-BN folding
+# ================================
+def fold_conv_bn(model):
+    """eval 모드 Conv2d + BatchNorm2d 쌍을 Conv2d 하나로 합친 GraphModule 반환"""
+    from torch.fx.experimental.optimization import fuse
+    return fuse(model.eval(), inplace=False)
+
+
+# ================================
+# 백엔드 빌더
+# ================================
+def _build_eager(model, example, **_):
+    return model.eval()
+
+
+def _build_torchscript(model, example, **_):
+    traced = torch.jit.trace(fold_conv_bn(model), example)
+    frozen = torch.jit.freeze(traced.eval())
+    return torch.jit.optimize_for_inference(frozen)
+
+
+def _build_compile(model, example, **_):
+    return torch.compile(fold_conv_bn(model), dynamic=True)
+
+
+def _build_onnx(model, example, export_dir=None, **_):
+    import onnxruntime as ort
+
+    export_dir = export_dir or os.path.dirname(os.path.abspath(__file__))
+    onnx_path = os.path.join(export_dir, "Res_CBAM_v3_epc10.onnx")
+
+    torch.onnx.export(
+        fold_conv_bn(model), example, onnx_path,
+        input_names=["input"], output_names=["logits"],
+        dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=17,
+    )
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+
+    def run(batch):
+        logits = session.run(None, {"input": batch.contiguous().numpy()})[0]
+        return torch.from_numpy(logits)
+
+    return run
+
+
+def _build_int8_dynamic(model, example, **_):
+    # 동적 양자화는 Linear(fc)만 INT8로 바뀐다. Conv는 BN folding 효과만 있음.
+    # → ResNetCBAM 은 연산 대부분이 conv 라 eager/torchscript 대비 이득이 거의 없다 (비교용).
+    return torch.ao.quantization.quantize_dynamic(
+        fold_conv_bn(model), {nn.Linear}, dtype=torch.qint8
+    )
+
+
+def _build_int8_static(model, example, calibration=None, **_):
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    if not calibration:
+        raise ValueError("int8_static 백엔드는 보정(calibration) 이미지가 필요합니다.")
+
+    torch.backends.quantized.engine = "x86" if "x86" in torch.backends.quantized.supported_engines else "qnnpack"
+    qconfig_mapping = get_default_qconfig_mapping(torch.backends.quantized.engine)
+
+    prepared = prepare_fx(model.eval(), qconfig_mapping, (example,))
+    with torch.inference_mode():
+        for batch in calibration:
+            prepared(batch)
+    return convert_fx(prepared)
+
+
+_BUILDERS = {
+    "eager": _build_eager,
+    "torchscript": _build_torchscript,
+    "compile": _build_compile,
+    "onnx": _build_onnx,
+    "int8_dynamic": _build_int8_dynamic,
+    "int8_static": _build_int8_static,
+}
+
+
+def build_backend(name, model, device="cpu", calibration=None, export_dir=None):
+    if name not in _BUILDERS:
+        raise ValueError(f"알 수 없는 백엔드: {name} (가능: {', '.join(BACKENDS)})")
+    if name != "eager" and device != "cpu":
+        raise ValueError(f"{name} 백엔드는 CPU 전용입니다.")
+
+    example = torch.randn(1, 3, INPUT_SIZE, INPUT_SIZE, device=device)
+    fn = _BUILDERS[name](model, example, calibration=calibration, export_dir=export_dir)
+    return InferenceBackend(name, fn, device=device)
+
+
+# ================================
+# 검증 / 지연 측정
+# ================================
+def list_images(data_dir):
+    paths = []
+    for root, _, files in os.walk(data_dir):
+        paths += [os.path.join(root, f) for f in files if f.lower().endswith(IMAGE_EXTS)]
+    return sorted(paths)
+
+
+def split_holdout(paths, calib_limit=128):
+    """보정용 / 검증용 이미지를 겹치지 않게 나눔 (정렬 순서로 번갈아, 보정은 최대 calib_limit 장)
+
+    int8_static 은 보정에 쓴 이미지에서 오차가 작게 나오므로 검증은 남은 이미지로만 한다.
+    """
+    calib = paths[0::2][:calib_limit]
+    used = set(calib)
+    return calib, [p for p in paths if p not in used]
+
+
+def load_image_batches(data_dir, transform, batch_size=16, limit=None, paths=None):
+    """held-out 폴더(하위 폴더 포함) 또는 paths 의 얼굴 크롭 → 정규화 텐서 배치 리스트"""
+    if paths is None:
+        paths = list_images(data_dir)
+    paths = paths[:limit]
+
+    batches = []
+    for i in range(0, len(paths), batch_size):
+        tensors = [transform(Image.open(p).convert("RGB")) for p in paths[i:i + batch_size]]
+        batches.append(torch.stack(tensors))
+    return batches
+
+
+def laugh_probs(backend, batches):
+    with torch.inference_mode():
+        return torch.cat([torch.softmax(backend(b).float(), dim=1)[:, 1] for b in batches])
+
+
+def validate_backend(backend, reference_probs, batches, threshold=0.43):
+    """eager 대비 웃음 확률 차이 + 임계값(threshold) 판정 일치율"""
+    probs = laugh_probs(backend, batches)
+    diff = (probs - reference_probs).abs()
+    agree = ((probs > threshold) == (reference_probs > threshold)).float().mean()
+
+    backend.validation = {
+        "samples": int(probs.numel()),
+        "max_abs_diff": float(diff.max()),
+        "mean_abs_diff": float(diff.mean()),
+        "threshold": threshold,
+        "label_agreement": float(agree),
+    }
+    return backend.validation
+
+
+def measure_latency(backend, batch_sizes=(1, 4, 8), repeats=10, device="cpu"):
+    """배치 크기별 1회 호출 평균 지연(ms)"""
+    result = {}
+    for bs in batch_sizes:
+        x = torch.randn(bs, 3, INPUT_SIZE, INPUT_SIZE, device=device)
+        with torch.inference_mode():
+            backend.fn(x)  # 첫 호출(컴파일/할당) 제외
+            started = time.perf_counter()
+            for _ in range(repeats):
+                backend.fn(x)
+        result[bs] = (time.perf_counter() - started) / repeats * 1000.0
+    return result
+
+
+def select_backend(name, model, device="cpu", validate_dir="", max_prob_diff=0.02,
+                   threshold=0.43, batch_sizes=(1, 4, 8)):
+    """서버 시작 시 백엔드 선택
+
+    validate_dir 가 있으면 eager 대비 검증하고, 허용 오차를 넘거나
+    임계값 판정이 하나라도 달라지면 eager 로 되돌린다.
+    """
+    from server.emotion_model import transform
+
+    paths = list_images(validate_dir) if validate_dir else []
+    calibration = []
+    if name == "int8_static":
+        calib_paths, paths = split_holdout(paths)
+        calibration = load_image_batches("", transform, paths=calib_paths)
+    batches = load_image_batches("", transform, paths=paths)
+
+    try:
+        backend = build_backend(name, model, device=device, calibration=calibration)
+    except Exception as e:
+        print(f"⚠️ {name} 백엔드 빌드 실패 → eager 사용: {e}")
+        backend = build_backend("eager", model, device=device)
+
+    if backend.name == "int8_static" and not batches:
+        print("⚠️ int8_static 검증용(보정 제외) 이미지가 없음 → eager 사용")
+        backend = build_backend("eager", model, device=device)
+    if backend.name == "int8_dynamic":
+        print("ℹ️ int8_dynamic 은 fc 만 INT8 — conv 위주인 ResNetCBAM 에서는 속도 이득이 거의 없음")
+
+    if batches and backend.name != "eager":
+        reference = laugh_probs(build_backend("eager", model, device=device), batches)
+        v = validate_backend(backend, reference, batches, threshold=threshold)
+        print(f"🔎 {backend.name} 검증: max_diff={v['max_abs_diff']:.4f} agree={v['label_agreement']:.3f}")
+
+        if v["max_abs_diff"] > max_prob_diff or v["label_agreement"] < 1.0:
+            print(f"⚠️ {backend.name} 검증 실패 → eager 사용")
+            backend = build_backend("eager", model, device=device)
+
+    backend.warmup_ms = measure_latency(backend, batch_sizes=batch_sizes, device=device)
+    print(f"⚙️ Emotion backend: {backend.name} {backend.warmup_ms}")
+    return backend
+
+
+def main():
+    from server.emotion_model import load_emotion_model, transform
+
+    parser = argparse.ArgumentParser(description="ResNetCBAM 추론 백엔드 내보내기/검증")
+    parser.add_argument("--model", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "Res_CBAM_v3_epc10.pth"))
+    parser.add_argument("--data", required=True, help="held-out 얼굴 크롭 이미지 폴더")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--calib-limit", type=int, default=128)
+    parser.add_argument("--threshold", type=float, default=0.43)
+    args = parser.parse_args()
+
+    model = load_emotion_model(args.model, "cpu")
+    paths = list_images(args.data)
+    if not paths:
+        raise SystemExit(f"❌ 이미지가 없습니다: {args.data}")
+    batches = load_image_batches("", transform, paths=paths)
+    # int8_static: 보정 이미지와 겹치지 않는 나머지로만 검증
+    calib_paths, holdout_paths = split_holdout(paths, args.calib_limit)
+    calibration = load_image_batches("", transform, paths=calib_paths)
+    holdout = load_image_batches("", transform, paths=holdout_paths)
+
+    eager = build_backend("eager", model)
+    reference = laugh_probs(eager, batches)
+    holdout_reference = laugh_probs(eager, holdout) if holdout else None
+
+    print(f"{'backend':<14}{'max_diff':>10}{'agree':>8}   latency(ms) bs=1/4/8")
+    for name in args.backends.split(","):
+        try:
+            backend = build_backend(name, model, calibration=calibration)
+        except Exception as e:
+            print(f"{name:<14}  ❌ 빌드 실패: {e}")
+            continue
+
+        if name == "int8_static":
+            if not holdout:
+                print(f"{name:<14}  ❌ 검증용(보정 제외) 이미지가 없습니다")
+                continue
+            v = validate_backend(backend, holdout_reference, holdout, threshold=args.threshold)
+        else:
+            v = validate_backend(backend, reference, batches, threshold=args.threshold)
+        lat = measure_latency(backend)
+        lat_str = " / ".join(f"{ms:.1f}" for ms in lat.values())
+        print(f"{name:<14}{v['max_abs_diff']:>10.4f}{v['label_agreement']:>8.3f}   {lat_str}")
+
+
+if __name__ == "__main__":
+    main()
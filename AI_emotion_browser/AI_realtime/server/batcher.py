@@ -0,0 +1,140 @@
+# AI_realtime/server/batcher.py
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """동시 요청으로 들어온 프레임을 모아서 한 번에 처리하는 스케줄러
+
+    - max_batch_size : 한 번에 묶을 최대 프레임 수 (클수록 처리량 ↑)
+    - max_wait_ms    : 첫 프레임이 배치를 기다리는 최대 시간 (작을수록 지연 ↓)
+    - concurrency    : 동시에 처리할 배치 수 (추론 워커 프로세스 수에 맞춘다)
+
+    process_fn(items) 는 items 와 같은 길이의 결과 리스트를 반환해야 한다.
+    """
+
+    def __init__(self, process_fn, max_batch_size=8, max_wait_ms=10.0, concurrency=1,
+                 name="micro-batcher"):
+        self.process_fn = process_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._stopped = False
+
+        # 통계
+        self._batches = 0
+        self._items = 0
+        self._max_seen = 0
+        self._queue_wait_total = 0.0
+        self._process_total = 0.0
+
+        self._threads = [
+            threading.Thread(target=self._loop, name=f"{name}-{i}", daemon=True)
+            for i in range(max(1, int(concurrency)))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    # ------------------------------------------------------------
+    # 요청 등록
+    # ------------------------------------------------------------
+    def submit(self, item):
+        fut = Future()
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("batcher stopped")
+            self._queue.append((item, fut, time.perf_counter()))
+            self._cond.notify()
+        return fut
+
+    def __call__(self, item, timeout=None):
+        return self.submit(item).result(timeout=timeout)
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._queue)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+
+    # ------------------------------------------------------------
+    # 배치 수집 루프
+    # ------------------------------------------------------------
+    def _collect(self):
+        with self._cond:
+            while not self._queue and not self._stopped:
+                self._cond.wait()
+            if self._stopped and not self._queue:
+                return None
+
+            # 가장 오래 기다린 프레임 기준으로 마감 시간 계산
+            deadline = self._queue[0][2] + self.max_wait
+            while len(self._queue) < self.max_batch_size and not self._stopped:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            n = min(len(self._queue), self.max_batch_size)
+            return [self._queue.popleft() for _ in range(n)]
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+
+            started = time.perf_counter()
+            items = [item for item, _, _ in batch]
+
+            try:
+                results = self.process_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f"process_fn returned {len(results)} results for {len(items)} items"
+                    )
+            except Exception as e:
+                for _, fut, _ in batch:
+                    fut.set_exception(e)
+                results = None
+
+            if results is not None:
+                for (_, fut, _), result in zip(batch, results):
+                    fut.set_result(result)
+
+            finished = time.perf_counter()
+            with self._cond:
+                self._batches += 1
+                self._items += len(batch)
+                self._max_seen = max(self._max_seen, len(batch))
+                self._queue_wait_total += sum(started - t for _, _, t in batch)
+                self._process_total += finished - started
+
+    # ------------------------------------------------------------
+    # 통계
+    # ------------------------------------------------------------
+    def stats(self):
+        with self._cond:
+            batches = max(1, self._batches)
+            items = max(1, self._items)
+            return {
+                "concurrency": len(self._threads),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "batches": self._batches,
+                "frames": self._items,
+                "avg_batch_size": self._items / batches,
+                "max_batch_seen": self._max_seen,
+                "avg_queue_wait_ms": self._queue_wait_total / items * 1000.0,
+                "avg_batch_ms": self._process_total / batches * 1000.0,
+                "queue_depth": len(self._queue),
+            }
@@ -0,0 +1,98 @@
+# AI_realtime/server/emotion_model.py
+
+import torch
+import torch.nn as nn
+from torchvision import transforms, models
+
+
+# ================================
+# 2) ResNetCBAM 정의
+# ================================
+class ChannelAttention(nn.Module):
+    def __init__(self, in_planes, ratio=16):
+        super().__init__()
+        self.avg_pool = nn.AdaptiveAvgPool2d(1)
+        self.max_pool = nn.AdaptiveMaxPool2d(1)
+        self.fc = nn.Sequential(
+            nn.Conv2d(in_planes, in_planes // ratio, 1, bias=False),
+            nn.ReLU(),
+            nn.Conv2d(in_planes // ratio, in_planes, 1, bias=False)
+        )
+        self.sigmoid = nn.Sigmoid()
+
+    def forward(self, x):
+        return self.sigmoid(self.fc(self.avg_pool(x)) + self.fc(self.max_pool(x)))
+
+class SpatialAttention(nn.Module):
+    def __init__(self, kernel_size=7):
+        super().__init__()
+        self.conv1 = nn.Conv2d(2, 1, kernel_size, padding=kernel_size//2, bias=False)
+        self.sigmoid = nn.Sigmoid()
+
+    def forward(self, x):
+        avg_out = torch.mean(x, dim=1, keepdim=True)
+        max_out, _ = torch.max(x, dim=1, keepdim=True)
+        return self.sigmoid(self.conv1(torch.cat([avg_out, max_out], dim=1)))
+
+class CBAM(nn.Module):
+    def __init__(self, in_planes):
+        super().__init__()
+        self.ca = ChannelAttention(in_planes)
+        self.sa = SpatialAttention()
+
+    def forward(self, x):
+        return x * self.ca(x) * self.sa(x)
+
+class ResNetCBAM(nn.Module):
+    def __init__(self, num_classes=2, pretrained=True):
+        super().__init__()
+        # 학습된 체크포인트를 바로 덮어쓸 때는 ImageNet 가중치가 필요 없음
+        weights = models.ResNet18_Weights.IMAGENET1K_V1 if pretrained else None
+        base = models.resnet18(weights=weights)
+
+        self.conv1 = base.conv1
+        self.bn1 = base.bn1
+        self.relu = base.relu
+        self.maxpool = base.maxpool
+        self.layer1 = base.layer1
+        self.layer2 = base.layer2
+        self.cbam2 = CBAM(128)
+        self.layer3 = base.layer3
+        self.cbam3 = CBAM(256)
+        self.layer4 = base.layer4
+        self.avgpool = base.avgpool
+        self.fc = nn.Linear(base.fc.in_features, num_classes)
+
+    def forward(self, x):
+        x = self.relu(self.bn1(self.conv1(x)))
+        x = self.maxpool(x)
+        x = self.layer1(x)
+        x = self.layer2(x)
+        x = self.cbam2(x)
+        x = self.layer3(x)
+        x = self.cbam3(x)
+        x = self.layer4(x)
+        x = self.avgpool(x)
+        return self.fc(torch.flatten(x, 1))
+
+
+# ================================
+# 3) ResNetCBAM Load
+# ================================
+def load_emotion_model(model_path, device):
+    model = ResNetCBAM(num_classes=2, pretrained=False)
+    model.load_state_dict(torch.load(model_path, map_location=device))
+    model.to(device)
+    model.eval()
+    return model
+
+
+# ================================
+# Transform
+# ================================
+transform = transforms.Compose([
+    transforms.Resize((224, 224)),
+    transforms.ToTensor(),
+    transforms.Normalize([0.485, 0.456, 0.406],
+                         [0.229, 0.224, 0.225])
+])
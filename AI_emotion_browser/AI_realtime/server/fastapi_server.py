@@ -1,17 +1,28 @@
 import os
-import base64
-import io
-import numpy as np
-from PIL import Image
+import json
+import time
+import uuid
+import asyncio
+from typing import Optional
+from concurrent.futures import Future
 import torch
-import torch.nn as nn
-from torchvision import transforms, models
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from ultralytics import YOLO
-from huggingface_hub import hf_hub_download
 from fastapi.middleware.cors import CORSMiddleware
 
+from server.backends import INPUT_SIZE
+from server.batcher import MicroBatcher
+from server.frame_decode import decode_jpeg, decode_data_url
+from server.frame_gate import FrameGate, frame_signature
+from server.inference import InferenceEngine
+from server.metrics import Counter, Gauge, Histogram, Registry
+from server.session import SessionState, SessionStore
+from server.startup import StartupState
+from server.tracker import FaceTracker
+from server.workers import WorkerPool
+
 # ================================
 # GPU 체크
 # ================================
@@ -22,7 +33,77 @@ print("🚀 Using device:", DEVICE)
 # 경로 안전하게 읽기
 # ================================
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # server/
-MODEL_PATH = os.path.join(BASE_DIR, "Res_CBAM_v3_epc10.pth")
+
+# 모델 파일 폴더 (기본: server/)
+#   Res_CBAM_v3_epc10.pth   : ResNetCBAM 체크포인트
+#   yolov11n-face.pt        : YOLO 얼굴 모델 (없으면 HF Hub 에서 받음)
+MODEL_DIR = os.getenv("MODEL_DIR", BASE_DIR)
+MODEL_PATH = os.path.join(MODEL_DIR, "Res_CBAM_v3_epc10.pth")
+YOLO_LOCAL_PATH = os.path.join(MODEL_DIR, "yolov11n-face.pt")
+
+# 1 이면 네트워크 접근 없이 로컬 파일 / HF 캐시만 사용
+MODEL_OFFLINE = os.getenv("MODEL_OFFLINE", "0") == "1"
+
+# ================================
+# 마이크로 배칭 설정
+# ================================
+# 크게 잡을수록 처리량(fps) ↑, 작게 잡을수록 p99 지연 ↓
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "10"))
+
+LAUGH_THRESHOLD = 0.43
+MIN_FACE_SIZE = 80
+
+# JPEG 축소 디코딩 기준 크기 (짧은 변이 이 값 이상 유지되는 가장 작은 1/2^n 배율)
+# 기본값 = 감정 모델 입력 크기 (얼굴 크롭은 어차피 이 크기로 줄어듦), 0 이면 원본 해상도
+DECODE_DRAFT_SIZE = int(os.getenv("DECODE_DRAFT_SIZE", str(INPUT_SIZE)))
+
+# ================================
+# 세션 얼굴 추적 설정
+# ================================
+# N 프레임마다 1번만 전체 프레임 YOLO, 나머지는 직전 얼굴 주변 ROI만 검출
+# (1 이면 매 프레임 전체 검출 = 기존 동작)
+TRACK_DETECT_EVERY = int(os.getenv("TRACK_DETECT_EVERY", "10"))
+TRACK_ROI_IMGSZ = int(os.getenv("TRACK_ROI_IMGSZ", "160"))
+TRACK_MIN_CONF = float(os.getenv("TRACK_MIN_CONF", "0.5"))
+TRACK_MIN_IOU = float(os.getenv("TRACK_MIN_IOU", "0.3"))
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "300"))
+
+# ================================
+# 프레임 차이 게이트 (거의 같은 프레임은 직전 결과 재사용)
+# ================================
+# 16x16 흑백 시그니처 평균 차이(0~255) 가 이 값 미만이면 재사용, 0 이면 끔
+GATE_DIFF_THRESHOLD = float(os.getenv("GATE_DIFF_THRESHOLD", "2.0"))
+GATE_MAX_HITS = int(os.getenv("GATE_MAX_HITS", "5"))
+GATE_MAX_AGE_S = float(os.getenv("GATE_MAX_AGE_S", "2.0"))
+GATE_PROB_MARGIN = float(os.getenv("GATE_PROB_MARGIN", "0.1"))
+GATE_MAX_ENTRIES = int(os.getenv("GATE_MAX_ENTRIES", "1000"))
+
+# ================================
+# ResNetCBAM 추론 백엔드
+# ================================
+# eager / torchscript / compile / onnx / int8_dynamic / int8_static
+EMOTION_BACKEND = os.getenv("EMOTION_BACKEND", "eager")
+# held-out 얼굴 크롭 폴더 (검증 + int8_static 보정용, 비우면 검증 생략)
+EMOTION_VALIDATE_DIR = os.getenv("EMOTION_VALIDATE_DIR", "")
+EMOTION_MAX_PROB_DIFF = float(os.getenv("EMOTION_MAX_PROB_DIFF", "0.02"))
+
+# ================================
+# 추론 워커 프로세스 풀
+# ================================
+# 0 이면 이 프로세스 안에서 추론 (기존 동작)
+# N 이면 워커 N 개가 코어를 나눠 갖고 각자 모델을 올린다
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+# 워커당 torch 스레드 수 (0 이면 배정된 코어 수)
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", "0"))
+# 공유 메모리 프레임 슬롯 크기 (한 변 최대 픽셀)
+WORKER_MAX_FRAME_SIDE = int(os.getenv("WORKER_MAX_FRAME_SIDE", "1280"))
+
+# ================================
+# 관측 (로그 / 메트릭)
+# ================================
+# 프레임 단위 로그 출력 비율 (0 이면 끔, 1 이면 매 프레임 = 기존 동작)
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0"))
 
 # ================================
 # FastAPI
@@ -38,186 +119,355 @@ app.add_middleware(
 )
 
 # ================================
-# 1) YOLO Face Detection (GPU)
+# 모델 로딩 (백그라운드) → 워밍업 → ready
 # ================================
-
-'''
-print("📥 YOLOv8 Face 모델 다운로드 중...")
-yolo_path = hf_hub_download(
-    repo_id="Reshma67/yolov8-face-detection",
-    filename="model.pt"
+ENGINE_CONFIG = dict(
+    device=DEVICE,
+    model_path=MODEL_PATH,
+    yolo_path=YOLO_LOCAL_PATH,
+    offline=MODEL_OFFLINE,
+    backend=EMOTION_BACKEND,
+    validate_dir=EMOTION_VALIDATE_DIR,
+    max_prob_diff=EMOTION_MAX_PROB_DIFF,
+    laugh_threshold=LAUGH_THRESHOLD,
+    min_face_size=MIN_FACE_SIZE,
+    detect_imgsz=320,
+    roi_imgsz=TRACK_ROI_IMGSZ,
+    track_min_conf=TRACK_MIN_CONF,
+    track_min_iou=TRACK_MIN_IOU,
+    max_batch=BATCH_MAX_SIZE,
+    log_sample_rate=LOG_SAMPLE_RATE,
 )
 
-yolo_model = YOLO(yolo_path)
-yolo_model.to(DEVICE)
-'''
+startup = StartupState()
 
-# ================================
-# 1) YOLO Face Detection (GPU)
-# ================================
-print("📥 YOLOv11n Face 모델 다운로드 중...")
+engine = None   # 프로세스 내 추론
+pool = None     # 워커 프로세스 추론
 
-yolo_path = hf_hub_download(
-    repo_id="AdamCodd/YOLOv11n-face-detection",
-    filename="model.pt"
-)
 
-yolo_model = YOLO(yolo_path)
-yolo_model.to(DEVICE)
+def load_models():
+    global engine, pool
+
+    if INFERENCE_WORKERS > 0:
+        workers = WorkerPool(
+            INFERENCE_WORKERS,
+            ENGINE_CONFIG,
+            max_batch=BATCH_MAX_SIZE,
+            max_frame_side=WORKER_MAX_FRAME_SIDE,
+            threads_per_worker=WORKER_THREADS,
+        )
+        workers.start(startup)
+        pool = workers
+    else:
+        local = InferenceEngine(**ENGINE_CONFIG)
+        local.load(startup)
+        engine = local
+
+
+@app.on_event("startup")
+def start_model_loading():
+    startup.run_in_background(load_models)
+
+
+@app.on_event("shutdown")
+def stop_workers():
+    if pool is not None:
+        pool.close()
+
+
+def ensure_ready():
+    if not startup.ready:
+        raise HTTPException(status_code=503, detail="models are loading")
 
 
 # ================================
-# 2) ResNetCBAM 정의
+# 메트릭 (/metrics)
 # ================================
-class ChannelAttention(nn.Module):
-    def __init__(self, in_planes, ratio=16):
-        super().__init__()
-        self.avg_pool = nn.AdaptiveAvgPool2d(1)
-        self.max_pool = nn.AdaptiveMaxPool2d(1)
-        self.fc = nn.Sequential(
-            nn.Conv2d(in_planes, in_planes // ratio, 1, bias=False),
-            nn.ReLU(),
-            nn.Conv2d(in_planes // ratio, in_planes, 1, bias=False)
-        )
-        self.sigmoid = nn.Sigmoid()
-
-    def forward(self, x):
-        return self.sigmoid(self.fc(self.avg_pool(x)) + self.fc(self.max_pool(x)))
-
-class SpatialAttention(nn.Module):
-    def __init__(self, kernel_size=7):
-        super().__init__()
-        self.conv1 = nn.Conv2d(2, 1, kernel_size, padding=kernel_size//2, bias=False)
-        self.sigmoid = nn.Sigmoid()
-
-    def forward(self, x):
-        avg_out = torch.mean(x, dim=1, keepdim=True)
-        max_out, _ = torch.max(x, dim=1, keepdim=True)
-        return self.sigmoid(self.conv1(torch.cat([avg_out, max_out], dim=1)))
-
-class CBAM(nn.Module):
-    def __init__(self, in_planes):
-        super().__init__()
-        self.ca = ChannelAttention(in_planes)
-        self.sa = SpatialAttention()
-
-    def forward(self, x):
-        return x * self.ca(x) * self.sa(x)
-
-class ResNetCBAM(nn.Module):
-    def __init__(self, num_classes=2):
-        super().__init__()
-        base = models.resnet18(weights=models.ResNet18_Weights.IMAGENET1K_V1)
-
-        self.conv1 = base.conv1
-        self.bn1 = base.bn1
-        self.relu = base.relu
-        self.maxpool = base.maxpool
-        self.layer1 = base.layer1
-        self.layer2 = base.layer2
-        self.cbam2 = CBAM(128)
-        self.layer3 = base.layer3
-        self.cbam3 = CBAM(256)
-        self.layer4 = base.layer4
-        self.avgpool = base.avgpool
-        self.fc = nn.Linear(base.fc.in_features, num_classes)
-
-    def forward(self, x):
-        x = self.relu(self.bn1(self.conv1(x)))
-        x = self.maxpool(x)
-        x = self.layer1(x)
-        x = self.layer2(x)
-        x = self.cbam2(x)
-        x = self.layer3(x)
-        x = self.cbam3(x)
-        x = self.layer4(x)
-        x = self.avgpool(x)
-        return self.fc(torch.flatten(x, 1))
-
-# ================================
-# 3) ResNetCBAM Load (GPU)
-# ================================
-emotion_model = ResNetCBAM(num_classes=2)
-emotion_model.load_state_dict(torch.load(MODEL_PATH, map_location=DEVICE))
-emotion_model.to(DEVICE)
-emotion_model.eval()
-
-# ================================
-# Transform
-# ================================
-transform = transforms.Compose([
-    transforms.Resize((224, 224)),
-    transforms.ToTensor(),
-    transforms.Normalize([0.485, 0.456, 0.406],
-                         [0.229, 0.224, 0.225])
-])
+registry = Registry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    "realtime_stage_seconds",
+    "Per-stage latency (decode, yolo, box_select, preprocess, classifier, serialize)",
+    labels=("stage",),
+))
+REQUEST_SECONDS = registry.register(Histogram(
+    "realtime_request_seconds", "End-to-end frame latency per endpoint", labels=("endpoint",),
+))
+BATCH_SIZE = registry.register(Histogram(
+    "realtime_batch_size", "Frames per inference batch", buckets=(1, 2, 4, 8, 16, 32),
+))
+OUTCOMES_TOTAL = registry.register(Counter(
+    "realtime_outcomes_total", "Frame outcomes (no_face, too_small, crop_failed, laugh, other, cached, error)",
+    labels=("outcome",),
+))
+
+
+def decode_timed(fn, *args):
+    with STAGE_SECONDS.time("decode"):
+        return fn(*args)
+
+
+def respond(result):
+    with STAGE_SECONDS.time("serialize"):
+        return JSONResponse(result)
+
 
 # ================================
 # Request Body
 # ================================
 class Frame(BaseModel):
     image: str
+    session_id: Optional[str] = None
+
+
+# ================================
+# 세션 상태
+# ================================
+def new_session(session_id):
+    return SessionState(session_id, FaceTracker(detect_every=TRACK_DETECT_EVERY))
+
+
+sessions = SessionStore(new_session, idle_ttl=SESSION_IDLE_TTL)
+
+
+def make_item(decoded, session_id):
+    """배처에 넘길 항목: (img_np, scale, tracker)"""
+    img_np, scale = decoded
+    if pool is not None:
+        pool.check_frame(img_np)
+    state = sessions.get(session_id)
+    return img_np, scale, state.tracker if state else None
+
+
+# ================================
+# 배치 추론 (YOLO 1회 + ResNetCBAM 1회)
+# ================================
+def infer_batch(items):
+    """items: [(img_np, scale, tracker), ...]  scale = 디코딩 크기 / 원본 크기"""
+    frames = [img_np for img_np, _, _ in items]
+    scales = [scale for _, scale, _ in items]
+    plans = [tracker.plan(img_np.shape) if tracker else None for img_np, _, tracker in items]
+
+    runner = pool if pool is not None else engine
+    timings = {}
+    results = runner.infer(frames, scales, plans, timings)
+
+    BATCH_SIZE.observe(len(items))
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.observe(seconds, stage)
+
+    for (_, _, tracker), result in zip(items, results):
+        OUTCOMES_TOTAL.inc(result.outcome)
+        if tracker:
+            tracker.record(result.kind, result.box)
+
+    return [result.output for result in results]
+
+
+batcher = MicroBatcher(
+    infer_batch,
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+    concurrency=max(1, INFERENCE_WORKERS),
+)
+
+gate = FrameGate(
+    diff_threshold=GATE_DIFF_THRESHOLD,
+    max_hits=GATE_MAX_HITS,
+    max_age_s=GATE_MAX_AGE_S,
+    prob_margin=GATE_PROB_MARGIN,
+    laugh_threshold=LAUGH_THRESHOLD,
+    max_entries=GATE_MAX_ENTRIES,
+)
+
+registry.register(Gauge("realtime_queue_depth", "Frames waiting for a batch", batcher.queue_depth))
+registry.register(Gauge("realtime_gate_hit_rate", "Frame gate cache hit rate", lambda: gate.stats()["hit_rate"]))
+
+
+def submit_frame(decoded, session_id):
+    """게이트 통과 시 캐시 결과, 아니면 배처에 등록 → Future"""
+    signature = None
+    if gate.enabled and session_id:
+        signature = frame_signature(decoded[0])
+        cached = gate.lookup(session_id, signature)
+        if cached is not None:
+            OUTCOMES_TOTAL.inc("cached")
+            fut = Future()
+            fut.set_result(cached)
+            return fut
+
+    fut = batcher.submit(make_item(decoded, session_id))
+
+    if signature is not None:
+        def remember(done):
+            if done.exception() is None:
+                gate.store(session_id, signature, done.result())
+        fut.add_done_callback(remember)
+
+    return fut
+
 
 # ================================
 # /predict
 # ================================
 @app.post("/predict")
 def predict(frame: Frame):
+    ensure_ready()
+    started = time.perf_counter()
     try:
-        base64_data = frame.image.split(",")[-1]
-        img_bytes = base64.b64decode(base64_data)
-        img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-        img_np = np.array(img)
+        decoded = decode_timed(decode_data_url, frame.image)
+        result = submit_frame(decoded, frame.session_id).result()
 
-        # ================================
-        # YOLO 얼굴 검출
-        # ================================
-        results = yolo_model.predict(img_np, imgsz=320, device=DEVICE, verbose=False)
-        boxes = results[0].boxes.xyxy.cpu().numpy()
+    except Exception as e:
+        print("❌ PREDICT ERROR:", e)
+        OUTCOMES_TOTAL.inc("error")
+        result = {"emotion": "error", "prob": -1}
 
-        # 얼굴 없음
-        if len(boxes) == 0:
-            print("\n[YOLO] 얼굴 없음")
-            return {"emotion": "other", "prob": 0.0}
+    response = respond(result)
+    REQUEST_SECONDS.observe(time.perf_counter() - started, "predict")
+    return response
 
-        # 가장 큰 박스 선택
-        x1, y1, x2, y2 = map(int, sorted(
-            boxes, key=lambda b: (b[2]-b[0])*(b[3]-b[1]), reverse=True
-        )[0])
 
-        w = x2 - x1
-        h = y2 - y1
+# ================================
+# /predict/jpeg  (raw image/jpeg body)
+# ================================
+@app.post("/predict/jpeg")
+async def predict_jpeg(request: Request):
+    ensure_ready()
+    started = time.perf_counter()
+    try:
+        body = await request.body()
+        session_id = request.query_params.get("session_id") or request.headers.get("x-session-id")
+        decoded = await run_in_threadpool(decode_timed, decode_jpeg, body, DECODE_DRAFT_SIZE)
+        result = await asyncio.wrap_future(submit_frame(decoded, session_id))
+
+    except Exception as e:
+        print("❌ PREDICT ERROR:", e)
+        OUTCOMES_TOTAL.inc("error")
+        result = {"emotion": "error", "prob": -1}
+
+    response = respond(result)
+    REQUEST_SECONDS.observe(time.perf_counter() - started, "predict_jpeg")
+    return response
 
-        # 얼굴이 너무 작으면 분석 안 함
-        if w < 80 or h < 80:
-            print(f"\n[YOLO] 얼굴이 너무 작습니다. (width={w}, height={h})")
-            return {"emotion": "other", "prob": 0.0}
 
-        # ================================
-        # Crop
-        # ================================
-        crop = img_np[y1:y2, x1:x2]
+# ================================
+# /ws/predict  (세션당 1개 WebSocket)
+# ================================
+# 클라이언트 → 서버 : 바이너리 JPEG 프레임
+# 서버 → 클라이언트 : {"seq", "emotion", "prob"} JSON
+@app.websocket("/ws/predict")
+async def predict_ws(websocket: WebSocket):
+    if not startup.ready:
+        await websocket.close(code=1013)  # try again later
+        return
+
+    await websocket.accept()
+    session_id = websocket.query_params.get("session_id") or str(uuid.uuid4())
+    seq = 0
 
-        if crop.size == 0:
-            print("\n[YOLO] Crop 실패 (잘못된 박스)")
-            return {"emotion": "other", "prob": 0.0}
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
 
-        # ================================
-        # Emotion Model
-        # ================================
-        crop_tensor = transform(Image.fromarray(crop)).unsqueeze(0).to(DEVICE)
+            seq += 1
+            started = time.perf_counter()
+            try:
+                if message.get("bytes") is not None:
+                    decoded = await run_in_threadpool(decode_timed, decode_jpeg, message["bytes"], DECODE_DRAFT_SIZE)
+                else:
+                    # 호환용: data URL 텍스트 프레임
+                    decoded = await run_in_threadpool(decode_timed, decode_data_url, message["text"], DECODE_DRAFT_SIZE)
 
-        with torch.no_grad():
-            output = emotion_model(crop_tensor)
-            prob = torch.softmax(output, dim=1)[0][1].item()
+                result = await asyncio.wrap_future(submit_frame(decoded, session_id))
 
-        label = "laugh" if prob > 0.43 else "other"
+            except Exception as e:
+                print("❌ PREDICT ERROR:", e)
+                OUTCOMES_TOTAL.inc("error")
+                result = {"emotion": "error", "prob": -1}
 
+            with STAGE_SECONDS.time("serialize"):
+                text = json.dumps({"seq": seq, **result})
+            await websocket.send_text(text)
+            REQUEST_SECONDS.observe(time.perf_counter() - started, "ws")
 
-        print(f"\n[EMOTION] prob={prob:.4f} → label={label}")
+    except WebSocketDisconnect:
+        pass
 
-        return {"emotion": label, "prob": prob}
 
-    except Exception as e:
-        print("❌ PREDICT ERROR:", e)
-        return {"emotion": "error", "prob": -1}
\ No newline at end of file
+# ================================
+# /metrics  (Prometheus 텍스트 포맷)
+# ================================
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+# ================================
+# /batch-stats
+# ================================
+@app.get("/batch-stats")
+def batch_stats():
+    return batcher.stats()
+
+
+# ================================
+# /gate-stats  (프레임 차이 게이트 적중률)
+# ================================
+@app.get("/gate-stats")
+def gate_stats():
+    return gate.stats()
+
+
+# ================================
+# /backend  (추론 백엔드 + 지연 시간)
+# ================================
+@app.get("/backend")
+def backend_stats():
+    ensure_ready()
+    if pool is not None:
+        return [w["backend"] for w in pool.stats()["workers"] if "backend" in w]
+    return engine.emotion_backend.stats()
+
+
+# ================================
+# /workers  (추론 워커 프로세스 상태)
+# ================================
+@app.get("/workers")
+def worker_stats():
+    ensure_ready()
+    if pool is None:
+        return {"workers": []}
+    return pool.stats()
+
+
+# ================================
+# /healthz  /readyz
+# ================================
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz():
+    report = startup.report()
+    return JSONResponse(report, status_code=200 if startup.ready else 503)
+
+
+# ================================
+# /sessions  (세션별 추적 카운터)
+# ================================
+@app.get("/sessions")
+def list_sessions():
+    return [state.stats() for state in sessions.all()]
+
+
+@app.get("/sessions/{session_id}")
+def get_session(session_id: str):
+    state = sessions.peek(session_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="session not found")
+    return state.stats()
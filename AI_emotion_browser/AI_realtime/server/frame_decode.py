@@ -0,0 +1,36 @@
+# AI_realtime/server/frame_decode.py
+
+import base64
+import io
+import numpy as np
+from PIL import Image
+
+
+def decode_jpeg(buf, draft_size=0):
+    """JPEG 바이트(bytes / bytearray / memoryview) → RGB numpy 배열
+
+    - base64 단계가 없을 뿐 복사가 0 은 아니다: BytesIO 가 입력 버퍼를 1번,
+      PIL → numpy 변환이 출력을 1번 복사한다.
+    - draft_size > 0 이면 JPEG DCT 축소 디코딩(1/2, 1/4, 1/8)을 사용한다.
+      짧은 변이 draft_size 이상으로 유지되는 가장 작은 배율이 선택된다.
+
+    반환: (img_np, scale)  scale = 디코딩 크기 / 원본 크기
+    """
+    img = Image.open(io.BytesIO(memoryview(buf)))
+    orig_w, _ = img.size
+
+    if draft_size and img.format == "JPEG":
+        img.draft("RGB", (draft_size, draft_size))
+
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+
+    # PIL 디코더 출력 → numpy (복사 1회, 쓰기 가능한 배열)
+    img_np = np.array(img)
+    return img_np, img_np.shape[1] / orig_w
+
+
+def decode_data_url(image_str, draft_size=0):
+    """'data:image/jpeg;base64,...' 문자열 디코딩 (기존 JSON 경로)"""
+    base64_data = image_str.split(",")[-1]
+    return decode_jpeg(base64.b64decode(base64_data), draft_size=draft_size)
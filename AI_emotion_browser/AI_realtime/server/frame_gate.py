@@ -0,0 +1,103 @@
+# AI_realtime/server/frame_gate.py
+
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+
+SIGNATURE_SIDE = 16
+
+
+def frame_signature(img_np, side=SIGNATURE_SIDE):
+    """프레임 → side x side 흑백 축소본 (float32)
+
+    리사이즈 없이 일정 간격으로 픽셀을 뽑아 채널 평균만 낸다.
+    """
+    h, w = img_np.shape[:2]
+    step_y = max(1, h // side)
+    step_x = max(1, w // side)
+    small = img_np[::step_y, ::step_x][:side, :side]
+    return small.mean(axis=2, dtype=np.float32)
+
+
+class FrameGate:
+    """세션별로 마지막 추론 프레임의 시그니처와 결과를 기억해 두고,
+    다음 프레임이 거의 같으면 추론 없이 같은 결과를 돌려준다.
+
+    - diff_threshold : 시그니처 평균 절대 차이(0~255) 가 이 값 미만이면 재사용
+    - max_hits       : 연속 재사용 최대 횟수 (넘으면 무조건 새로 추론)
+    - max_age_s      : 기억한 결과의 유효 시간
+    - prob_margin    : 웃음 확률이 임계값 ± margin 안이면 재사용하지 않음
+    - max_entries    : 기억하는 세션 수 상한 (LRU 로 제거)
+    """
+
+    def __init__(self, diff_threshold=2.0, max_hits=5, max_age_s=2.0,
+                 prob_margin=0.1, laugh_threshold=0.43, max_entries=1000):
+        self.diff_threshold = diff_threshold
+        self.max_hits = max_hits
+        self.max_age_s = max_age_s
+        self.prob_margin = prob_margin
+        self.laugh_threshold = laugh_threshold
+        self.max_entries = max_entries
+
+        # session_id → [signature, result, stored_at, consecutive_hits]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.diff_threshold > 0
+
+    def lookup(self, session_id, signature):
+        """재사용 가능한 결과가 있으면 반환, 없으면 None"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or not self._reusable(entry, signature):
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(session_id)
+            entry[3] += 1
+            self.hits += 1
+            return entry[1]
+
+    def _reusable(self, entry, signature):
+        anchor, result, stored_at, hits = entry
+        if hits >= self.max_hits:
+            return False
+        if time.time() - stored_at > self.max_age_s:
+            return False
+        if result.get("emotion") == "error":
+            return False
+        if abs(result.get("prob", 0.0) - self.laugh_threshold) < self.prob_margin:
+            return False
+        if anchor.shape != signature.shape:
+            return False
+        return float(np.abs(anchor - signature).mean()) < self.diff_threshold
+
+    def store(self, session_id, signature, result):
+        with self._lock:
+            self._entries[session_id] = [signature, result, time.time(), 0]
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "diff_threshold": self.diff_threshold,
+                "max_hits": self.max_hits,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,265 @@
+# AI_realtime/server/inference.py
+#
+# YOLO 얼굴 검출 + ResNetCBAM 웃음 분류 엔진
+# (FastAPI 프로세스 안에서 직접 쓰거나, 추론 워커 프로세스마다 하나씩 띄운다)
+
+import os
+import time
+import random
+from collections import namedtuple
+import numpy as np
+import torch
+from ultralytics import YOLO
+from huggingface_hub import hf_hub_download
+
+from server.backends import select_backend
+from server.emotion_model import load_emotion_model
+from server.preprocess import CropPreprocessor
+from server.tracker import FULL, ROI, REACQUIRE, largest_box, roi_accepted
+
+# 프레임 1장 추론 결과
+#   output  : {"emotion", "prob"}  (API 응답)
+#   box     : 선택된 얼굴 박스 (x1, y1, x2, y2) 또는 None
+#   kind    : 검출 방식 (full / roi / reacquire)
+#   outcome : no_face / too_small / crop_failed / laugh / other
+FrameResult = namedtuple("FrameResult", ["output", "box", "kind", "outcome"])
+
+OUTCOMES = ("no_face", "too_small", "crop_failed", "laugh", "other")
+
+# infer(timings=...) 에 누적되는 단계별 소요 시간(초)
+STAGES = ("yolo", "box_select", "preprocess", "classifier")
+
+
+def _add_time(timings, stage, started):
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + (time.perf_counter() - started)
+
+
+# ================================
+# 1) YOLO Face Detection (GPU)
+# ================================
+
+'''
+print("📥 YOLOv8 Face 모델 다운로드 중...")
+yolo_path = hf_hub_download(
+    repo_id="Reshma67/yolov8-face-detection",
+    filename="model.pt"
+)
+
+yolo_model = YOLO(yolo_path)
+yolo_model.to(DEVICE)
+'''
+
+
+def resolve_yolo_path(local_path, offline=False):
+    if os.path.exists(local_path):
+        print("📦 YOLOv11n Face 로컬 모델 사용:", local_path)
+        return local_path
+
+    print("📥 YOLOv11n Face 모델 다운로드 중...")
+    return hf_hub_download(
+        repo_id="AdamCodd/YOLOv11n-face-detection",
+        filename="model.pt",
+        local_files_only=offline,
+    )
+
+
+def _boxes_of(result):
+    boxes = result.boxes
+    return boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy()
+
+
+class InferenceEngine:
+    def __init__(self, device="cpu", model_path="", yolo_path="", offline=False,
+                 backend="eager", validate_dir="", max_prob_diff=0.02,
+                 laugh_threshold=0.43, min_face_size=80, detect_imgsz=320,
+                 roi_imgsz=160, track_min_conf=0.5, track_min_iou=0.3, max_batch=8,
+                 log_sample_rate=0.0):
+        self.device = device
+        self.model_path = model_path
+        self.yolo_path = yolo_path
+        self.offline = offline
+        self.backend_name = backend
+        self.validate_dir = validate_dir
+        self.max_prob_diff = max_prob_diff
+        self.laugh_threshold = laugh_threshold
+        self.min_face_size = min_face_size
+        self.detect_imgsz = detect_imgsz
+        self.roi_imgsz = roi_imgsz
+        self.track_min_conf = track_min_conf
+        self.track_min_iou = track_min_iou
+        self.max_batch = max_batch
+        # 프레임 단위 로그는 이 비율만큼만 출력 (0 이면 끔)
+        self.log_sample_rate = log_sample_rate
+
+        self.yolo_model = None
+        self.emotion_model = None
+        self.emotion_backend = None
+        self.preprocessor = CropPreprocessor(size=224, max_batch=max_batch, device=device)
+
+    # ================================
+    # 모델 로딩 → 워밍업
+    # ================================
+    def load(self, startup):
+        with startup.phase("yolo_load"):
+            model = YOLO(resolve_yolo_path(self.yolo_path, self.offline))
+            model.to(self.device)
+            self.yolo_model = model
+
+        with startup.phase("emotion_load"):
+            self.emotion_model = load_emotion_model(self.model_path, self.device)
+
+        warmup_sizes = sorted({1, 4, self.max_batch})
+
+        with startup.phase("emotion_backend"):
+            self.emotion_backend = select_backend(
+                self.backend_name,
+                self.emotion_model,
+                device=self.device,
+                validate_dir=self.validate_dir,
+                max_prob_diff=self.max_prob_diff,
+                threshold=self.laugh_threshold,
+                batch_sizes=warmup_sizes,
+            )
+
+        with startup.phase("warmup"):
+            dummy = np.zeros((640, 640, 3), dtype=np.uint8)
+            for bs in warmup_sizes:
+                self._yolo([dummy] * bs, self.detect_imgsz)
+                self._yolo([dummy[:320, :320]] * bs, self.roi_imgsz)
+                self.emotion_backend(self.preprocessor([dummy[:224, :224]] * bs))
+
+    def _yolo(self, images, imgsz, timings=None):
+        started = time.perf_counter()
+        results = self.yolo_model.predict(images, imgsz=imgsz, device=self.device, verbose=False)
+        _add_time(timings, "yolo", started)
+        return results
+
+    def _log(self, message):
+        if self.log_sample_rate > 0 and random.random() < self.log_sample_rate:
+            print(message)
+
+    # ================================
+    # 얼굴 검출 (전체 프레임 / 추적 ROI)
+    # ================================
+    def detect_faces(self, frames, plans, timings=None):
+        """plans[i] = (mode, roi, last_box) 또는 None(=전체 검출)
+
+        반환: [(box 또는 None, kind), ...]
+        """
+        found = [(None, FULL)] * len(frames)
+        full_index = []
+        roi_index = []
+
+        for i, plan in enumerate(plans):
+            if plan is not None and plan[0] == ROI:
+                roi_index.append(i)
+            else:
+                full_index.append(i)
+
+        # 직전 얼굴 주변 ROI만 작은 imgsz로 검출
+        reacquire = []
+        if roi_index:
+            roi_crops = []
+            for i in roi_index:
+                x1, y1, x2, y2 = plans[i][1]
+                roi_crops.append(frames[i][y1:y2, x1:x2])
+
+            results = self._yolo(roi_crops, self.roi_imgsz, timings)
+            started = time.perf_counter()
+            for i, result in zip(roi_index, results):
+                _, (rx1, ry1, _, _), last_box = plans[i]
+                box, conf = largest_box(*_boxes_of(result))
+                if box is not None:
+                    box = (box[0] + rx1, box[1] + ry1, box[2] + rx1, box[3] + ry1)
+
+                if roi_accepted(box, conf, last_box, self.track_min_conf, self.track_min_iou):
+                    found[i] = (box, ROI)
+                else:
+                    reacquire.append(i)
+            _add_time(timings, "box_select", started)
+
+        # 정기 전체 검출 + 추적 실패 프레임 재획득
+        reacquire_set = set(reacquire)
+        full_index += reacquire
+        if full_index:
+            results = self._yolo([frames[i] for i in full_index], self.detect_imgsz, timings)
+            started = time.perf_counter()
+            for i, result in zip(full_index, results):
+                box, _ = largest_box(*_boxes_of(result))
+                found[i] = (box, REACQUIRE if i in reacquire_set else FULL)
+            _add_time(timings, "box_select", started)
+
+        return found
+
+    # ================================
+    # 배치 추론 (YOLO + ResNetCBAM 1회)
+    # ================================
+    def infer(self, frames, scales, plans, timings=None):
+        """frames: RGB uint8 배열 리스트, scales: 디코딩 크기 / 원본 크기
+
+        timings 에 dict 를 넘기면 STAGES 별 소요 시간(초)이 누적된다.
+        """
+        results = [None] * len(frames)
+        detections = self.detect_faces(frames, plans, timings)
+
+        started = time.perf_counter()
+        crops = []
+        crop_index = []
+
+        for i, (img_np, scale, (box, kind)) in enumerate(zip(frames, scales, detections)):
+            # 얼굴 없음
+            if box is None:
+                self._log("\n[YOLO] 얼굴 없음")
+                results[i] = FrameResult({"emotion": "other", "prob": 0.0}, None, kind, "no_face")
+                continue
+
+            x1, y1, x2, y2 = map(int, box)
+
+            w = x2 - x1
+            h = y2 - y1
+
+            # 얼굴이 너무 작으면 분석 안 함
+            min_face = self.min_face_size * scale
+            if w < min_face or h < min_face:
+                self._log(f"\n[YOLO] 얼굴이 너무 작습니다. (width={w}, height={h})")
+                results[i] = FrameResult({"emotion": "other", "prob": 0.0}, box, kind, "too_small")
+                continue
+
+            # ================================
+            # Crop
+            # ================================
+            crop = img_np[y1:y2, x1:x2]
+
+            if crop.size == 0:
+                self._log("\n[YOLO] Crop 실패 (잘못된 박스)")
+                results[i] = FrameResult({"emotion": "other", "prob": 0.0}, box, kind, "crop_failed")
+                continue
+
+            crops.append(crop)
+            crop_index.append(i)
+
+        _add_time(timings, "box_select", started)
+
+        if not crops:
+            return results
+
+        # ================================
+        # Emotion Model
+        # ================================
+        started = time.perf_counter()
+        batch = self.preprocessor(crops)
+        _add_time(timings, "preprocess", started)
+
+        started = time.perf_counter()
+        output = self.emotion_backend(batch)
+        probs = torch.softmax(output.float(), dim=1)[:, 1].tolist()
+        _add_time(timings, "classifier", started)
+
+        for i, prob in zip(crop_index, probs):
+            label = "laugh" if prob > self.laugh_threshold else "other"
+            self._log(f"\n[EMOTION] prob={prob:.4f} → label={label}")
+            box, kind = detections[i]
+            results[i] = FrameResult({"emotion": label, "prob": prob}, box, kind, label)
+
+        return results
@@ -0,0 +1,340 @@
+# AI_realtime/server/loadtest.py
+#
+# 녹화된 웹캠 프레임을 재생해서 노드 1대가 버티는 동시 도전자 수를 잰다.
+#   - 모델은 이 프로세스 안에서 fastapi_server 와 똑같이 띄운다 (네트워크/HF Hub 접근 없음)
+#   - 세션 N 개가 각자 200ms 간격으로 /predict(base64) 또는 /predict/jpeg(binary) 경로를 호출
+#   - p50/p95/p99 지연, 달성 fps, CPU 사용률, 결과 분포를 JSON 으로 저장
+#
+# 사용 예 (AI_realtime/ 에서):
+#   python -m server.loadtest --sessions 8 --duration 30 --out bench/base.json
+#   python -m server.loadtest --sessions 8 --duration 30 --compare bench/base.json
+
+import os
+import sys
+import glob
+import json
+import time
+import base64
+import argparse
+import platform
+import threading
+import subprocess
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))          # server/
+PROJECT_DIR = os.path.dirname(os.path.dirname(BASE_DIR))       # AI_emotion_browser/
+
+DEFAULT_FRAME_GLOBS = (
+    os.path.join(PROJECT_DIR, "AI_pipeline", "frames", "*.jpg"),
+    os.path.join(PROJECT_DIR, "backend", "uploads", "*capture_*.jpg"),
+)
+
+# 비교 시 회귀로 보는 지표 (값이 클수록 나쁨 / 작을수록 나쁨)
+HIGHER_IS_WORSE = ("latency_ms.p50", "latency_ms.p95", "latency_ms.p99", "cpu.percent_of_machine")
+LOWER_IS_WORSE = ("fps",)
+
+
+# ================================
+# 프레임 / 환경 정보
+# ================================
+def load_frames(patterns):
+    paths = []
+    for pattern in patterns:
+        paths += sorted(glob.glob(pattern))
+
+    frames = []
+    for path in paths:
+        with open(path, "rb") as f:
+            frames.append(f.read())
+    return paths, frames
+
+
+def to_data_url(jpeg_bytes):
+    return "data:image/jpeg;base64," + base64.b64encode(jpeg_bytes).decode("ascii")
+
+
+def git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BASE_DIR, capture_output=True, text=True, timeout=5,
+        )
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def file_info(path):
+    if not os.path.exists(path):
+        return {"path": path, "exists": False}
+    st = os.stat(path)
+    return {"path": path, "exists": True, "bytes": st.st_size, "mtime": int(st.st_mtime)}
+
+
+def proc_cpu_seconds(pid):
+    """/proc/<pid>/stat 의 utime + stime (리눅스 전용, 없으면 None)"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except Exception:
+        return None
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else None
+
+
+# ================================
+# 세션 시뮬레이션
+# ================================
+class SessionRunner(threading.Thread):
+    """세션 1개: interval_s 마다 프레임 1장 전송 (밀리면 몰아서 보내지 않고 다음 틱으로)"""
+
+    def __init__(self, index, send_fn, payloads, interval_s, deadline):
+        super().__init__(name=f"loadtest-session-{index}", daemon=True)
+        self.session_id = f"loadtest-{index}"
+        self.send_fn = send_fn
+        self.payloads = payloads
+        self.offset = index  # 세션마다 다른 프레임부터 재생
+        self.interval_s = interval_s
+        self.deadline = deadline
+
+        self.latencies = []
+        self.emotions = {}
+        self.late = 0
+
+    def run(self):
+        # 세션 시작 시점을 interval 안에서 흩어 놓는다
+        time.sleep(self.interval_s * (self.offset % 10) / 10.0)
+        next_tick = time.perf_counter()
+        k = self.offset
+
+        while True:
+            now = time.perf_counter()
+            if now >= self.deadline:
+                return
+            if now < next_tick:
+                time.sleep(next_tick - now)
+
+            payload = self.payloads[k % len(self.payloads)]
+            k += 1
+
+            started = time.perf_counter()
+            result = self.send_fn(payload, self.session_id)
+            self.latencies.append((time.perf_counter() - started) * 1000.0)
+            emotion = result.get("emotion", "error")
+            self.emotions[emotion] = self.emotions.get(emotion, 0) + 1
+
+            next_tick += self.interval_s
+            if time.perf_counter() > next_tick:
+                self.late += 1
+                next_tick = time.perf_counter()
+
+
+# ================================
+# 실행
+# ================================
+def run_benchmark(args):
+    # fastapi_server 는 import 시점에 환경변수를 읽는다
+    os.environ.setdefault("MODEL_OFFLINE", "1")
+    if args.workers is not None:
+        os.environ["INFERENCE_WORKERS"] = str(args.workers)
+
+    from server import fastapi_server as srv
+
+    paths, jpegs = load_frames(args.frames or DEFAULT_FRAME_GLOBS)
+    if not jpegs:
+        raise SystemExit("❌ 재생할 프레임이 없습니다")
+    print(f"🎞️ 프레임 {len(jpegs)} 장 로드")
+
+    print("📦 모델 로딩...")
+    srv.load_models()
+    srv.startup.ready = True
+
+    if args.mode == "base64":
+        payloads = [to_data_url(b) for b in jpegs]
+
+        def send(payload, session_id):
+            response = srv.predict(srv.Frame(image=payload, session_id=session_id))
+            return json.loads(response.body)
+    else:
+        payloads = jpegs
+
+        def send(payload, session_id):
+            try:
+                decoded = srv.decode_timed(srv.decode_jpeg, payload, srv.DECODE_DRAFT_SIZE)
+                result = srv.submit_frame(decoded, session_id).result()
+            except Exception as e:
+                print("❌ PREDICT ERROR:", e)
+                srv.OUTCOMES_TOTAL.inc("error")
+                result = {"emotion": "error", "prob": -1}
+            srv.respond(result)
+            return result
+
+    # 워밍업 (세션 추적/게이트 상태는 남기지 않는다)
+    for payload in payloads[: args.warmup]:
+        send(payload, None)
+
+    outcomes_before = srv.OUTCOMES_TOTAL.values()
+    worker_pids = [w.process.pid for w in srv.pool.workers] if srv.pool is not None else []
+    cpu_before = [time.process_time()] + [proc_cpu_seconds(pid) for pid in worker_pids]
+
+    interval_s = args.interval_ms / 1000.0
+    started = time.perf_counter()
+    deadline = started + args.duration
+    runners = [SessionRunner(i, send, payloads, interval_s, deadline) for i in range(args.sessions)]
+    print(f"🏃 세션 {args.sessions} 개 × {args.interval_ms:.0f}ms 간격, {args.duration:.0f}s 실행 ({args.mode})")
+    for r in runners:
+        r.start()
+    for r in runners:
+        r.join()
+    wall = time.perf_counter() - started
+
+    cpu_after = [time.process_time()] + [proc_cpu_seconds(pid) for pid in worker_pids]
+    cpu_s = sum(a - b for a, b in zip(cpu_after, cpu_before) if a is not None and b is not None)
+    n_cpus = os.cpu_count() or 1
+
+    outcomes_after = srv.OUTCOMES_TOTAL.values()
+    outcomes = {
+        lv[0]: outcomes_after[lv] - outcomes_before.get(lv, 0)
+        for lv in outcomes_after
+        if outcomes_after[lv] - outcomes_before.get(lv, 0)
+    }
+
+    latencies = [ms for r in runners for ms in r.latencies]
+    emotions = {}
+    for r in runners:
+        for k, v in r.emotions.items():
+            emotions[k] = emotions.get(k, 0) + v
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": git_commit(),
+            "host": platform.node(),
+            "python": platform.python_version(),
+            "cpu_count": n_cpus,
+            "device": srv.DEVICE,
+            "model": file_info(srv.MODEL_PATH),
+            "yolo": file_info(srv.YOLO_LOCAL_PATH),
+            "frames": [os.path.relpath(p, PROJECT_DIR) for p in paths],
+        },
+        "config": {
+            "mode": args.mode,
+            "sessions": args.sessions,
+            "interval_ms": args.interval_ms,
+            "duration_s": args.duration,
+            "emotion_backend": srv.EMOTION_BACKEND,
+            "inference_workers": srv.INFERENCE_WORKERS,
+            "batch_max_size": srv.BATCH_MAX_SIZE,
+            "batch_max_wait_ms": srv.BATCH_MAX_WAIT_MS,
+            "track_detect_every": srv.TRACK_DETECT_EVERY,
+            "gate_diff_threshold": srv.GATE_DIFF_THRESHOLD,
+            "decode_draft_size": srv.DECODE_DRAFT_SIZE,
+        },
+        "requests": len(latencies),
+        "late_frames": sum(r.late for r in runners),
+        "target_fps": args.sessions / interval_s,
+        "fps": len(latencies) / wall if wall else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "mean": float(np.mean(latencies)) if latencies else None,
+            "max": float(np.max(latencies)) if latencies else None,
+        },
+        "cpu": {
+            "seconds": cpu_s,
+            "percent_of_core": cpu_s / wall * 100.0 if wall else 0.0,
+            "percent_of_machine": cpu_s / wall / n_cpus * 100.0 if wall else 0.0,
+        },
+        "outcomes": outcomes,
+        "emotions": emotions,
+        "batch": srv.batcher.stats(),
+        "gate": srv.gate.stats(),
+    }
+
+    srv.batcher.stop()
+    if srv.pool is not None:
+        srv.pool.close()
+    return report
+
+
+# ================================
+# 결과 출력 / 비교
+# ================================
+def _get(report, dotted):
+    value = report
+    for key in dotted.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def print_report(report):
+    lat = report["latency_ms"]
+    print(f"\n📊 요청 {report['requests']} 건, 밀린 프레임 {report['late_frames']} 건")
+    print(f"   fps      : {report['fps']:.1f} / 목표 {report['target_fps']:.1f}")
+    if lat["p50"] is not None:
+        print(f"   latency  : p50={lat['p50']:.1f}ms  p95={lat['p95']:.1f}ms  p99={lat['p99']:.1f}ms")
+    print(f"   cpu      : {report['cpu']['percent_of_core']:.0f}% (1코어 기준), "
+          f"{report['cpu']['percent_of_machine']:.0f}% (전체)")
+    print(f"   outcomes : {report['outcomes']}")
+    print(f"   avg batch: {report['batch']['avg_batch_size']:.2f}, gate hit rate: {report['gate']['hit_rate']:.2f}")
+
+
+def compare(report, baseline, tolerance):
+    """baseline 대비 tolerance(비율) 이상 나빠진 지표 목록"""
+    regressions = []
+    print(f"\n🔍 비교 기준: {baseline['meta'].get('git_commit')} ({baseline['meta'].get('timestamp')})")
+    for key in HIGHER_IS_WORSE + LOWER_IS_WORSE:
+        new, old = _get(report, key), _get(baseline, key)
+        if new is None or old is None or old == 0:
+            continue
+        change = (new - old) / old
+        worse = change > tolerance if key in HIGHER_IS_WORSE else change < -tolerance
+        mark = "❌" if worse else "  "
+        print(f"{mark} {key:<26}{old:>10.2f} → {new:>10.2f}  ({change * 100:+.1f}%)")
+        if worse:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="녹화 프레임 재생 부하 테스트 (in-process, offline)")
+    parser.add_argument("--sessions", type=int, default=8, help="동시 세션(도전자) 수")
+    parser.add_argument("--interval-ms", type=float, default=200.0, help="세션당 프레임 간격")
+    parser.add_argument("--duration", type=float, default=30.0, help="실행 시간(초)")
+    parser.add_argument("--mode", choices=("base64", "jpeg"), default="jpeg",
+                        help="base64 = /predict (data URL), jpeg = /predict/jpeg (binary)")
+    parser.add_argument("--frames", action="append", help="프레임 glob (여러 번 지정 가능)")
+    parser.add_argument("--workers", type=int, default=None, help="INFERENCE_WORKERS 덮어쓰기")
+    parser.add_argument("--warmup", type=int, default=4, help="측정 전 워밍업 프레임 수")
+    parser.add_argument("--out", default="", help="결과 JSON 저장 경로")
+    parser.add_argument("--compare", default="", help="비교할 이전 결과 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="회귀 판정 비율 (0.1 = 10%%)")
+    args = parser.parse_args()
+
+    report = run_benchmark(args)
+    print_report(report)
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 저장: {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ 회귀: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ 회귀 없음")
+
+
+if __name__ == "__main__":
+    main()
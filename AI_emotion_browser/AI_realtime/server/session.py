@@ -0,0 +1,65 @@
+# AI_realtime/server/session.py
+
+import threading
+import time
+
+
+class SessionState:
+    """챌린지 세션 하나에 붙는 서버 측 상태"""
+
+    def __init__(self, session_id, tracker):
+        self.session_id = session_id
+        self.tracker = tracker
+        self.created_at = time.time()
+        self.last_seen = self.created_at
+
+    def stats(self):
+        return {
+            "session_id": self.session_id,
+            "created_at": self.created_at,
+            "last_seen": self.last_seen,
+            "tracker": self.tracker.stats(),
+        }
+
+
+class SessionStore:
+    """session_id → SessionState (idle_ttl 초 동안 요청이 없으면 제거)"""
+
+    def __init__(self, factory, idle_ttl=300.0, max_sessions=1000):
+        self.factory = factory
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        if not session_id:
+            return None
+
+        now = time.time()
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                self._evict(now)
+                state = self.factory(session_id)
+                self._sessions[session_id] = state
+            state.last_seen = now
+            return state
+
+    def peek(self, session_id):
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def all(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+    def _evict(self, now):
+        expired = [sid for sid, s in self._sessions.items() if now - s.last_seen > self.idle_ttl]
+        for sid in expired:
+            del self._sessions[sid]
+
+        # 그래도 가득 차 있으면 가장 오래 안 쓴 세션부터 제거
+        while len(self._sessions) >= self.max_sessions:
+            oldest = min(self._sessions.values(), key=lambda s: s.last_seen)
+            del self._sessions[oldest.session_id]
@@ -0,0 +1,53 @@
+# AI_realtime/server/startup.py
+
+import time
+import threading
+import traceback
+from contextlib import contextmanager
+
+
+class StartupState:
+    """모델 로딩 단계별 소요 시간 + 준비(ready) 상태"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.ready = False
+        self.error = None
+        self.phases = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        print(f"⏱️ [startup] {name} ...")
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.phases[name] = round(elapsed * 1000.0, 1)
+            print(f"⏱️ [startup] {name} {elapsed:.2f}s")
+
+    def run_in_background(self, fn):
+        """fn() 을 별도 스레드에서 실행하고 끝나면 ready 로 전환"""
+        def target():
+            try:
+                fn()
+                self.ready = True
+                print(f"✅ [startup] ready ({time.time() - self.started_at:.2f}s)")
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+                traceback.print_exc()
+
+        thread = threading.Thread(target=target, name="model-startup", daemon=True)
+        thread.start()
+        return thread
+
+    def report(self):
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "error": self.error,
+                "uptime_s": round(time.time() - self.started_at, 1),
+                "phases_ms": dict(self.phases),
+            }
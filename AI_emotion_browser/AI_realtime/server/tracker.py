@@ -0,0 +1,110 @@
+# AI_realtime/server/tracker.py
+
+import threading
+
+
+def largest_box(boxes, confs=None):
+    """가장 큰 박스 선택 → ((x1, y1, x2, y2), conf)"""
+    if len(boxes) == 0:
+        return None, 0.0
+
+    areas = [(b[2] - b[0]) * (b[3] - b[1]) for b in boxes]
+    best = max(range(len(boxes)), key=lambda i: areas[i])
+    conf = float(confs[best]) if confs is not None else 1.0
+    return tuple(float(v) for v in boxes[best]), conf
+
+
+def box_iou(a, b):
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    if inter <= 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return inter / (area_a + area_b - inter)
+
+
+# 검출 방식
+FULL = "full"            # 정기 전체 프레임 검출
+ROI = "roi"              # 직전 박스 주변 ROI 검출
+REACQUIRE = "reacquire"  # ROI 추적 실패 → 전체 프레임 재검출
+
+
+def roi_accepted(box, conf, last_box, min_conf=0.5, min_iou=0.3):
+    """ROI 검출 결과를 추적 성공으로 볼지 판단"""
+    if box is None or conf < min_conf:
+        return False
+    if last_box is not None and box_iou(box, last_box) < min_iou:
+        return False
+    return True
+
+
+class FaceTracker:
+    """세션 단위 얼굴 추적기
+
+    - detect_every 프레임마다 한 번만 전체 프레임 YOLO(full)를 돌린다.
+    - 그 사이 프레임은 직전 박스 주변 ROI만 작은 imgsz로 YOLO(roi)를 돌린다.
+    - ROI 검출이 roi_accepted() 를 통과하지 못하면 전체 프레임 YOLO로
+      재획득(reacquire)한다. (판단은 추론 엔진에서 수행)
+    """
+
+    def __init__(self, detect_every=10, roi_margin=0.5):
+        self.detect_every = max(1, int(detect_every))
+        self.roi_margin = roi_margin
+
+        self.last_box = None
+        self.frames_since_full = 0
+        self._lock = threading.Lock()
+
+        # 카운터
+        self.full_detections = 0
+        self.tracked_frames = 0
+        self.reacquisitions = 0
+
+    # ------------------------------------------------------------
+    # 이번 프레임에서 어떤 검출을 할지 결정
+    # ------------------------------------------------------------
+    def plan(self, frame_shape):
+        """반환: (FULL, None, None) 또는 (ROI, (rx1, ry1, rx2, ry2), last_box)"""
+        with self._lock:
+            if self.last_box is None or self.frames_since_full >= self.detect_every - 1:
+                return FULL, None, None
+
+            h, w = frame_shape[:2]
+            x1, y1, x2, y2 = self.last_box
+            mx = (x2 - x1) * self.roi_margin
+            my = (y2 - y1) * self.roi_margin
+            roi = (
+                max(0, int(x1 - mx)), max(0, int(y1 - my)),
+                min(w, int(x2 + mx)), min(h, int(y2 + my)),
+            )
+            if roi[2] <= roi[0] or roi[3] <= roi[1]:
+                return FULL, None, None
+            return ROI, roi, self.last_box
+
+    # ------------------------------------------------------------
+    # 검출 결과 반영
+    # ------------------------------------------------------------
+    def record(self, kind, box):
+        with self._lock:
+            if kind == ROI:
+                self.tracked_frames += 1
+                self.frames_since_full += 1
+            else:
+                self.full_detections += 1
+                if kind == REACQUIRE:
+                    self.reacquisitions += 1
+                self.frames_since_full = 0
+            self.last_box = box
+
+    def stats(self):
+        with self._lock:
+            total = self.full_detections + self.tracked_frames
+            return {
+                "detect_every": self.detect_every,
+                "full_detections": self.full_detections,
+                "tracked_frames": self.tracked_frames,
+                "reacquisitions": self.reacquisitions,
+                "tracked_ratio": self.tracked_frames / total if total else 0.0,
+            }
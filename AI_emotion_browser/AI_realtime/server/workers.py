@@ -0,0 +1,363 @@
+# AI_realtime/server/workers.py
+#
+# 추론 워커 프로세스 풀
+#   - HTTP 프로세스는 디코딩/세션 관리만 하고, YOLO + ResNetCBAM 은 워커가 돌린다.
+#   - 워커마다 CPU 코어 몫을 고정(sched_setaffinity)하고 torch 스레드 수를 맞춘다.
+#   - 프레임/결과는 워커 전용 공유 메모리 슬롯으로 주고받는다.
+#     파이프로는 "n 장 처리해" / "끝났어(+단계별 시간)" 같은 작은 신호만 오간다.
+
+import gc
+import os
+import time
+import queue
+import traceback
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+
+from server.inference import FrameResult, OUTCOMES
+from server.tracker import FULL, ROI, REACQUIRE
+
+KINDS = (FULL, ROI, REACQUIRE)
+
+# 슬롯별 메타 행: h, w, scale, mode(0=full,1=roi), roi(4), last_box(4), has_last_box
+META_WIDTH = 13
+# 슬롯별 결과 행: outcome, prob, has_box, box(4), kind
+RESULT_WIDTH = 8
+
+
+# ================================
+# 공유 메모리 슬롯
+# ================================
+class SharedSlots:
+    """워커 1개 전용 공유 메모리: 프레임 슬롯 n_slots 개 + 메타/결과 행"""
+
+    def __init__(self, n_slots, slot_bytes, name=None):
+        self.n_slots = n_slots
+        self.slot_bytes = slot_bytes
+
+        frame_bytes = n_slots * slot_bytes
+        meta_bytes = n_slots * META_WIDTH * 8
+        result_bytes = n_slots * RESULT_WIDTH * 8
+
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=frame_bytes + meta_bytes + result_bytes)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+            _untrack(self.shm)
+
+        buf = self.shm.buf
+        self.meta = np.ndarray((n_slots, META_WIDTH), np.float64, buffer=buf, offset=frame_bytes)
+        self.results = np.ndarray((n_slots, RESULT_WIDTH), np.float64, buffer=buf,
+                                  offset=frame_bytes + meta_bytes)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def frame_view(self, k, h, w):
+        """슬롯 k 앞부분을 (h, w, 3) 연속 배열로 본다 (복사 없음)"""
+        return np.ndarray((h, w, 3), np.uint8, buffer=self.shm.buf, offset=k * self.slot_bytes)
+
+    # ------------------------------------------------------------
+    # HTTP 프로세스 → 워커
+    # ------------------------------------------------------------
+    def write_batch(self, frames, scales, plans):
+        for k, (img_np, scale, plan) in enumerate(zip(frames, scales, plans)):
+            h, w = img_np.shape[:2]
+            self.frame_view(k, h, w)[...] = img_np
+
+            row = self.meta[k]
+            row[:] = 0.0
+            row[0], row[1], row[2] = h, w, scale
+            if plan is not None and plan[0] == ROI:
+                _, roi, last_box = plan
+                row[3] = 1.0
+                row[4:8] = roi
+                if last_box is not None:
+                    row[8:12] = last_box
+                    row[12] = 1.0
+
+    def read_batch(self, n):
+        frames, scales, plans = [], [], []
+        for k in range(n):
+            row = self.meta[k]
+            h, w = int(row[0]), int(row[1])
+            frames.append(self.frame_view(k, h, w))
+            scales.append(float(row[2]))
+            if row[3] == 1.0:
+                roi = tuple(int(v) for v in row[4:8])
+                last_box = tuple(float(v) for v in row[8:12]) if row[12] == 1.0 else None
+                plans.append((ROI, roi, last_box))
+            else:
+                plans.append(None)
+        return frames, scales, plans
+
+    # ------------------------------------------------------------
+    # 워커 → HTTP 프로세스
+    # ------------------------------------------------------------
+    def write_results(self, results):
+        for k, r in enumerate(results):
+            row = self.results[k]
+            row[:] = 0.0
+            row[0] = OUTCOMES.index(r.outcome)
+            row[1] = r.output["prob"]
+            if r.box is not None:
+                row[2] = 1.0
+                row[3:7] = r.box
+            row[7] = KINDS.index(r.kind)
+
+    def read_results(self, n):
+        results = []
+        for k in range(n):
+            row = self.results[k]
+            outcome = OUTCOMES[int(row[0])]
+            box = tuple(float(v) for v in row[3:7]) if row[2] == 1.0 else None
+            emotion = "laugh" if outcome == "laugh" else "other"
+            output = {"emotion": emotion, "prob": float(row[1])}
+            results.append(FrameResult(output, box, KINDS[int(row[7])], outcome))
+        return results
+
+    def close(self):
+        # numpy 뷰가 버퍼를 잡고 있으면 close() 가 BufferError 로 실패한다
+        self.meta = self.results = None
+        gc.collect()
+        try:
+            self.shm.close()
+        except BufferError as e:
+            # 남은 뷰가 있어도 종료는 계속 (매핑은 프로세스 종료 시 해제됨)
+            print(f"⚠️ 공유 메모리 close 실패 ({self.shm.name}): {e}")
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _untrack(shm):
+    # 워커 쪽에서 붙기만 한 공유 메모리를 resource_tracker 가 지우지 않도록 한다.
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+
+
+# ================================
+# 워커 프로세스 본체
+# ================================
+def _worker_main(index, shm_name, n_slots, slot_bytes, conn, engine_config, cores, threads):
+    import torch
+    from server.inference import InferenceEngine
+    from server.startup import StartupState
+
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+
+    slots = SharedSlots(n_slots, slot_bytes, name=shm_name)
+    startup = StartupState()
+
+    try:
+        engine = InferenceEngine(**engine_config)
+        engine.load(startup)
+    except Exception as e:
+        traceback.print_exc()
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+        slots.close()
+        return
+
+    conn.send(("ready", {
+        "phases_ms": startup.report()["phases_ms"],
+        "backend": engine.emotion_backend.stats(),
+    }))
+    print(f"👷 worker-{index} ready (pid={os.getpid()}, cores={cores}, threads={threads})")
+
+    while True:
+        try:
+            n = conn.recv()
+        except EOFError:
+            break
+        if n is None:
+            break
+
+        frames = None
+        try:
+            frames, scales, plans = slots.read_batch(n)
+            timings = {}
+            slots.write_results(engine.infer(frames, scales, plans, timings))
+            conn.send(("done", timings))
+        except Exception as e:
+            traceback.print_exc()
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+        finally:
+            # 공유 메모리 뷰를 다음 요청까지 들고 있지 않도록 (종료 시 close 실패 방지)
+            del frames
+
+    # 엔진(전처리 버퍼 등)이 잡고 있을 수 있는 뷰까지 놓은 뒤 close
+    del engine
+    slots.close()
+
+
+# ================================
+# HTTP 프로세스 쪽 워커 핸들
+# ================================
+class _Worker:
+    def __init__(self, ctx, index, engine_config, max_batch, slot_bytes, cores, threads):
+        self.ctx = ctx
+        self.index = index
+        self.engine_config = engine_config
+        self.cores = cores
+        self.threads = threads
+
+        self.slots = SharedSlots(max_batch, slot_bytes)
+        self.process = None
+        self.conn = None
+        self.info = {}
+
+        self.batches = 0
+        self.frames = 0
+        self.busy_s = 0.0
+        self.restarts = 0
+
+    def spawn(self):
+        parent_conn, child_conn = self.ctx.Pipe()
+        self.process = self.ctx.Process(
+            target=_worker_main,
+            args=(self.index, self.slots.name, self.slots.n_slots, self.slots.slot_bytes,
+                  child_conn, self.engine_config, self.cores, self.threads),
+            name=f"inference-worker-{self.index}",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+
+    def wait_ready(self):
+        status, payload = self.conn.recv()
+        if status != "ready":
+            raise RuntimeError(f"worker-{self.index} 시작 실패: {payload}")
+        self.info = payload
+
+    def restart(self):
+        print(f"♻️ worker-{self.index} 재시작")
+        self.stop()
+        self.restarts += 1
+        self.spawn()
+        self.wait_ready()
+
+    def run(self, frames, scales, plans, timings=None):
+        if not self.process.is_alive():
+            self.restart()
+
+        started = time.perf_counter()
+        n = len(frames)
+        self.slots.write_batch(frames, scales, plans)
+
+        try:
+            self.conn.send(n)
+            status, payload = self.conn.recv()
+        except (EOFError, BrokenPipeError, ConnectionResetError) as e:
+            self.restart()
+            raise RuntimeError(f"worker-{self.index} 연결 끊김: {e}")
+
+        if status != "done":
+            raise RuntimeError(f"worker-{self.index}: {payload}")
+
+        # 워커가 잰 단계별 시간(작은 dict)만 파이프로 돌아온다
+        if timings is not None:
+            for stage, seconds in payload.items():
+                timings[stage] = timings.get(stage, 0.0) + seconds
+
+        results = self.slots.read_results(n)
+        self.batches += 1
+        self.frames += n
+        self.busy_s += time.perf_counter() - started
+        return results
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            self.conn.send(None)
+        except Exception:
+            pass
+        self.process.join(timeout=5.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+    def stats(self):
+        return {
+            "worker": self.index,
+            "pid": self.process.pid if self.process else None,
+            "alive": bool(self.process and self.process.is_alive()),
+            "cores": self.cores,
+            "threads": self.threads,
+            "batches": self.batches,
+            "frames": self.frames,
+            "busy_s": round(self.busy_s, 3),
+            "restarts": self.restarts,
+            **self.info,
+        }
+
+
+def split_cores(n_workers):
+    """사용 가능한 코어를 워커 수만큼 나눈다"""
+    if hasattr(os, "sched_getaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+    else:
+        cores = list(range(os.cpu_count() or 1))
+
+    if n_workers >= len(cores):
+        return [[cores[i % len(cores)]] for i in range(n_workers)]
+
+    share = len(cores) // n_workers
+    return [cores[i * share:(i + 1) * share] for i in range(n_workers)]
+
+
+class WorkerPool:
+    """추론 워커 프로세스 n_workers 개 (각자 모델 1벌 + 공유 메모리 슬롯 max_batch 개)"""
+
+    def __init__(self, n_workers, engine_config, max_batch=8, max_frame_side=1280, threads_per_worker=0):
+        self.ctx = mp.get_context("spawn")
+        self.slot_bytes = max_frame_side * max_frame_side * 3
+
+        self.workers = []
+        for i, cores in enumerate(split_cores(n_workers)):
+            threads = threads_per_worker or len(cores)
+            self.workers.append(
+                _Worker(self.ctx, i, engine_config, max_batch, self.slot_bytes, cores, threads)
+            )
+
+        self._idle = queue.Queue()
+
+    def start(self, startup):
+        with startup.phase("workers_start"):
+            for w in self.workers:
+                w.spawn()
+            for w in self.workers:
+                w.wait_ready()
+                self._idle.put(w)
+
+    def check_frame(self, img_np):
+        if img_np.nbytes > self.slot_bytes:
+            raise ValueError(f"frame too large for worker slot: {img_np.shape}")
+
+    def infer(self, frames, scales, plans, timings=None):
+        worker = self._idle.get()
+        try:
+            return worker.run(frames, scales, plans, timings)
+        finally:
+            self._idle.put(worker)
+
+    def stats(self):
+        return {"workers": [w.stats() for w in self.workers]}
+
+    def close(self):
+        for w in self.workers:
+            w.stop()
+            w.slots.close()
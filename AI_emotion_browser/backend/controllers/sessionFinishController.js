@@ -5,6 +5,41 @@
 import axios from "axios";
 import supabase from "../supabase/supabase.js";
 
+const LLM_SERVER = "http://localhost:8100";
+const JOB_POLL_MS = 1000;
+const JOB_WAIT_MS = 10 * 60 * 1000;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// 8100 작업 큐에 배치 분석 등록 → 끝날 때까지 상태 조회
+// (큐가 가득 차면 429 + Retry-After 만큼 기다렸다가 다시 등록)
+async function runBatchJob(payload) {
+  let deadline = Date.now() + JOB_WAIT_MS;
+
+  let jobId;
+  while (!jobId) {
+    const res = await axios.post(`${LLM_SERVER}/jobs/laugh-events/batch`, payload, {
+      validateStatus: (status) => status === 202 || status === 429,
+    });
+    if (res.status === 202) {
+      jobId = res.data.job_id;
+      // 서버가 window 수에 맞춰 늘린 제한 시간(재시도 포함)만큼은 기다린다
+      deadline = Date.now() + Math.max(JOB_WAIT_MS, (res.data.wait_s || 0) * 1000 + JOB_POLL_MS * 5);
+    } else {
+      if (Date.now() > deadline) throw new Error("LLM 작업 큐 대기 시간 초과");
+      await sleep(Number(res.headers["retry-after"] || 5) * 1000);
+    }
+  }
+
+  while (Date.now() < deadline) {
+    await sleep(JOB_POLL_MS);
+    const { data: job } = await axios.get(`${LLM_SERVER}/jobs/${jobId}`);
+    if (job.status === "done") return job.result;
+    if (job.status === "failed") throw new Error(`LLM 작업 실패: ${job.error}`);
+  }
+  throw new Error(`LLM 작업 시간 초과: ${jobId}`);
+}
+
 export async function finishSession(req, res) {
   const { session_uuid } = req.params;
 
@@ -25,39 +60,45 @@ export async function finishSession(req, res) {
       return res.json({ success: true, message: "분석할 이벤트 없음" });
     }
 
-    const results = [];
+    // 2) 8100 LLM 서버 작업 큐에 세션의 모든 이벤트를 한 번에 전달
+    //    (구간 디코딩 1회 + 이벤트별 병렬 분석 → 가장 느린 이벤트 1개 시간 정도)
+    const batch = await runBatchJob({
+      events: events.map((ev) => ({
+        event_id: ev.id,
+        start_time: ev.start_time,
+        end_time: ev.end_time,
+      })),
+    });
 
-    for (const ev of events) {
-      // 2) 8100 LLM 서버에 필요한 데이터만 전달
-      const resLLM = await axios.post(
-        "http://localhost:8100/laugh-event",
-        {
-          event_id: ev.id,
-          start_time: ev.start_time,
-          end_time: ev.end_time,
+    const aiById = new Map(batch.results.map((ai) => [ai.event_id, ai]));
+
+    // 3) Supabase에 결과 업데이트 (이벤트별 병렬)
+    const results = await Promise.all(
+      events.map(async (ev) => {
+        const ai = aiById.get(ev.id) || {};
+
+        if (!ai.success) {
+          console.error(`❌ 이벤트 ${ev.id} 분석 실패:`, ai.error);
+        } else {
+          await supabase
+            .from("laugh_events")
+            .update({
+              tags: ai.tags || [],
+              label: ai.label || [],
+              summary: ai.summary || "",
+              raw_response: ai.raw,
+            })
+            .eq("id", ev.id);
         }
-      );
-
-      const ai = resLLM.data; 
-
-      // 3) Supabase에 결과 업데이트
-      await supabase
-        .from("laugh_events")
-        .update({
-          tags: ai.tags || [],
-          label: ai.label || [],
-          summary: ai.summary || "",
-          raw_response: ai.raw,
-        })
-        .eq("id", ev.id);
-
-      results.push({
-        event_index: ev.event_index,
-        tags: ai.tags,
-        label: ai.label,
-        summary: ai.summary,
-      });
-    }
+
+        return {
+          event_index: ev.event_index,
+          tags: ai.tags,
+          label: ai.label,
+          summary: ai.summary,
+        };
+      })
+    );
 
     return res.json({
       success: true,
@@ -77,7 +77,7 @@ export default function ChallengePage() {
       const res = await fetch("http://localhost:8000/predict", {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ image: base64 }),
+        body: JSON.stringify({ image: base64, session_id: sessionUUID }),
       });
 
       if (!res.ok) return;
@@ -132,34 +132,56 @@ with tab2:
     if not labels or len(labels) < 2:
         st.warning("⚠️ 학습을 시작하려면 최소 2개 이상의 클래스(폴더)에 이미지가 있어야 합니다. '데이터셋 관리' 탭으로 이동하세요.")
     else:
+        # 학습은 별도 프로세스(manager.runner)에서 실행 → UI 가 멈추지 않음
+        runner = manager.runner
+        status = runner.poll()
+        training = runner.is_alive()
+
         col_train_btn, col_status = st.columns([1, 3])
         
+        train_modes = {
+            "전체 학습": "full",
+            "빠른 재학습 (fc)": "fc",
+            "빠른 재학습 (fc + layer4)": "layer4",
+        }
         with col_train_btn:
-            start_train = st.button("🔥 학습 시작", type="primary")
+            mode_name = st.radio("학습 방식", list(train_modes), help="빠른 재학습: backbone 을 고정하고 캐시된 특징으로 분류기만 다시 학습합니다.")
+            resume_train = st.checkbox("이전 학습 이어하기", value=True, help="중단된 지점(epoch/batch)부터 이어서 학습합니다.",
+                                       disabled=train_modes[mode_name] != "full")
+            start_train = st.button("🔥 학습 시작", type="primary", disabled=training)
         
         if start_train:
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            chart_place = st.empty()
-            
-            status_text.write("데이터셋 준비 중...")
-            
-            # Streamlit에서 로그를 실시간으로 보여주기는 어려우므로, 
-            # model.py의 train_process를 직접 호출하되 예외처리
-            try:
-                with st.spinner(f"{Config.MODEL_ARCH} 모델 학습 중... (시간이 걸릴 수 있습니다)"):
-                    # 실제 학습 함수 호출
-                    manager.train_process()
-                
-                progress_bar.progress(100)
-                st.balloons()
-                st.success("🎉 학습이 완료되었습니다! '모델 테스트' 탭에서 성능을 확인해보세요.")
-                
-                # 학습 결과 요약
-                st.json(manager.train_status)
-                
-            except Exception as e:
-                st.error(f"학습 중 오류 발생: {e}")
+            runner.start(resume=resume_train, mode=train_modes[mode_name])
+            st.rerun()
+
+        if training:
+            col_pause, col_cancel = st.columns(2)
+            with col_pause:
+                if status.get("paused"):
+                    if st.button("▶️ 재개"): runner.resume()
+                elif st.button("⏸️ 일시정지"):
+                    runner.pause()
+            with col_cancel:
+                if st.button("⏹️ 중단 (이어하기 가능)"): runner.cancel()
+
+            total_epochs = max(1, status.get("total_epochs", Config.EPOCHS))
+            total_batches = max(1, status.get("total_batches", 1))
+            done = max(0, status.get("epoch", 0) - 1) + min(status.get("batch", 0), total_batches) / total_batches
+            st.progress(min(1.0, done / total_epochs))
+            st.write(f"상태: **{status.get('message')}** | 에폭 {status.get('epoch', 0)}/{total_epochs} "
+                     f"| 배치 {status.get('batch', 0)}/{total_batches} | {status.get('images_per_sec', 0):.0f} img/s")
+            st.json(status)
+
+            # 진행 상황 갱신
+            time.sleep(1)
+            st.rerun()
+        elif status.get("message") == "done":
+            st.balloons()
+            st.success("🎉 학습이 완료되었습니다! '모델 테스트' 탭에서 성능을 확인해보세요.")
+            st.json(status)
+        elif status.get("message") not in (None, "idle"):
+            st.info(f"마지막 학습 상태: {status.get('message')}")
+            st.json(status)
 
 # ---------------------------------------------------------
 # 탭 3: 데이터셋 관리 (Data Management)
@@ -221,7 +243,7 @@ with tab3:
                         count += 1
                         progress.progress((i + 1) / len(uploaded_images))
                     
-                    st.success(f"{count}장의 이미지가 '{target_class}'에 저장되었습니다.")
+                    st.success(f"{count}장의 이미지가 '{target_class}'에 저장되었습니다. '모델 학습' 탭의 빠른 재학습으로 바로 반영할 수 있습니다.")
                     time.sleep(1)
                     st.rerun()
                 else:
@@ -1,16 +1,23 @@
 import os
+import csv
+import glob
 import json
 import time
 import shutil
+import hashlib
 import random
+import multiprocessing as mp
+from queue import Empty
 import numpy as np
-from typing import List, Dict, Optional, Tuple, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple, Any, Iterable, Iterator, Union
 
 from PIL import Image
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 import torch.optim as optim
-from torch.utils.data import Dataset, DataLoader, random_split, Subset
+from torch.utils.data import Dataset, DataLoader, Sampler, Subset
 import torchvision.transforms as T
 import torchvision.models as models
 
@@ -28,9 +35,14 @@ class Config:
     MODELS_DIR = os.path.join(BASE_DIR, "models")
     CHECKPOINTS_DIR = os.path.join(MODELS_DIR, "checkpoints")
     
+    CACHE_DIR = os.path.join(DATA_DIR, "cache")
+    FEATURES_DIR = os.path.join(DATA_DIR, "features")
+    
     CLASS_INDEX_PATH = os.path.join(MODELS_DIR, "class_index.json")
     LAST_CKPT_PATH = os.path.join(CHECKPOINTS_DIR, "last.pt")
     BEST_CKPT_PATH = os.path.join(CHECKPOINTS_DIR, "best.pt")
+    # 이어하기용 전체 상태 (모델 + AdamW + epoch/batch 위치 + RNG + 데이터 분할)
+    RESUME_CKPT_PATH = os.path.join(CHECKPOINTS_DIR, "resume.pt")
     
     DEFAULT_EMOTIONS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
     DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
@@ -41,6 +53,26 @@ class Config:
     LEARNING_RATE = 0.0005 # 고급 모델은 학습률을 조금 낮추는 게 안전함
     EPOCHS = 15
 
+    # 데이터셋 캐시: 원본 JPEG를 1번만 디코딩해서 uint8 memmap으로 보관 (epoch마다 디코딩 X)
+    USE_DATASET_CACHE = True
+    CACHE_IMG_SIZE = 256  # 캐시에 저장할 작업 해상도 (IMG_SIZE 이상 권장)
+
+    # 데이터 파이프라인: "batched" = uint8 배치를 받아 증강을 배치 텐서 연산으로 (DEVICE 에서)
+    #                    "per_sample" = 기존 방식 (PIL 이미지 1장씩 transform)
+    DATA_PIPELINE = "batched"
+    NUM_WORKERS = min(4, os.cpu_count() or 1)
+    PREFETCH_FACTOR = 2
+    PIN_MEMORY = torch.cuda.is_available()
+    CKPT_EVERY_BATCHES = 50  # epoch 중간에도 N 배치마다 resume.pt 저장 (0 = epoch 끝에서만)
+    SEED = 42
+
+    # 빠른 재학습: backbone 고정 + 특징 캐시 위에서 head("fc") 또는 head + layer4("layer4")만 학습
+    FINETUNE_MODE = "fc"
+    FINETUNE_EPOCHS = 30
+    FINETUNE_LR = 0.001
+    FINETUNE_BATCH_SIZE = 256
+    FEATURES_MAX_BYTES = 4 * 1024 ** 3  # 특징 캐시 전체 예산 (넘으면 오래 안 쓴 지문부터 삭제)
+
     @classmethod
     def ensure_dirs(cls):
         os.makedirs(cls.MODELS_DIR, exist_ok=True)
@@ -137,11 +169,287 @@ class TransformSubset(Dataset):
         self.subset = subset
         self.transform = transform
     def __getitem__(self, index):
+        # EpochSampler 는 (index, seed) 를 넘김 → 워커 RNG 와 무관하게 샘플별로 같은 증강
+        seed = None
+        if isinstance(index, tuple): index, seed = index
         x, y = self.subset[index]
-        if self.transform: x = self.transform(x)
+        if self.transform:
+            if seed is None: x = self.transform(x)
+            else:
+                py_state = random.getstate()
+                with torch.random.fork_rng(devices=[]):
+                    torch.manual_seed(seed)
+                    random.seed(seed)
+                    x = self.transform(x)
+                random.setstate(py_state)
         return x, y
     def __len__(self): return len(self.subset)
 
+# =========================
+# 3-1. Dataset Cache (memmap)
+# =========================
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.webp')
+
+class DatasetCache:
+    """uploads/<label>/ 이미지를 (N, S, S, 3) uint8 memmap 샤드 1개 + JSON 인덱스로 보관
+
+    - sync(): 추가/삭제/변경(크기·수정시각)된 파일만 다시 디코딩 (나머지는 그대로)
+    - 삭제된 파일의 슬롯은 재사용, 부족하면 샤드 파일을 늘림
+    - images[slot] 은 memmap 뷰 (복사 없음)
+    """
+    def __init__(self, root_dir: str, cache_dir: Optional[str] = None, size: Optional[int] = None):
+        # 기본값은 호출 시점의 Config 에서 (러너가 자식 프로세스에서 Config 를 덮어쓰므로)
+        cache_dir = cache_dir or Config.CACHE_DIR
+        size = size or Config.CACHE_IMG_SIZE
+        self.root_dir = root_dir
+        self.size = size
+        os.makedirs(cache_dir, exist_ok=True)
+        self.data_path = os.path.join(cache_dir, f"images_{size}.u8")
+        self.index_path = os.path.join(cache_dir, f"index_{size}.json")
+        self.frame_bytes = size * size * 3
+
+        # rel_path -> {"label", "slot", "bytes", "mtime_ns"}
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.capacity = 0
+        if os.path.exists(self.index_path) and os.path.exists(self.data_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("size") == size:
+                self.entries = data["entries"]
+                self.capacity = os.path.getsize(self.data_path) // self.frame_bytes
+        self.images = self._open()
+
+    def __getstate__(self):
+        # DataLoader 워커로 넘길 때 memmap 내용을 pickle 하지 않도록 (워커에서 다시 open)
+        state = self.__dict__.copy()
+        state["images"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.images = self._open()
+
+    def _open(self):
+        if self.capacity == 0: return np.zeros((0, self.size, self.size, 3), dtype=np.uint8)
+        # "c" = copy-on-write: 읽기는 페이지 캐시 공유, torch.from_numpy 경고 없음
+        return np.memmap(self.data_path, dtype=np.uint8, mode="c", shape=(self.capacity, self.size, self.size, 3))
+
+    def _scan(self) -> Dict[str, Tuple[str, int, int]]:
+        found = {}
+        for label in sorted(os.listdir(self.root_dir)):
+            label_dir = os.path.join(self.root_dir, label)
+            if not os.path.isdir(label_dir): continue
+            for fname in os.listdir(label_dir):
+                if not fname.lower().endswith(IMAGE_EXTS): continue
+                st = os.stat(os.path.join(label_dir, fname))
+                found[os.path.join(label, fname)] = (label, st.st_size, st.st_mtime_ns)
+        return found
+
+    def _decode(self, rel_path: str) -> np.ndarray:
+        try:
+            img = Image.open(os.path.join(self.root_dir, rel_path))
+            img.draft("RGB", (self.size, self.size))  # JPEG는 DCT 단계에서 축소 디코딩
+            img = img.convert("RGB").resize((self.size, self.size), Image.BILINEAR)
+            return np.asarray(img, dtype=np.uint8)
+        except Exception:
+            return np.zeros((self.size, self.size, 3), dtype=np.uint8)
+
+    def sync(self, workers: int = 8) -> Dict[str, int]:
+        found = self._scan()
+        removed = [p for p in self.entries if p not in found]
+        changed = [p for p, (_, nbytes, mtime) in found.items()
+                   if p in self.entries and (self.entries[p]["bytes"], self.entries[p]["mtime_ns"]) != (nbytes, mtime)]
+        added = [p for p in found if p not in self.entries]
+
+        free = sorted({e["slot"] for p, e in self.entries.items() if p in removed} |
+                      (set(range(self.capacity)) - {e["slot"] for e in self.entries.values()}))
+        for p in removed: del self.entries[p]
+
+        todo = changed + added
+        if todo:
+            need = len(added) - len(free)
+            if need > 0:
+                # 샤드 파일 확장 (여유분 포함)
+                new_capacity = self.capacity + max(need, self.capacity // 4)
+                self.images = None
+                with open(self.data_path, "ab") as f: f.truncate(new_capacity * self.frame_bytes)
+                free += list(range(self.capacity, new_capacity))
+                self.capacity = new_capacity
+
+            slots = [self.entries[p]["slot"] for p in changed] + free[:len(added)]
+            writer = np.memmap(self.data_path, dtype=np.uint8, mode="r+", shape=(self.capacity, self.size, self.size, 3))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for rel_path, slot, arr in zip(todo, slots, pool.map(self._decode, todo)):
+                    writer[slot] = arr
+                    label, nbytes, mtime = found[rel_path]
+                    self.entries[rel_path] = {"label": label, "slot": slot, "bytes": nbytes, "mtime_ns": mtime}
+            writer.flush()
+            del writer
+
+        if todo or removed:
+            tmp = self.index_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"size": self.size, "entries": self.entries}, f)
+            os.replace(tmp, self.index_path)
+            self.images = self._open()
+
+        stats = {"total": len(self.entries), "added": len(added), "changed": len(changed), "removed": len(removed)}
+        print(f"[DatasetCache] {stats}")
+        return stats
+
+    def samples(self, class_to_idx: Dict[str, int]) -> List[Tuple[int, int]]:
+        """[(slot, label_idx), ...] (경로 순 정렬 → 순서 고정)"""
+        return [(e["slot"], class_to_idx[e["label"]]) for p, e in sorted(self.entries.items()) if e["label"] in class_to_idx]
+
+    def paths(self, class_to_idx: Dict[str, int]) -> List[str]:
+        """samples() 와 같은 순서의 원본 파일 경로"""
+        return [os.path.join(self.root_dir, p) for p, e in sorted(self.entries.items()) if e["label"] in class_to_idx]
+
+class CachedImageDataset(Dataset):
+    """DatasetCache 에서 읽는 Dataset: (C, H, W) uint8 텐서 (memmap 뷰를 그대로 감쌈)"""
+    def __init__(self, cache: DatasetCache, class_to_idx: Dict[str, int], transform=None):
+        self.cache = cache
+        self.samples = cache.samples(class_to_idx)
+        self.transform = transform
+
+    def __len__(self): return len(self.samples)
+    def __getitem__(self, idx):
+        slot, label_idx = self.samples[idx]
+        image = torch.from_numpy(self.cache.images[slot]).permute(2, 0, 1)
+        if self.transform: image = self.transform(image)
+        return image, label_idx
+
+# =========================
+# 3-2. Batched Augmentation (배치 텐서 연산)
+# =========================
+class BatchAugment:
+    """uint8 (B, C, H, W) 배치 → 정규화된 float 배치
+
+    train=True 이면 샘플마다 다른 랜덤 파라미터로 flip / rotation / color jitter 를
+    배치 전체에 한 번에 적용 (get_transforms 의 train_tf 와 같은 범위)
+    """
+    MEAN = (0.485, 0.456, 0.406)
+    STD = (0.229, 0.224, 0.225)
+    GRAY = (0.299, 0.587, 0.114)
+
+    def __init__(self, image_size: int, degrees: float = 10, brightness: float = 0.2,
+                 contrast: float = 0.2, saturation: float = 0.2, hue: float = 0.05):
+        self.image_size = image_size
+        self.degrees = degrees
+        self.brightness, self.contrast, self.saturation, self.hue = brightness, contrast, saturation, hue
+
+    @staticmethod
+    def _factor(n, amount, device):
+        return torch.empty(n, 1, 1, 1, device=device).uniform_(1 - amount, 1 + amount)
+
+    def _gray(self, x):
+        w = torch.tensor(self.GRAY, device=x.device).view(1, 3, 1, 1)
+        return (x * w).sum(dim=1, keepdim=True)
+
+    def _rotate(self, x):
+        n = x.size(0)
+        theta = torch.empty(n, device=x.device).uniform_(-self.degrees, self.degrees).deg2rad()
+        cos, sin, zero = theta.cos(), theta.sin(), torch.zeros_like(theta)
+        affine = torch.stack([torch.stack([cos, -sin, zero], 1), torch.stack([sin, cos, zero], 1)], 1)
+        grid = F.affine_grid(affine, list(x.shape), align_corners=False)
+        return F.grid_sample(x, grid, mode="bilinear", padding_mode="zeros", align_corners=False)
+
+    def _shift_hue(self, x):
+        # YIQ 공간에서 색상(I, Q) 평면을 샘플별 각도로 회전
+        n = x.size(0)
+        angle = torch.empty(n, device=x.device).uniform_(-self.hue, self.hue) * 2 * np.pi
+        to_yiq = torch.tensor([[0.299, 0.587, 0.114], [0.596, -0.274, -0.322], [0.211, -0.523, 0.312]], device=x.device)
+        to_rgb = torch.linalg.inv(to_yiq)
+        cos, sin, one, zero = angle.cos(), angle.sin(), torch.ones_like(angle), torch.zeros_like(angle)
+        rot = torch.stack([torch.stack([one, zero, zero], 1),
+                           torch.stack([zero, cos, -sin], 1),
+                           torch.stack([zero, sin, cos], 1)], 1)
+        m = to_rgb @ rot @ to_yiq  # (B, 3, 3)
+        return torch.einsum("bij,bjhw->bihw", m, x)
+
+    def __call__(self, x: torch.Tensor, train: bool = True) -> torch.Tensor:
+        x = x.float().div_(255)
+        if x.shape[-2:] != (self.image_size, self.image_size):
+            x = F.interpolate(x, size=(self.image_size, self.image_size), mode="bilinear", align_corners=False, antialias=True)
+
+        if train:
+            n = x.size(0)
+            flip = torch.rand(n, device=x.device) < 0.5
+            x = torch.where(flip.view(n, 1, 1, 1), x.flip(-1), x)
+            if self.degrees: x = self._rotate(x)
+            if self.brightness: x = (x * self._factor(n, self.brightness, x.device)).clamp_(0, 1)
+            if self.contrast:
+                mean = self._gray(x).mean(dim=(1, 2, 3), keepdim=True)
+                x = ((x - mean) * self._factor(n, self.contrast, x.device) + mean).clamp_(0, 1)
+            if self.saturation:
+                gray = self._gray(x)
+                x = ((x - gray) * self._factor(n, self.saturation, x.device) + gray).clamp_(0, 1)
+            if self.hue: x = self._shift_hue(x).clamp_(0, 1)
+
+        mean = torch.tensor(self.MEAN, device=x.device).view(1, 3, 1, 1)
+        std = torch.tensor(self.STD, device=x.device).view(1, 3, 1, 1)
+        return (x - mean) / std
+
+def get_uint8_transform(image_size: int):
+    """batched 모드에서 FolderImageDataset 용: 크기만 맞춘 uint8 텐서 (증강은 BatchAugment 에서)"""
+    return T.Compose([T.Resize((image_size, image_size)), T.PILToTensor()])
+
+def make_loader(ds: Dataset, shuffle: bool, num_workers: Optional[int] = None, sampler: Optional[Sampler] = None) -> DataLoader:
+    if num_workers is None: num_workers = Config.NUM_WORKERS
+    kwargs = {}
+    if num_workers > 0:
+        kwargs = {"persistent_workers": True, "prefetch_factor": Config.PREFETCH_FACTOR}
+    return DataLoader(ds, batch_size=Config.BATCH_SIZE, shuffle=shuffle and sampler is None, sampler=sampler,
+                      num_workers=num_workers, pin_memory=Config.PIN_MEMORY, **kwargs)
+
+def build_datasets(class_to_idx: Dict[str, int], pipeline: Optional[str] = None, use_cache: Optional[bool] = None):
+    """(full_ds, train_tf, val_tf): batched 모드는 uint8 텐서를 그대로 내보냄 (transform 은 크기 맞춤만)"""
+    if pipeline is None: pipeline = Config.DATA_PIPELINE
+    if use_cache is None: use_cache = Config.USE_DATASET_CACHE
+    if use_cache:
+        cache = DatasetCache(Config.UPLOADS_DIR)
+        cache.sync()
+        full_ds = CachedImageDataset(cache, class_to_idx)
+        if pipeline == "batched": return full_ds, None, None
+        return (full_ds, *get_tensor_transforms(Config.IMG_SIZE))
+
+    full_ds = FolderImageDataset(Config.UPLOADS_DIR, class_to_idx)
+    if pipeline == "batched":
+        tf = get_uint8_transform(Config.IMG_SIZE)
+        return full_ds, tf, tf
+    return (full_ds, *get_transforms(Config.IMG_SIZE))
+
+def benchmark_data_pipeline(max_batches: int = 20) -> Dict[str, Dict[str, float]]:
+    """모델 없이 데이터 로딩 + 증강 처리량(images/sec) 비교: 기존 경로 vs batched 경로"""
+    labels = sorted(d for d in os.listdir(Config.UPLOADS_DIR) if os.path.isdir(os.path.join(Config.UPLOADS_DIR, d)))
+    class_to_idx = {c: i for i, c in enumerate(labels)}
+    augment = BatchAugment(Config.IMG_SIZE)
+
+    setups = {
+        "per_sample": ("per_sample", False, 0),  # 현재 경로: PIL 디코딩 + transform, 메인 프로세스
+        "batched": ("batched", Config.USE_DATASET_CACHE, Config.NUM_WORKERS),
+    }
+    report = {}
+    for name, (pipeline, use_cache, workers) in setups.items():
+        full_ds, train_tf, _ = build_datasets(class_to_idx, pipeline, use_cache)
+        if len(full_ds) == 0: raise RuntimeError("No images found.")
+        loader = make_loader(TransformSubset(full_ds, train_tf), shuffle=True, num_workers=workers)
+
+        n_images, t0 = 0, time.perf_counter()
+        for i, (img, _) in enumerate(loader):
+            img = img.to(Config.DEVICE, non_blocking=True)
+            if pipeline == "batched": img = augment(img)
+            n_images += img.size(0)
+            if i + 1 >= max_batches: break
+        if Config.DEVICE == "cuda": torch.cuda.synchronize()
+        elapsed = time.perf_counter() - t0
+
+        report[name] = {"images": n_images, "seconds": round(elapsed, 3),
+                        "images_per_sec": round(n_images / elapsed, 1) if elapsed else 0.0}
+        print(f"[DataBench] {name}: {report[name]}")
+    report["speedup"] = round(report["batched"]["images_per_sec"] / max(1e-9, report["per_sample"]["images_per_sec"]), 2)
+    return report
+
 def get_transforms(image_size: int):
     train_tf = T.Compose([
         T.Resize((image_size, image_size)),
@@ -158,12 +466,68 @@ def get_transforms(image_size: int):
     ])
     return train_tf, val_tf
 
+def get_tensor_transforms(image_size: int):
+    """CachedImageDataset 용: uint8 (C, H, W) 텐서를 바로 받는 버전 (PIL 변환 없음)"""
+    train_tf = T.Compose([
+        T.Resize((image_size, image_size), antialias=True),
+        T.RandomHorizontalFlip(),
+        T.RandomRotation(10),
+        T.ColorJitter(0.2, 0.2, 0.2, 0.05),
+        T.ConvertImageDtype(torch.float32),
+        T.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
+    ])
+    val_tf = T.Compose([
+        T.Resize((image_size, image_size), antialias=True),
+        T.ConvertImageDtype(torch.float32),
+        T.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
+    ])
+    return train_tf, val_tf
+
 def set_seed(seed: int = 42):
     random.seed(seed)
     np.random.seed(seed)
     torch.manual_seed(seed)
     if torch.cuda.is_available(): torch.cuda.manual_seed_all(seed)
 
+class EpochSampler(Sampler):
+    """epoch 마다 (seed + epoch) 로 정해지는 셔플 순서 → 재시작해도 같은 데이터 순서
+
+    set_epoch(epoch, start) 로 start 번째 샘플부터 이어서 (persistent worker 를 유지한 채 epoch 전환)
+    (index, 샘플 시드) 를 내보내서 DataLoader 워커 안의 증강도 (seed, epoch, 위치) 로 고정
+    """
+    def __init__(self, num_samples: int, seed: Optional[int] = None):
+        self.num_samples, self.seed = num_samples, Config.SEED if seed is None else seed
+        self.epoch, self.start = 1, 0
+
+    def set_epoch(self, epoch: int, start: int = 0):
+        self.epoch, self.start = epoch, start
+
+    def order(self) -> List[int]:
+        g = torch.Generator().manual_seed(self.seed + self.epoch)
+        return torch.randperm(self.num_samples, generator=g).tolist()
+
+    def sample_seed(self, position: int) -> int:
+        return hash((self.seed, self.epoch, position)) & 0x7FFFFFFF
+
+    def __iter__(self):
+        order = self.order()
+        return ((order[pos], self.sample_seed(pos)) for pos in range(self.start, self.num_samples))
+    def __len__(self): return max(0, self.num_samples - self.start)
+
+def get_rng_state() -> Dict[str, Any]:
+    return {
+        "python": random.getstate(),
+        "numpy": np.random.get_state(),
+        "torch": torch.get_rng_state(),
+        "cuda": torch.cuda.get_rng_state_all() if torch.cuda.is_available() else None,
+    }
+
+def set_rng_state(state: Dict[str, Any]):
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    torch.set_rng_state(state["torch"])
+    if state.get("cuda") is not None and torch.cuda.is_available(): torch.cuda.set_rng_state_all(state["cuda"])
+
 # =========================
 # 4. Model Factory (Advanced Models)
 # =========================
@@ -219,6 +583,114 @@ class ModelFactory:
             
         return model
 
+# =========================
+# 4-1. Feature Store (빠른 재학습용 특징 캐시)
+# =========================
+FINETUNE_MODES = ("fc", "layer4")
+
+def split_backbone(model: nn.Module, mode: str) -> Tuple[nn.Module, nn.Module]:
+    """ResNet 계열 모델 → (고정할 backbone, 학습할 head) — 모듈은 model 과 공유 (복사 X)
+
+    fc     : backbone = ~avgpool (512-d),  head = fc
+    layer4 : backbone = ~layer3 (특징맵), head = layer4 + avgpool + fc
+    """
+    if mode not in FINETUNE_MODES: raise ValueError(f"unknown fine-tune mode: {mode}")
+    if not (hasattr(model, "layer4") and hasattr(model, "fc")):
+        raise RuntimeError("Fast fine-tune requires a ResNet-family model (cbam_resnet / resnet18).")
+    stem = [model.conv1, model.bn1, model.relu, model.maxpool, model.layer1, model.layer2, model.layer3]
+    if mode == "fc":
+        return nn.Sequential(*stem, model.layer4, model.avgpool, nn.Flatten(1)), model.fc
+    return nn.Sequential(*stem), nn.Sequential(model.layer4, model.avgpool, nn.Flatten(1), model.fc)
+
+def module_fingerprint(module: nn.Module, extra: str = "") -> str:
+    """가중치 내용 해시 → backbone 이 바뀌면 다른 특징 저장소를 사용"""
+    h = hashlib.sha256(extra.encode("utf-8"))
+    for name, tensor in module.state_dict().items():
+        h.update(name.encode("utf-8"))
+        h.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return h.hexdigest()[:16]
+
+class FeatureStore:
+    """이미지 내용 sha256 → backbone 특징 (float16), backbone 지문별 디렉터리에 저장
+
+    - features.f16: 행 단위 append-only 파일, index.json: {sha: row}
+    - 파일 경로 → (크기, 수정시각, sha) 를 기억해서 바뀌지 않은 파일은 다시 해시하지 않음
+    """
+    def __init__(self, fingerprint: str, feature_shape: Tuple[int, ...], root: Optional[str] = None):
+        self.dir = os.path.join(root or Config.FEATURES_DIR, fingerprint)
+        os.makedirs(self.dir, exist_ok=True)
+        self.data_path = os.path.join(self.dir, "features.f16")
+        self.index_path = os.path.join(self.dir, "index.json")
+        self.feature_shape = tuple(feature_shape)
+        self.row_bytes = int(np.prod(self.feature_shape)) * 2
+
+        self.rows: Dict[str, int] = {}
+        self.files: Dict[str, List[Any]] = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if tuple(data.get("shape", ())) == self.feature_shape:
+                self.rows, self.files = data["rows"], data["files"]
+        self.n_rows = os.path.getsize(self.data_path) // self.row_bytes if os.path.exists(self.data_path) else 0
+
+    def content_hash(self, path: str) -> str:
+        st = os.stat(path)
+        known = self.files.get(path)
+        if known and known[0] == st.st_size and known[1] == st.st_mtime_ns: return known[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""): h.update(chunk)
+        self.files[path] = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+        return self.files[path][2]
+
+    def add(self, hashes: List[str], features: np.ndarray):
+        features = np.ascontiguousarray(features, dtype=np.float16).reshape(len(hashes), *self.feature_shape)
+        with open(self.data_path, "ab") as f:
+            f.seek(self.n_rows * self.row_bytes)
+            f.truncate()  # 인덱스에 기록되지 못한 꼬리 행 정리
+            f.write(features.tobytes())
+        for i, sha in enumerate(hashes): self.rows[sha] = self.n_rows + i
+        self.n_rows += len(hashes)
+
+    def row_ids(self, hashes: List[str]) -> np.ndarray:
+        return np.array([self.rows[sha] for sha in hashes], dtype=np.int64)
+
+    def open_rows(self) -> np.ndarray:
+        """(n_rows, *feature_shape) float16 memmap — 배치 단위로 인덱싱해서 읽음 (전체를 RAM 에 올리지 않음)"""
+        return np.memmap(self.data_path, dtype=np.float16, mode="r", shape=(self.n_rows, *self.feature_shape))
+
+    @staticmethod
+    def prune(keep: str, max_bytes: Optional[int] = None, root: Optional[str] = None):
+        """특징 디렉터리 총 크기가 max_bytes 를 넘으면 가장 오래 안 쓴 것부터 삭제 (keep 은 제외)
+
+        마지막 사용 시각 = index.json 수정 시각 (save() 할 때마다 갱신)
+        → 롤백할 수 있는 이전 체크포인트의 특징도 예산 안에서는 남아 있음
+        """
+        root = root or Config.FEATURES_DIR
+        max_bytes = Config.FEATURES_MAX_BYTES if max_bytes is None else max_bytes
+        dirs = []
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if not os.path.isdir(path): continue
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            index_path = os.path.join(path, "index.json")
+            last_used = os.path.getmtime(index_path) if os.path.exists(index_path) else 0.0
+            dirs.append((last_used, size, name, path))
+
+        total = sum(size for _, size, _, _ in dirs)
+        for _, size, name, path in sorted(dirs):
+            if total <= max_bytes: break
+            if name == keep: continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            print(f"[FeatureStore] removed least recently used features: {name}")
+
+    def save(self):
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"shape": list(self.feature_shape), "rows": self.rows, "files": self.files}, f)
+        os.replace(tmp, self.index_path)
+
 # =========================
 # 5. Model Manager
 # =========================
@@ -229,10 +701,11 @@ class ModelManager:
         self.class_to_idx: Dict[str, int] = {}
         self.idx_to_class: Dict[int, str] = {}
         self.train_status = {
-            "running": False, "epoch": 0, "total_epochs": 0,
+            "running": False, "paused": False, "epoch": 0, "total_epochs": 0, "batch": 0, "total_batches": 0,
             "train_loss": 0.0, "val_loss": 0.0, "best_val_loss": float('inf'),
             "message": "idle", "model_arch": Config.MODEL_ARCH
         }
+        self.runner = TrainingRunner(self)
 
     def _load_class_index(self):
         if os.path.exists(Config.CLASS_INDEX_PATH):
@@ -270,60 +743,150 @@ class ModelManager:
         self.model = ModelFactory.create_model(Config.MODEL_ARCH, len(self.class_to_idx)).to(Config.DEVICE)
         self.model.eval()
 
-    def train_process(self):
+    def _resume_signature(self, class_to_idx: Dict[str, int], num_samples: int) -> Dict[str, Any]:
+        # 이 값이 바뀌면 저장된 batch 위치 / 데이터 분할이 의미 없으므로 처음부터
+        return {"model_arch": Config.MODEL_ARCH, "class_to_idx": class_to_idx, "num_samples": num_samples,
+                "batch_size": Config.BATCH_SIZE, "seed": Config.SEED}
+
+    def _load_resume_state(self, signature: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(Config.RESUME_CKPT_PATH): return None
+        try:
+            state = torch.load(Config.RESUME_CKPT_PATH, map_location="cpu", weights_only=False)
+        except Exception as e:
+            print(f"[Resume] Load Error: {e}. Start fresh.")
+            return None
+        if state.get("signature") != signature:
+            print("[Resume] Dataset/config changed. Start fresh.")
+            return None
+        if state["epoch"] > Config.EPOCHS:
+            return None
+        return state
+
+    def train_process(self, resume: bool = False, control: Optional["TrainControl"] = None, report=None):
+        """resume=True 면 resume.pt 의 위치(epoch, batch)부터 그대로 이어서 학습
+
+        per_sample 증강(워커)은 EpochSampler 의 샘플 시드로, batched 증강은 복원한 RNG 로 재현됨
+
+        control: pause / cancel 이벤트 (TrainingRunner), report: 상태 dict 콜백 (별도 프로세스 → 큐)
+        """
+        st = self.train_status
+        def emit(**kw):
+            st.update(kw)
+            if report: report(dict(st))
+
         try:
-            set_seed(42)
-            st = self.train_status
-            st.update({"running": True, "epoch": 0, "total_epochs": Config.EPOCHS, 
-                       "model_arch": Config.MODEL_ARCH, "message": "preparing"})
+            emit(running=True, paused=False, epoch=0, batch=0, total_epochs=Config.EPOCHS,
+                 model_arch=Config.MODEL_ARCH, message="preparing")
 
             labels = sorted([d for d in os.listdir(Config.UPLOADS_DIR) if os.path.isdir(os.path.join(Config.UPLOADS_DIR, d))])
             if not labels: labels = Config.DEFAULT_EMOTIONS
             class_to_idx = {c: i for i, c in enumerate(labels)}
             with open(Config.CLASS_INDEX_PATH, "w", encoding="utf-8") as f: json.dump(class_to_idx, f)
 
-            train_tf, val_tf = get_transforms(Config.IMG_SIZE)
-            full_ds = FolderImageDataset(Config.UPLOADS_DIR, class_to_idx)
+            emit(message="loading dataset")
+            batched = Config.DATA_PIPELINE == "batched"
+            full_ds, train_tf, val_tf = build_datasets(class_to_idx, Config.DATA_PIPELINE, Config.USE_DATASET_CACHE)
+            augment = BatchAugment(Config.IMG_SIZE) if batched else None
             
             if len(full_ds) == 0: raise RuntimeError("No images found.")
-            
-            val_len = int(len(full_ds) * 0.2)
-            tr_sub, val_sub = random_split(full_ds, [len(full_ds) - val_len, val_len])
-            train_loader = DataLoader(TransformSubset(tr_sub, train_tf), batch_size=Config.BATCH_SIZE, shuffle=True)
-            val_loader = DataLoader(TransformSubset(val_sub, val_tf), batch_size=Config.BATCH_SIZE, shuffle=False)
+
+            signature = self._resume_signature(class_to_idx, len(full_ds))
+            state = self._load_resume_state(signature) if resume else None
+            if state:
+                split = state["split"]
+            else:
+                set_seed(Config.SEED)
+                perm = torch.randperm(len(full_ds), generator=torch.Generator().manual_seed(Config.SEED)).tolist()
+                val_len = int(len(full_ds) * 0.2)
+                split = {"train": perm[val_len:], "val": perm[:val_len]}
+
+            tr_sub, val_sub = Subset(full_ds, split["train"]), Subset(full_ds, split["val"])
+            sampler = EpochSampler(len(tr_sub), seed=Config.SEED)
+            train_loader = make_loader(TransformSubset(tr_sub, train_tf), shuffle=True, sampler=sampler)
+            val_loader = make_loader(TransformSubset(val_sub, val_tf), shuffle=False)
+            total_batches = (len(tr_sub) + Config.BATCH_SIZE - 1) // Config.BATCH_SIZE
 
             model = ModelFactory.create_model(Config.MODEL_ARCH, len(class_to_idx)).to(Config.DEVICE)
             criterion = nn.CrossEntropyLoss()
             # MobileViT와 CBAM은 파라미터가 복잡하므로 학습률 조정 필요 (AdamW 추천)
             optimizer = optim.AdamW(model.parameters(), lr=Config.LEARNING_RATE, weight_decay=1e-4)
             
-            best_val = float("inf")
-            st["message"] = "training"
+            start_epoch, start_batch, run_loss, best_val = 1, 0, 0.0, float("inf")
+            if state:
+                model.load_state_dict(state["model_state"])
+                optimizer.load_state_dict(state["optimizer_state"])
+                start_epoch, start_batch = state["epoch"], state["batch"]
+                run_loss, best_val = state["run_loss"], state["best_val"]
+                st["best_val_loss"] = best_val
+                print(f"[Resume] epoch {start_epoch}, batch {start_batch}/{total_batches}")
 
-            for epoch in range(1, Config.EPOCHS + 1):
+            def save_resume(epoch: int, batch: int, run_loss: float):
+                tmp = Config.RESUME_CKPT_PATH + ".tmp"
+                torch.save({
+                    "signature": signature, "split": split,
+                    "model_state": model.state_dict(), "optimizer_state": optimizer.state_dict(),
+                    "epoch": epoch, "batch": batch, "run_loss": run_loss, "best_val": best_val,
+                    "rng": get_rng_state(),
+                }, tmp)
+                os.replace(tmp, Config.RESUME_CKPT_PATH)
+
+            def wait_if_paused(epoch: int, batch: int, run_loss: float) -> bool:
+                """True = 취소됨 (현재 위치 저장 후 종료)"""
+                if control is None: return False
+                if control.pause.is_set() and not control.cancel.is_set():
+                    save_resume(epoch, batch, run_loss)
+                    emit(paused=True, message="paused")
+                    while control.pause.is_set() and not control.cancel.is_set(): time.sleep(0.5)
+                    emit(paused=False, message="training")
+                if control.cancel.is_set():
+                    save_resume(epoch, batch, run_loss)
+                    emit(running=False, paused=False, message="cancelled", finished_at=time.time())
+                    return True
+                return False
+
+            emit(message="training", total_batches=total_batches)
+
+            for epoch in range(start_epoch, Config.EPOCHS + 1):
                 st["epoch"] = epoch
+                sampler.set_epoch(epoch, start_batch * Config.BATCH_SIZE)
                 model.train()
-                run_loss = 0.0
-                for img, lbl in train_loader:
-                    img, lbl = img.to(Config.DEVICE), lbl.to(Config.DEVICE)
+                t_epoch, n_seen = time.perf_counter(), 0
+                batches = iter(train_loader)
+                # 워커 시드 추출 이후의 RNG 를 저장 시점 그대로 복원 → 이어서 나오는 batched 증강이 동일
+                if state and epoch == start_epoch: set_rng_state(state["rng"])
+
+                for batch_idx, (img, lbl) in enumerate(batches, start=start_batch + 1):
+                    img, lbl = img.to(Config.DEVICE, non_blocking=True), lbl.to(Config.DEVICE, non_blocking=True)
+                    if augment: img = augment(img, train=True)
                     optimizer.zero_grad()
                     out = model(img)
                     loss = criterion(out, lbl)
                     loss.backward()
                     optimizer.step()
                     run_loss += loss.item() * img.size(0)
+                    n_seen += img.size(0)
+
+                    emit(batch=batch_idx, batch_loss=loss.item(),
+                         images_per_sec=n_seen / max(1e-9, time.perf_counter() - t_epoch))
+                    if batch_idx < total_batches:
+                        if Config.CKPT_EVERY_BATCHES and batch_idx % Config.CKPT_EVERY_BATCHES == 0:
+                            save_resume(epoch, batch_idx, run_loss)
+                        if wait_if_paused(epoch, batch_idx, run_loss): return
+                start_batch = 0
                 
-                train_loss = run_loss / len(train_loader.dataset)
+                train_loss = run_loss / len(tr_sub)
+                run_loss = 0.0
                 st["train_loss"] = train_loss
 
                 model.eval()
                 val_run = 0.0
                 with torch.no_grad():
                     for img, lbl in val_loader:
-                        img, lbl = img.to(Config.DEVICE), lbl.to(Config.DEVICE)
+                        img, lbl = img.to(Config.DEVICE, non_blocking=True), lbl.to(Config.DEVICE, non_blocking=True)
+                        if augment: img = augment(img, train=False)
                         val_run += criterion(model(img), lbl).item() * img.size(0)
                 
-                val_loss = val_run / max(1, len(val_loader.dataset))
+                val_loss = val_run / max(1, len(val_sub))
                 st["val_loss"] = val_loss
 
                 torch.save({
@@ -338,30 +901,417 @@ class ModelManager:
                     best_val = val_loss
                     st["best_val_loss"] = best_val
                     shutil.copyfile(Config.LAST_CKPT_PATH, Config.BEST_CKPT_PATH)
-                
-                print(f"Epoch {epoch} [{Config.MODEL_ARCH}] Train: {train_loss:.4f} Val: {val_loss:.4f}")
 
-            st.update({"running": False, "message": "done", "finished_at": time.time()})
+                save_resume(epoch + 1, 0, 0.0)
+                emit()
+                print(f"Epoch {epoch} [{Config.MODEL_ARCH}] Train: {train_loss:.4f} Val: {val_loss:.4f} ({st['images_per_sec']:.0f} img/s)")
+                if epoch < Config.EPOCHS and wait_if_paused(epoch + 1, 0, 0.0): return
+
+            if os.path.exists(Config.RESUME_CKPT_PATH): os.remove(Config.RESUME_CKPT_PATH)
+            emit(running=False, message="done", finished_at=time.time())
             self.load_or_init_model(use_best=True)
 
         except Exception as e:
             print(f"Error: {e}")
-            self.train_status.update({"running": False, "message": str(e)})
+            emit(running=False, paused=False, message=str(e))
+
+    def _finetune_base_model(self, class_to_idx: Dict[str, int]) -> nn.Module:
+        """현재 학습된 모델에서 시작 (fc 는 클래스 이름 기준으로 옮기고, 새 클래스만 새로 초기화)"""
+        model = ModelFactory.create_model(Config.MODEL_ARCH, len(class_to_idx)).to(Config.DEVICE)
+        ckpt_path = Config.BEST_CKPT_PATH if os.path.exists(Config.BEST_CKPT_PATH) else Config.LAST_CKPT_PATH
+        if not os.path.exists(ckpt_path): return model
+
+        data = torch.load(ckpt_path, map_location=Config.DEVICE)
+        if data.get("model_arch") != Config.MODEL_ARCH: return model
+        state = data["model_state"]
+        model.load_state_dict({k: v for k, v in state.items() if not k.startswith("fc.")}, strict=False)
+        old_idx = data.get("class_to_idx", {})
+        with torch.no_grad():
+            for name, i in class_to_idx.items():
+                if name not in old_idx: continue
+                model.fc.weight[i] = state["fc.weight"][old_idx[name]]
+                model.fc.bias[i] = state["fc.bias"][old_idx[name]]
+        return model
+
+    def fine_tune_process(self, mode: Optional[str] = None, control: Optional["TrainControl"] = None, report=None):
+        """backbone 고정 + 특징 캐시로 head 만 빠르게 재학습 (새 이미지만 backbone 을 통과)
+
+        특징은 고정된 전처리(val_tf)로 뽑으므로 증강은 적용되지 않음
+        """
+        mode = mode or Config.FINETUNE_MODE
+        st = self.train_status
+        def emit(**kw):
+            st.update(kw)
+            if report: report(dict(st))
+
+        def cancelled() -> bool:
+            """배치마다 호출: 일시정지면 풀릴 때까지 대기, 취소면 True"""
+            if control is None: return False
+            if control.pause.is_set() and not control.cancel.is_set():
+                message = st["message"]
+                emit(paused=True, message="paused")
+                while control.pause.is_set() and not control.cancel.is_set(): time.sleep(0.5)
+                emit(paused=False, message=message)
+            return control.cancel.is_set()
+
+        try:
+            emit(running=True, paused=False, epoch=0, batch=0, total_batches=0, total_epochs=Config.FINETUNE_EPOCHS,
+                 model_arch=Config.MODEL_ARCH, message=f"preparing fine-tune ({mode})")
+
+            labels = sorted([d for d in os.listdir(Config.UPLOADS_DIR) if os.path.isdir(os.path.join(Config.UPLOADS_DIR, d))])
+            if not labels: labels = Config.DEFAULT_EMOTIONS
+            class_to_idx = {c: i for i, c in enumerate(labels)}
+            with open(Config.CLASS_INDEX_PATH, "w", encoding="utf-8") as f: json.dump(class_to_idx, f)
+
+            # 데이터셋 캐시가 있으면 이미 디코딩된 memmap 에서 (PIL 재디코딩 X)
+            if Config.USE_DATASET_CACHE:
+                emit(message="caching dataset")
+                cache = DatasetCache(Config.UPLOADS_DIR)
+                cache.sync()
+                ds = CachedImageDataset(cache, class_to_idx, transform=get_tensor_transforms(Config.IMG_SIZE)[1])
+                paths, source = cache.paths(class_to_idx), f"cache{cache.size}"
+            else:
+                ds = FolderImageDataset(Config.UPLOADS_DIR, class_to_idx, transform=get_transforms(Config.IMG_SIZE)[1])
+                paths, source = [path for path, _ in ds.samples], "pil"
+            if len(ds) == 0: raise RuntimeError("No images found.")
+
+            model = self._finetune_base_model(class_to_idx)
+            backbone, head = split_backbone(model, mode)
+            backbone.eval()
+            for p in backbone.parameters(): p.requires_grad_(False)
+            with torch.inference_mode():
+                feature_shape = tuple(backbone(torch.zeros(1, 3, Config.IMG_SIZE, Config.IMG_SIZE, device=Config.DEVICE)).shape[1:])
+            # 디코딩 경로(캐시 해상도 / PIL)가 다르면 특징도 달라지므로 지문에 포함
+            fingerprint = module_fingerprint(backbone, f"{mode}|{Config.IMG_SIZE}|{source}")
+            store = FeatureStore(fingerprint, feature_shape)
+
+            # 1) 특징이 없는 이미지만 backbone 통과 (같은 내용의 중복 파일은 1번만)
+            hashes = [store.content_hash(path) for path in paths]
+            todo = list({sha: i for i, sha in reversed(list(enumerate(hashes))) if sha not in store.rows}.values())
+            emit(message=f"extracting features ({len(todo)} new / {len(ds)})")
+            t0 = time.perf_counter()
+            if todo:
+                # 배치마다 바로 파일에 추가 (새 특징도 RAM 에 모아두지 않음), 취소돼도 뽑은 만큼은 재사용
+                done = 0
+                with torch.inference_mode():
+                    for img, _ in make_loader(Subset(ds, todo), shuffle=False):
+                        feats = backbone(img.to(Config.DEVICE, non_blocking=True)).float().cpu().numpy()
+                        store.add([hashes[i] for i in todo[done:done + len(feats)]], feats)
+                        done += len(feats)
+                        if cancelled(): break
+                if done < len(todo):
+                    store.save()
+                    emit(running=False, paused=False, message="cancelled", finished_at=time.time())
+                    return
+            store.save()
+            # 새 저장소가 다 만들어진 뒤에만 정리 (예산 초과분만, 오래 안 쓴 순)
+            FeatureStore.prune(keep=fingerprint)
+            print(f"[FineTune] features: {len(todo)} new, {len(ds) - len(todo)} cached ({time.perf_counter() - t0:.1f}s)")
+
+            # 2) 캐시된 특징 위에서 head 학습
+            # layer4 모드는 이미지당 ~128KB → 전체를 올리지 않고 배치마다 memmap 에서 읽음
+            features = store.open_rows()
+            rows = store.row_ids(hashes)
+            y = torch.tensor([label_idx for _, label_idx in ds.samples])
+            perm = torch.randperm(len(ds), generator=torch.Generator().manual_seed(Config.SEED))
+            val_len = int(len(ds) * 0.2)
+            val_idx, tr_idx = perm[:val_len], perm[val_len:]
+
+            criterion = nn.CrossEntropyLoss()
+            optimizer = optim.AdamW([p for p in head.parameters() if p.requires_grad], lr=Config.FINETUNE_LR, weight_decay=1e-4)
+            best_val, best_state = float("inf"), None
+            emit(message="training head")
+
+            def run(idx, train: bool) -> Optional[float]:
+                """None = 취소됨"""
+                head.train(train)
+                total = 0.0
+                for b in range(0, len(idx), Config.FINETUNE_BATCH_SIZE):
+                    # 행 번호 순으로 정렬해서 읽으면 memmap 접근이 순차에 가까움
+                    batch = idx[b:b + Config.FINETUNE_BATCH_SIZE]
+                    batch = batch[np.argsort(rows[batch.numpy()], kind="stable")]
+                    xb = torch.from_numpy(np.asarray(features[rows[batch.numpy()]])).to(Config.DEVICE).float()
+                    yb = y[batch].to(Config.DEVICE)
+                    with torch.set_grad_enabled(train):
+                        loss = criterion(head(xb), yb)
+                    if train:
+                        optimizer.zero_grad()
+                        loss.backward()
+                        optimizer.step()
+                    total += loss.item() * len(batch)
+                    if cancelled(): return None
+                return total / max(1, len(idx))
+
+            for epoch in range(1, Config.FINETUNE_EPOCHS + 1):
+                train_loss = run(tr_idx[torch.randperm(len(tr_idx))], train=True)
+                val_loss = (run(val_idx, train=False) if val_len else train_loss) if train_loss is not None else None
+                if val_loss is None:
+                    emit(running=False, paused=False, message="cancelled", finished_at=time.time())
+                    return
+                if val_loss < best_val:
+                    best_val = val_loss
+                    best_state = {k: v.detach().clone() for k, v in head.state_dict().items()}
+                emit(epoch=epoch, train_loss=train_loss, val_loss=val_loss, best_val_loss=best_val)
+
+            if best_state is None:
+                # 모든 epoch 의 loss 가 NaN 등 → 망가진 가중치를 저장하지 않음
+                raise RuntimeError("Fine-tune produced no finite loss; checkpoint not updated.")
+            head.load_state_dict(best_state)
+            torch.save({
+                "model_state": model.state_dict(),
+                "class_to_idx": class_to_idx,
+                "epoch": Config.FINETUNE_EPOCHS,
+                "model_arch": Config.MODEL_ARCH,
+                "train_loss": st["train_loss"], "val_loss": best_val,
+                "finetune": mode,
+            }, Config.LAST_CKPT_PATH)
+            shutil.copyfile(Config.LAST_CKPT_PATH, Config.BEST_CKPT_PATH)
+            print(f"[FineTune] {mode} done in {time.perf_counter() - t0:.1f}s, best val {best_val:.4f}")
+
+            emit(running=False, message="done", finished_at=time.time())
+            self.load_or_init_model(use_best=True)
+
+        except Exception as e:
+            print(f"Error: {e}")
+            emit(running=False, paused=False, message=str(e))
+
+    # ---- 추론 (단건 / 배치 / 스트리밍) ----
+    def _val_transform(self):
+        # IMG_SIZE 가 바뀔 때만 다시 생성
+        if getattr(self, "_val_tf_size", None) != Config.IMG_SIZE:
+            self._val_tf = get_transforms(Config.IMG_SIZE)[1]
+            self._val_tf_size = Config.IMG_SIZE
+        return self._val_tf
+
+    def _predict_tensor(self, x: torch.Tensor) -> torch.Tensor:
+        """(B, 3, H, W) → softmax 확률 (B, num_classes), CPU"""
+        if self.model is None: self.load_or_init_model()
+        with torch.inference_mode():
+            return torch.softmax(self.model(x.to(Config.DEVICE, non_blocking=True)).float(), dim=1).cpu()
+
+    def _to_result(self, probs: torch.Tensor) -> Tuple[str, Dict[str, float]]:
+        values = probs.tolist()
+        idx = int(probs.argmax())
+        return self.idx_to_class.get(idx, "unknown"), {self.idx_to_class[i]: float(p) for i, p in enumerate(values)}
 
     def predict(self, image: Image.Image):
+        return self.predict_batch([image])[0]
+
+    def predict_batch(self, images: List[Image.Image]) -> List[Tuple[str, Dict[str, float]]]:
+        if not images: return []
+        val_tf = self._val_transform()
+        x = torch.stack([val_tf(img.convert("RGB")) for img in images])
+        return [self._to_result(p) for p in self._predict_tensor(x)]
+
+    def predict_stream(self, source: Union[str, Iterable[Union[str, Image.Image]]], batch_size: Optional[int] = None,
+                       workers: Optional[int] = None, skip: Optional[set] = None) -> Iterator[Dict[str, Any]]:
+        """디렉터리 / glob / (경로 또는 PIL 이미지) iterable → 결과 dict 를 하나씩 yield
+
+        디코딩 + 전처리는 스레드 풀에서 병렬로, 다음 배치 디코딩은 현재 배치 추론과 겹쳐서 진행
+        """
+        batch_size = batch_size or Config.BATCH_SIZE
+        workers = Config.NUM_WORKERS if workers is None else workers
+        val_tf = self._val_transform()
+        items = (item for item in iter_image_sources(source) if not (skip and isinstance(item, str) and item in skip))
+
+        def load(item):
+            name = item if isinstance(item, str) else getattr(item, "filename", "") or ""
+            try:
+                img = Image.open(item) if isinstance(item, str) else item
+                return name, val_tf(img.convert("RGB")), None
+            except Exception as e:
+                return name, None, f"{type(e).__name__}: {e}"
+
+        def chunks():
+            chunk = []
+            for item in items:
+                chunk.append(item)
+                if len(chunk) == batch_size:
+                    yield chunk
+                    chunk = []
+            if chunk: yield chunk
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            pending = None
+            for chunk in chunks():
+                nxt = [pool.submit(load, item) for item in chunk]
+                if pending is not None: yield from self._run_decoded([f.result() for f in pending])
+                pending = nxt
+            if pending is not None: yield from self._run_decoded([f.result() for f in pending])
+
+    def _run_decoded(self, decoded: List[Tuple[str, Optional[torch.Tensor], Optional[str]]]) -> Iterator[Dict[str, Any]]:
+        ok = [d for d in decoded if d[1] is not None]
+        probs = iter(self._predict_tensor(torch.stack([d[1] for d in ok]))) if ok else iter(())
+        for name, tensor, error in decoded:
+            if tensor is None:
+                yield {"path": name, "label": None, "confidence": None, "probs": {}, "error": error}
+                continue
+            label, prob_map = self._to_result(next(probs))
+            yield {"path": name, "label": label, "confidence": prob_map.get(label), "probs": prob_map, "error": None}
+
+    def predict_to_file(self, source, out_path: str, batch_size: Optional[int] = None,
+                        workers: Optional[int] = None, resume: bool = True) -> Dict[str, Any]:
+        """결과를 CSV / JSONL(확장자로 결정) 에 배치마다 이어 쓰기, resume=True 면 이미 기록된 경로는 건너뜀"""
+        batch_size = batch_size or Config.BATCH_SIZE
         if self.model is None: self.load_or_init_model()
-        _, val_tf = get_transforms(Config.IMG_SIZE)
-        x = val_tf(image).unsqueeze(0).to(Config.DEVICE)
-        self.model.eval()
-        with torch.no_grad():
-            logits = self.model(x).squeeze(0).cpu().numpy()
-        probs = np.exp(logits - np.max(logits))
-        probs = probs / probs.sum()
-        idx = int(np.argmax(probs))
-        return self.idx_to_class.get(idx, "unknown"), {self.idx_to_class[i]: float(p) for i, p in enumerate(probs)}
+        as_csv = out_path.lower().endswith(".csv")
+        classes = [self.idx_to_class[i] for i in sorted(self.idx_to_class)]
+
+        done = set()
+        if resume and os.path.exists(out_path):
+            # 중단 시 잘린 마지막 줄은 잘라내고 (마지막 줄바꿈까지) 그 뒤에 이어 씀
+            with open(out_path, "rb+") as f:
+                end = f.seek(0, os.SEEK_END)
+                pos = end
+                while pos > 0:
+                    step = min(pos, 1 << 16)
+                    f.seek(pos - step)
+                    newline = f.read(step).rfind(b"\n")
+                    if newline >= 0: break
+                    pos -= step
+                keep = pos - step + newline + 1 if pos > 0 else 0
+                if keep < end: f.truncate(keep)
+            with open(out_path, "r", encoding="utf-8", newline="") as f:
+                if as_csv: done = {row["path"] for row in csv.DictReader(f)}
+                else: done = {json.loads(line)["path"] for line in f if line.strip()}
+        else:
+            open(out_path, "w").close()
+
+        n, errors, t0 = 0, 0, time.perf_counter()
+        with open(out_path, "a", encoding="utf-8", newline="") as f:
+            writer = None
+            if as_csv:
+                writer = csv.writer(f)
+                if f.tell() == 0: writer.writerow(["path", "label", "confidence", *classes, "error"])
+            for i, r in enumerate(self.predict_stream(source, batch_size, workers, skip=done), start=1):
+                if as_csv:
+                    writer.writerow([r["path"], r["label"] or "", "" if r["confidence"] is None else f"{r['confidence']:.6f}",
+                                     *[f"{r['probs'][c]:.6f}" if c in r["probs"] else "" for c in classes], r["error"] or ""])
+                else:
+                    f.write(json.dumps(r, ensure_ascii=False) + "\n")
+                n += 1
+                errors += r["error"] is not None
+                if i % batch_size == 0:
+                    f.flush()
+                    print(f"[Predict] {n} images ({n / (time.perf_counter() - t0):.1f} img/s)")
+
+        elapsed = time.perf_counter() - t0
+        stats = {"predicted": n, "skipped": len(done), "errors": errors, "seconds": round(elapsed, 2),
+                 "images_per_sec": round(n / elapsed, 1) if elapsed else 0.0, "out": out_path}
+        print(f"[Predict] {stats}")
+        return stats
+
+def iter_image_sources(source: Union[str, Iterable[Union[str, Image.Image]]]) -> Iterator[Union[str, Image.Image]]:
+    """디렉터리(하위 폴더 포함, 정렬) / glob 패턴 / 파일 경로 / iterable 을 이미지 항목으로 풀어줌"""
+    if isinstance(source, str):
+        if os.path.isdir(source):
+            for dirpath, dirnames, filenames in os.walk(source):
+                dirnames.sort()
+                for fname in sorted(filenames):
+                    if fname.lower().endswith(IMAGE_EXTS): yield os.path.join(dirpath, fname)
+        elif os.path.isfile(source):
+            yield source
+        else:
+            yield from sorted(glob.glob(source, recursive=True))
+        return
+    yield from source
+
+# =========================
+# 6. Training Runner (별도 프로세스)
+# =========================
+# 자식 프로세스로 넘길 Config 값 (spawn 은 모듈을 새로 import 하므로 UI 에서 바꾼 값을 전달)
+RUNNER_CONFIG_KEYS = ("MODEL_ARCH", "IMG_SIZE", "BATCH_SIZE", "LEARNING_RATE", "EPOCHS", "DEVICE",
+                      "USE_DATASET_CACHE", "CACHE_IMG_SIZE", "DATA_PIPELINE", "NUM_WORKERS",
+                      "PREFETCH_FACTOR", "PIN_MEMORY", "CKPT_EVERY_BATCHES", "SEED",
+                      "FINETUNE_EPOCHS", "FINETUNE_LR", "FINETUNE_BATCH_SIZE")
+
+class TrainControl:
+    def __init__(self, ctx):
+        self.pause = ctx.Event()
+        self.cancel = ctx.Event()
+
+def _train_worker(overrides: Dict[str, Any], mode: str, resume: bool, control: TrainControl, status_queue):
+    for k, v in overrides.items(): setattr(Config, k, v)
+    if mode == "full": ModelManager().train_process(resume=resume, control=control, report=status_queue.put)
+    else: ModelManager().fine_tune_process(mode, control=control, report=status_queue.put)
+
+class TrainingRunner:
+    """train_process 를 별도 프로세스에서 실행 (UI 가 멈추지 않음)
+
+    - 진행 상황은 poll() 할 때 manager.train_status 로 반영 (epoch / batch / loss / img/s)
+    - pause() / resume() / cancel(): 배치 경계에서 resume.pt 저장 후 멈춤 / 재개 / 종료
+    - start(resume=True): 앱이 재시작돼도 resume.pt 위치부터 이어서 학습
+    - start(mode="fc" | "layer4"): 특징 캐시 기반 빠른 재학습 (fine_tune_process)
+    """
+    def __init__(self, manager: "ModelManager"):
+        self.manager = manager
+        self.ctx = mp.get_context("spawn")  # CUDA 안전 + Windows 와 동작 통일
+        self.process = None
+        self.queue = None
+        self.control: Optional[TrainControl] = None
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def start(self, resume: bool = True, mode: str = "full") -> bool:
+        if self.is_alive(): return False
+        self.queue = self.ctx.Queue()
+        self.control = TrainControl(self.ctx)
+        overrides = {k: getattr(Config, k) for k in RUNNER_CONFIG_KEYS}
+        # DataLoader 워커를 띄워야 하므로 daemon=False
+        self.process = self.ctx.Process(target=_train_worker, args=(overrides, mode, resume, self.control, self.queue),
+                                        name="train-runner", daemon=False)
+        self.process.start()
+        self.manager.train_status.update({"running": True, "paused": False, "message": "starting",
+                                          "total_epochs": Config.EPOCHS, "model_arch": Config.MODEL_ARCH})
+        return True
+
+    def pause(self):
+        if self.control: self.control.pause.set()
+
+    def resume(self):
+        if self.control: self.control.pause.clear()
+
+    def cancel(self):
+        if self.control:
+            self.control.cancel.set()
+            self.control.pause.clear()
+
+    def poll(self) -> Dict[str, Any]:
+        st = self.manager.train_status
+        if self.queue is None: return st
+        finished = self.process is not None and not self.process.is_alive()
+        # 종료 여부를 먼저 본 뒤 큐를 비워야 마지막 상태("done" 등)를 놓치지 않음
+        while True:
+            try:
+                st.update(self.queue.get_nowait())
+            except Empty:
+                break
+
+        if finished:
+            self.process.join()
+            if st.get("running"):
+                st.update({"running": False, "paused": False, "message": f"runner exited ({self.process.exitcode})"})
+            if st.get("message") == "done": self.manager.load_or_init_model(use_best=True)
+            self.process = None
+        return st
 
 manager = ModelManager()
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="CBAM-ResNet / MobileViT 분류기")
+    parser.add_argument("--bench-data", action="store_true", help="데이터 파이프라인 처리량 비교")
+    parser.add_argument("--predict", metavar="SOURCE", help="예측할 디렉터리 / glob / 이미지 파일")
+    parser.add_argument("--out", default="predictions.jsonl", help="결과 파일 (.csv 또는 .jsonl)")
+    parser.add_argument("--batch-size", type=int, default=None, help="기본값: Config.BATCH_SIZE")
+    parser.add_argument("--workers", type=int, default=None, help="디코딩 스레드 수 (기본값: Config.NUM_WORKERS)")
+    parser.add_argument("--no-resume", action="store_true", help="기존 결과 파일을 덮어쓰고 처음부터")
+    args = parser.parse_args()
+
     print(f"Selected Architecture: {Config.MODEL_ARCH}")
+    if args.bench_data: benchmark_data_pipeline()
+    if args.predict:
+        manager.load_or_init_model(use_best=True)
+        manager.predict_to_file(args.predict, args.out, args.batch_size, args.workers, resume=not args.no_resume)
     # manager.train_process() # 학습 시작 시 주석 해제
\ No newline at end of file